@@ -0,0 +1,95 @@
+import json
+import random
+import asyncio
+
+from types import SimpleNamespace
+
+
+FAKE_PROJECT_HTML = (
+    "<!DOCTYPE html><html><head><title>{title}</title>"
+    "<style>body {{ font-family: sans-serif; margin: 2cm; }} h1 {{ color: #333; }}</style></head>"
+    "<body><header><h1>{title}</h1><p>{description}</p></header><main>{sections}</main></body></html>"
+)
+FAKE_SECTION_HTML = "<section><h2>Раздел {index}</h2><p>{text}</p><ul><li>Шаг 1</li><li>Шаг 2</li><li>Шаг 3</li></ul></section>"
+FAKE_TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore. "
+
+
+class FakeModelError(Exception):
+    def __init__(self, code: int, message: str = "fake model error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def fake_usage(prompt: str, text: str):
+    prompt_tokens = max(1, len(prompt) // 4)
+    response_tokens = max(1, len(text) // 4)
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=response_tokens,
+        total_token_count=prompt_tokens + response_tokens,
+    )
+
+
+class FakeModels:
+    def __init__(self, latency: float, size: int, chunk_size: int, error_rate: float, error_code: int):
+        self.latency = latency
+        self.size = size
+        self.chunk_size = chunk_size
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.calls = 0
+
+    def _render(self, config=None) -> str:
+        self.calls += 1
+        title = f"Учебный проект #{self.calls}"
+        if config and config.get("response_mime_type") == "application/json":
+            return self._render_json(title)
+        sections = []
+        length = len(FAKE_PROJECT_HTML)
+        while length < self.size:
+            section = FAKE_SECTION_HTML.format(index=len(sections) + 1, text=FAKE_TEXT * 8)
+            sections.append(section)
+            length += len(section)
+        return FAKE_PROJECT_HTML.format(title=title, description=FAKE_TEXT.strip(), sections="".join(sections))
+
+    def _render_json(self, title: str) -> str:
+        items = max(1, self.size // (len(FAKE_TEXT) * 5))
+        return json.dumps({
+            "title": title,
+            "description": FAKE_TEXT.strip(),
+            "tasks": [f"Шаг {index}: {FAKE_TEXT.strip()}" for index in range(1, items + 1)],
+            "learn": [f"Тема {index}" for index in range(1, items + 1)],
+            "resources": [{"title": f"Документация {index}", "type": "docs"} for index in range(1, items + 1)],
+            "success_criteria": [FAKE_TEXT.strip() for _ in range(items)],
+            "outcome": FAKE_TEXT * 3,
+        }, ensure_ascii=False)
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeModelError(self.error_code)
+
+    async def generate_content(self, model: str, contents: str, config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        text = self._render(config)
+        return SimpleNamespace(text=text, usage_metadata=fake_usage(contents, text))
+
+    async def generate_content_stream(self, model: str, contents: str, config=None, **kwargs):
+        self._maybe_fail()
+        text = self._render(config)
+        chunks = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)]
+        delay = self.latency / max(1, len(chunks))
+
+        async def stream():
+            for index, chunk in enumerate(chunks):
+                await asyncio.sleep(delay)
+                last = index == len(chunks) - 1
+                yield SimpleNamespace(text=chunk, usage_metadata=fake_usage(contents, text) if last else None)
+
+        return stream()
+
+
+class FakeModelClient:
+
+    def __init__(self, latency: float = 1.0, size: int = 30_000, chunk_size: int = 512, error_rate: float = 0.0, error_code: int = 429):
+        self.aio = SimpleNamespace(models=FakeModels(latency, size, chunk_size, error_rate, error_code))
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import threading
+
+
+CACHE_MODES = ("off", "reuse", "consume")
+
+
+def normalize_value(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def settings_version(settings: dict, paths=()) -> str:
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for path in sorted(paths):
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def files_size(paths) -> int:
+    size = 0
+    for path in paths:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+
+def write_file_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class GenerationCache:
+    def __init__(self, root: str, variants: int = 3, max_age: float = 7 * 24 * 3600, max_bytes: int = 500 * 1024 * 1024, version: str = "1", scan_interval: float = 600.0):
+        self.root = root
+        self.variants = variants
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.version = version
+        self.scan_interval = scan_interval
+        self.lock = threading.Lock()
+        self.total_bytes = None
+        self.scanned_at = 0.0
+        self.scans = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evicted = 0
+
+    def key_for(self, profession: str, level: str, specialization: str, language_code: str, prompt: str = "") -> str:
+        normalized = {
+            "version": self.version,
+            "profession": normalize_value(profession),
+            "level": normalize_value(level),
+            "specialization": normalize_value(specialization),
+            "language_code": normalize_value(language_code),
+            "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+        }
+        payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _key_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _variant_paths(self, key_dir: str, variant_id: str) -> list:
+        return [os.path.join(key_dir, f"{variant_id}{ext}") for ext in (".json", ".html", ".pdf")]
+
+    def _account(self, delta: int):
+        with self.lock:
+            if self.total_bytes is not None:
+                self.total_bytes += delta
+
+    def _variant_ids(self, key: str):
+        try:
+            names = os.listdir(self._key_dir(key))
+        except FileNotFoundError:
+            return []
+        return [name[:-len(".json")] for name in names if name.endswith(".json")]
+
+    def _read_variant(self, key_dir: str, variant_id: str, meta_path: str):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(key_dir, f"{variant_id}.html"), "r", encoding="utf-8") as f:
+            html = f.read()
+        with open(os.path.join(key_dir, f"{variant_id}.pdf"), "rb") as f:
+            pdf = f.read()
+        return {"html": html, "pdf": pdf, "title": meta["title"], "description": meta["description"]}
+
+    def _get(self, key: str):
+        key_dir = self._key_dir(key)
+        variant_ids = self._variant_ids(key)
+        random.shuffle(variant_ids)
+        for variant_id in variant_ids:
+            meta_path = os.path.join(key_dir, f"{variant_id}.json")
+            try:
+                artifact = self._read_variant(key_dir, variant_id, meta_path)
+                os.utime(meta_path)
+                return artifact
+            except (OSError, ValueError, KeyError):
+                continue
+        return None
+
+    def _take(self, key: str):
+        key_dir = self._key_dir(key)
+        variant_ids = self._variant_ids(key)
+        random.shuffle(variant_ids)
+        for variant_id in variant_ids:
+            meta_path = os.path.join(key_dir, f"{variant_id}.json")
+            claimed_path = f"{meta_path}.{uuid.uuid4().hex}.claimed"
+            try:
+                os.rename(meta_path, claimed_path)
+            except OSError:
+                continue
+            paths = [claimed_path] + self._variant_paths(key_dir, variant_id)[1:]
+            try:
+                return self._read_variant(key_dir, variant_id, claimed_path)
+            except (OSError, ValueError, KeyError):
+                continue
+            finally:
+                self._account(-files_size(paths))
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        return None
+
+    def _put(self, key: str, artifact: dict):
+        key_dir = self._key_dir(key)
+        os.makedirs(key_dir, exist_ok=True)
+        variant_id = hashlib.sha256(artifact["pdf"]).hexdigest()[:32]
+        meta = {"title": artifact["title"], "description": artifact["description"], "created_at": time.time()}
+        paths = self._variant_paths(key_dir, variant_id)
+        replaced = files_size(paths)
+
+        write_file_atomic(paths[1], artifact["html"].encode("utf-8"))
+        write_file_atomic(paths[2], artifact["pdf"])
+        write_file_atomic(paths[0], json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+        self._account(files_size(paths) - replaced)
+        self._maybe_evict()
+
+    def _maybe_evict(self):
+        with self.lock:
+            due = (
+                self.total_bytes is None
+                or self.total_bytes > self.max_bytes
+                or time.time() - self.scanned_at >= self.scan_interval
+            )
+        if due:
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".json"):
+                    continue
+                paths = self._variant_paths(dirpath, name[:-len(".json")])
+                try:
+                    with open(paths[0], "r", encoding="utf-8") as f:
+                        created_at = json.load(f).get("created_at", 0)
+                    last_used = os.path.getmtime(paths[0])
+                except (OSError, ValueError):
+                    continue
+                entries.append((last_used, created_at, files_size(paths), paths))
+
+        total = sum(entry[2] for entry in entries)
+        entries.sort(key=lambda entry: entry[0])
+        for last_used, created_at, size, paths in entries:
+            if now - created_at <= self.max_age and total <= self.max_bytes:
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            self.evicted += 1
+
+        with self.lock:
+            self.total_bytes = total
+            self.scanned_at = now
+            self.scans += 1
+
+    async def count(self, key: str) -> int:
+        return len(await asyncio.to_thread(self._variant_ids, key))
+
+    async def get(self, key: str):
+        artifact = await asyncio.to_thread(self._get, key)
+        if artifact is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return artifact
+
+    async def take(self, key: str):
+        artifact = await asyncio.to_thread(self._take, key)
+        if artifact is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return artifact
+
+    async def put(self, key: str, artifact: dict):
+        await asyncio.to_thread(self._put, key, artifact)
+        self.stores += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evicted": self.evicted,
+            "bytes": self.total_bytes,
+            "scans": self.scans,
+        }
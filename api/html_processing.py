@@ -0,0 +1,326 @@
+import re
+import os
+import html
+
+from functools import lru_cache
+from html.parser import HTMLParser
+
+
+DEFAULT_PROJECT_TITLE = "Сгенерированный план проекта"
+DEFAULT_PROJECT_DESCRIPTION = "Подробное описание проекта."
+
+TITLE_RE = re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+DESCRIPTION_RE = re.compile(r'<h1>.*?</h1>\s*<p>(.*?)</p>', re.IGNORECASE | re.DOTALL)
+PARAGRAPH_RE = re.compile(r'<p>(.*?)</p>', re.IGNORECASE | re.DOTALL)
+HEAD_TAG_RE = re.compile(r'<head(?:\s[^>]*)?>', re.IGNORECASE)
+BODY_TAG_RE = re.compile(r'<body(?:\s[^>]*)?>', re.IGNORECASE)
+HTML_END_RE = re.compile(r'</html\s*>', re.IGNORECASE)
+
+FENCE_HEAD_LIMIT = 256
+FENCE_TAIL = 16
+EARLY_SCAN_LIMIT = 64 * 1024
+
+SKIP_CONTENT_TAGS = {"script", "iframe", "object", "noscript"}
+RESOURCE_TAGS = {"link", "img", "source", "track", "embed", "video", "audio"}
+VOID_TAGS = {"link", "img", "source", "track", "embed"}
+RESOURCE_ATTRS = {"href", "src", "srcset", "poster"}
+EXTERNAL_PREFIXES = ("http:", "https:", "//", "ftp:", "file:")
+EXTERNAL_IMPORT_RE = re.compile(r'@import[^;]*;', re.IGNORECASE)
+EXTERNAL_URL_RE = re.compile(r'url\(\s*[\'"]?\s*(?:https?:|ftp:|file:)?//[^)]*\)', re.IGNORECASE)
+UNSAFE_TAG_RE = re.compile(r'<(?i:%s)\b' % "|".join(sorted(SKIP_CONTENT_TAGS | RESOURCE_TAGS)))
+CSS_IMPORT_RE = re.compile(r'@(?=[iI][mM][pP][oO][rR][tT])')
+CSS_URL_RE = re.compile(r'\((?<=[uU][rR][lL]\()')
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+@lru_cache(maxsize=None)
+def shared_stylesheet() -> str:
+    with open(os.path.join(TEMPLATES_DIR, "project.css"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def is_external(value: str | None) -> bool:
+    return bool(value) and value.strip().lower().startswith(EXTERNAL_PREFIXES)
+
+
+def sanitize_style(css: str):
+    css, imports = EXTERNAL_IMPORT_RE.subn("", css)
+    css, urls = EXTERNAL_URL_RE.subn("none", css)
+    return css, imports + urls
+
+
+def needs_sanitizing(text: str) -> bool:
+    return bool(UNSAFE_TAG_RE.search(text) or CSS_IMPORT_RE.search(text) or CSS_URL_RE.search(text))
+
+
+def start_tag_text(tag: str, attrs: list, void: bool = False) -> str:
+    parts = [tag]
+    for name, value in attrs:
+        parts.append(name if value is None else f'{name}="{html.escape(value, quote=True)}"')
+    return f"<{' '.join(parts)}{' /' if void else ''}>"
+
+
+def extract_title_description(generated_html: str):
+    project_title = DEFAULT_PROJECT_TITLE
+    project_description = DEFAULT_PROJECT_DESCRIPTION
+
+    title_match = TITLE_RE.search(generated_html)
+    if title_match:
+        project_title = title_match.group(1).strip()
+
+    description_match = DESCRIPTION_RE.search(generated_html) or PARAGRAPH_RE.search(generated_html)
+    if description_match:
+        project_description = description_match.group(1).strip()
+
+    return project_title, project_description
+
+
+class ProjectHtmlProcessor(HTMLParser):
+    def __init__(self, stylesheet: str | None = None):
+        super().__init__(convert_charrefs=False)
+        self.stylesheet = stylesheet
+        self.out = []
+        self.head = ""
+        self.tail = ""
+        self.skip_depth = 0
+        self.style_buffer = None
+        self.injected = stylesheet is None
+        self.finished = False
+        self.title_parts = None
+        self.title = None
+        self.description_parts = None
+        self.description = None
+        self.description_from_h1 = False
+        self.first_paragraph = None
+        self.after_h1 = False
+        self.found = {}
+        self.removed = 0
+        self.sanitizing = False
+        self.chunks = []
+        self.size = 0
+        self.window = ""
+
+    def feed(self, chunk: str):
+        self.found = {}
+        if self.head is not None:
+            chunk = self._strip_leading_fence(chunk)
+        if not chunk:
+            return self.found
+        if not self.sanitizing:
+            window = self.window + chunk
+            self.window = window[-FENCE_TAIL:]
+            self.chunks.append(chunk)
+            self.size += len(chunk)
+            if not needs_sanitizing(window):
+                self._scan_head(window)
+                return self.found
+            self.sanitizing = True
+            chunk, self.chunks = "".join(self.chunks), None
+        text = self.tail + chunk
+        self.tail = text[-FENCE_TAIL:]
+        super().feed(text[:-FENCE_TAIL])
+        return self.found
+
+    def close(self):
+        remaining = (self.head or "") + self.tail
+        self.head = None
+        if not self.sanitizing:
+            if not needs_sanitizing(remaining):
+                return self._close_clean("".join(self.chunks) + remaining)
+            remaining = "".join(self.chunks) + remaining
+            self.sanitizing = True
+        fence = remaining.rfind("```")
+        if fence != -1:
+            remaining = remaining[:fence]
+        super().feed(remaining)
+        super().close()
+        if self.style_buffer is not None:
+            self._emit_style()
+        if not self.injected:
+            self.out.insert(0, self._shared_style())
+            self.injected = True
+        return {
+            "html": "".join(self.out),
+            "title": self.title or DEFAULT_PROJECT_TITLE,
+            "description": self.description or self.first_paragraph or DEFAULT_PROJECT_DESCRIPTION,
+            "removed": self.removed,
+        }
+
+    def _scan_head(self, window: str):
+        if self.size > EARLY_SCAN_LIMIT or (self.title is not None and self.description is not None):
+            return
+        window = window.lower()
+        if (self.title is None and "</title" in window) or (self.description is None and "</p" in window):
+            text = "".join(self.chunks)
+            title_match = TITLE_RE.search(text) if self.title is None else None
+            if title_match:
+                self._found("title", title_match.group(1).strip())
+            description_match = DESCRIPTION_RE.search(text) if self.description is None else None
+            if description_match:
+                self._found("description", description_match.group(1).strip())
+
+    def _close_clean(self, text: str):
+        end = HTML_END_RE.search(text)
+        if end:
+            text = text[:end.end()]
+        else:
+            fence = text.rfind("```", -FENCE_TAIL)
+            if fence != -1:
+                text = text[:fence]
+        title, description = extract_title_description(text)
+        if not self.injected:
+            head = HEAD_TAG_RE.search(text)
+            body = None if head else BODY_TAG_RE.search(text)
+            position = head.end() if head else body.start() if body else 0
+            text = text[:position] + self._shared_style() + text[position:]
+            self.injected = True
+        return {"html": text, "title": title, "description": description, "removed": 0}
+
+    def _strip_leading_fence(self, chunk: str) -> str:
+        self.head += chunk
+        tag = self.head.find("<")
+        fence = self.head.find("```")
+        if fence != -1 and (tag == -1 or fence < tag):
+            newline = self.head.find("\n", fence)
+            if newline == -1:
+                return ""
+            self.head = self.head[newline + 1:]
+        elif tag == -1 and len(self.head) < FENCE_HEAD_LIMIT:
+            return ""
+        released, self.head = self.head, None
+        return released
+
+    def _shared_style(self) -> str:
+        return f"<style>{self.stylesheet}</style>"
+
+    def _emit(self, text: str):
+        if self.skip_depth or self.finished:
+            return
+        if self.style_buffer is not None:
+            self.style_buffer.append(text)
+            return
+        self.out.append(text)
+        if self.title_parts is not None:
+            self.title_parts.append(text)
+        if self.description_parts is not None:
+            self.description_parts.append(text)
+
+    def _emit_style(self):
+        css, removed = sanitize_style("".join(self.style_buffer))
+        self.removed += removed
+        self.style_buffer = None
+        self.out.append(css)
+
+    def _found(self, key: str, value: str):
+        setattr(self, key, value)
+        self.found[key] = value
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self.get_starttag_text())
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self.get_starttag_text(), void=True)
+
+    def _start(self, tag, attrs, text, void=False):
+        if self.skip_depth or self.finished:
+            if tag in SKIP_CONTENT_TAGS and not void:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_CONTENT_TAGS:
+            self.removed += 1
+            if not void:
+                self.skip_depth += 1
+            return
+        if tag in RESOURCE_TAGS and any(name in RESOURCE_ATTRS and is_external(value) for name, value in attrs):
+            self.removed += 1
+            return
+        removed = 0
+        cleaned = []
+        for name, value in attrs:
+            if name == "style" and value:
+                value, count = sanitize_style(value)
+                removed += count
+            cleaned.append((name, value))
+        if removed:
+            self.removed += removed
+            text = start_tag_text(tag, cleaned, void)
+
+        if tag == "body" and not self.injected:
+            self.out.append(self._shared_style())
+            self.injected = True
+        if self.after_h1 and tag != "p":
+            self.after_h1 = False
+
+        self._emit(text)
+
+        if tag == "head" and not self.injected:
+            self.out.append(self._shared_style())
+            self.injected = True
+        elif tag == "style" and not void:
+            self.style_buffer = []
+        elif tag == "title" and self.title is None:
+            self.title_parts = []
+        elif tag == "p" and self.description is None:
+            self.description_parts = []
+            self.description_from_h1 = self.after_h1
+            self.after_h1 = False
+
+    def handle_endtag(self, tag):
+        if self.finished:
+            return
+        if self.skip_depth:
+            if tag in SKIP_CONTENT_TAGS:
+                self.skip_depth -= 1
+            return
+        if tag in VOID_TAGS:
+            return
+
+        if tag == "style" and self.style_buffer is not None:
+            self._emit_style()
+        elif tag == "title" and self.title_parts is not None:
+            self._found("title", "".join(self.title_parts).strip())
+            self.title_parts = None
+        elif tag == "p" and self.description_parts is not None:
+            text = "".join(self.description_parts).strip()
+            self.description_parts = None
+            if self.description_from_h1:
+                self._found("description", text)
+            elif self.first_paragraph is None:
+                self.first_paragraph = text
+
+        self._emit(f"</{tag}>")
+
+        if tag == "h1":
+            self.after_h1 = True
+        elif tag == "html":
+            self.finished = True
+
+    def handle_data(self, data):
+        if self.after_h1 and data.strip():
+            self.after_h1 = False
+        self._emit(data)
+
+    def handle_entityref(self, name):
+        self._emit(f"&{name};")
+
+    def handle_charref(self, name):
+        self._emit(f"&#{name};")
+
+    def handle_comment(self, data):
+        pass
+
+    def handle_decl(self, decl):
+        self._emit(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self._emit(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self._emit(f"<![{data}]>")
+
+
+def process_project_html(generated_html: str, stylesheet: str | None = None):
+    processor = ProjectHtmlProcessor(stylesheet)
+    processor.feed(generated_html)
+    return processor.close()
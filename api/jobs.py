@@ -0,0 +1,308 @@
+import time
+import uuid
+import asyncio
+
+import httpx
+
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_ACTIVE = (JOB_QUEUED, JOB_RUNNING)
+
+JOB_LOST_ERROR = "Задача потеряна: процесс API был остановлен"
+JOB_PROGRESS_FIELDS = ("title", "description")
+CALLBACK_SCHEMES = ("http", "https")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InvalidCallbackUrlError(ValueError):
+    pass
+
+
+def check_callback_url(url: str, allowed_hosts) -> str:
+    parts = urlsplit(url)
+    if parts.scheme not in CALLBACK_SCHEMES or parts.username or parts.password:
+        raise InvalidCallbackUrlError("callback_url должен быть http(s)-адресом без учётных данных")
+    if not parts.hostname or parts.hostname.lower() not in allowed_hosts:
+        raise InvalidCallbackUrlError(f"Хост callback_url не разрешён: {parts.hostname}")
+    return url
+
+
+class Job:
+    def __init__(self, telegram_id: int, payload, callback_url: str | None = None, claim_id: str | None = None, request_id: str | None = None):
+        self.id = str(ObjectId())
+        self.request_id = request_id
+        self.telegram_id = telegram_id
+        self.payload = payload
+        self.callback_url = callback_url
+        self.claim_id = claim_id
+        self.status = JOB_QUEUED
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_change = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def update_progress(self, found: dict):
+        changed = {key: value for key, value in found.items() if key in JOB_PROGRESS_FIELDS and self.progress.get(key) != value}
+        self.progress.update(found)
+        if changed and self.on_change:
+            self.on_change(self, {f"progress.{key}": value for key, value in changed.items()})
+
+    def public(self):
+        result = self.result or {}
+        return {
+            "job_id": self.id,
+            "telegram_id": self.telegram_id,
+            "status": self.status,
+            "project_id": result.get("project_id"),
+            "title": result.get("title", self.progress.get("title")),
+            "description": result.get("description", self.progress.get("description")),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_document(self, owner: str) -> dict:
+        return {
+            "_id": self.id,
+            "telegram_id": self.telegram_id,
+            "claim_id": self.claim_id,
+            "request_id": self.request_id,
+            "owner": owner,
+            "status": self.status,
+            "progress": {key: self.progress[key] for key in JOB_PROGRESS_FIELDS if key in self.progress},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "heartbeat_at": datetime.now(timezone.utc),
+        }
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "Job":
+        job = cls(doc["telegram_id"], None, claim_id=doc.get("claim_id"), request_id=doc.get("request_id"))
+        job.id = doc["_id"]
+        job.status = doc["status"]
+        job.progress = dict(doc.get("progress") or {})
+        job.result = doc.get("result")
+        job.error = doc.get("error")
+        job.created_at = doc.get("created_at")
+        job.started_at = doc.get("started_at")
+        job.finished_at = doc.get("finished_at")
+        return job
+
+
+class JobQueue:
+    def __init__(self, handler, concurrency: int = 2, max_queue: int = 100, result_ttl: float = 3600.0, callback_timeout: float = 10.0, collection=None, heartbeat_interval: float = 10.0, lost_after: float = 60.0, on_lost=None, callback_hosts=frozenset()):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.result_ttl = result_ttl
+        self.callback_timeout = callback_timeout
+        self.collection = collection
+        self.heartbeat_interval = heartbeat_interval
+        self.lost_after = lost_after
+        self.on_lost = on_lost
+        self.callback_hosts = frozenset(host.lower() for host in callback_hosts)
+        self.owner = uuid.uuid4().hex
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.jobs = {}
+        self.active_by_user = {}
+        self.workers = []
+        self.heartbeat = None
+        self.pending_writes = set()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.lost = 0
+
+    async def start(self):
+        if self.collection is not None:
+            await self.collection().create_index([("telegram_id", 1), ("created_at", -1)], name="telegram_id_created_at")
+            await self.collection().create_index([("status", 1), ("heartbeat_at", 1)], name="status_heartbeat_at")
+            await self.collection().create_index("expires_at", name="expires_at", expireAfterSeconds=0)
+            await self.reap_lost()
+            self.heartbeat = asyncio.create_task(self._heartbeat())
+        for _ in range(self.concurrency):
+            self.workers.append(asyncio.create_task(self._worker()))
+
+    async def stop(self):
+        tasks = self.workers + ([self.heartbeat] if self.heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.heartbeat = None
+        if self.pending_writes:
+            await asyncio.gather(*self.pending_writes, return_exceptions=True)
+        if self.collection is not None:
+            for job in [job for job in self.jobs.values() if not job.finished]:
+                await self._fail_lost({"_id": job.id, "telegram_id": job.telegram_id, "claim_id": job.claim_id, "owner": self.owner})
+
+    async def get(self, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        if job is not None or self.collection is None:
+            return job
+        doc = await self.collection().find_one({"_id": job_id})
+        return Job.from_document(doc) if doc else None
+
+    async def active_job_for(self, telegram_id: int) -> Job | None:
+        job_id = self.active_by_user.get(telegram_id)
+        if job_id:
+            return self.jobs.get(job_id)
+        if self.collection is None:
+            return None
+        doc = await self.collection().find_one({"telegram_id": telegram_id, "status": {"$in": list(JOB_ACTIVE)}})
+        return Job.from_document(doc) if doc else None
+
+    async def latest_job_for(self, telegram_id: int) -> Job | None:
+        active = await self.active_job_for(telegram_id)
+        if active is not None or self.collection is None:
+            return active
+        doc = await self.collection().find_one({"telegram_id": telegram_id}, sort=[("created_at", -1)])
+        return Job.from_document(doc) if doc else None
+
+    async def submit(self, job: Job) -> Job:
+        self._prune()
+        if self.queue.full():
+            self.rejected += 1
+            raise QueueFullError()
+        if self.collection is not None:
+            await self.collection().insert_one(job.to_document(self.owner))
+            job.on_change = self._persist_later
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            if self.collection is not None:
+                await self.collection().delete_one({"_id": job.id})
+            raise QueueFullError()
+        self.jobs[job.id] = job
+        self.active_by_user[job.telegram_id] = job.id
+        return job
+
+    def _prune(self):
+        expired_before = time.time() - self.result_ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.finished and job.finished_at < expired_before]:
+            del self.jobs[job_id]
+
+    async def _persist(self, job: Job, fields: dict):
+        if self.collection is None:
+            return
+        try:
+            await self.collection().update_one({"_id": job.id, "owner": self.owner}, {"$set": {**fields, "heartbeat_at": datetime.now(timezone.utc)}})
+        except Exception as e:
+            print(f"Не удалось сохранить состояние задачи {job.id}: {e}")
+
+    def _persist_later(self, job: Job, fields: dict):
+        task = asyncio.create_task(self._persist(job, fields))
+        self.pending_writes.add(task)
+        task.add_done_callback(self.pending_writes.discard)
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.collection().update_many(
+                    {"owner": self.owner, "status": {"$in": list(JOB_ACTIVE)}},
+                    {"$set": {"heartbeat_at": datetime.now(timezone.utc)}},
+                )
+                await self.reap_lost()
+            except Exception as e:
+                print(f"Ошибка heartbeat очереди задач: {e}")
+
+    async def reap_lost(self):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.lost_after)
+        async for doc in self.collection().find({"status": {"$in": list(JOB_ACTIVE)}, "heartbeat_at": {"$lt": cutoff}}):
+            await self._fail_lost(doc, {"heartbeat_at": {"$lt": cutoff}})
+
+    async def _fail_lost(self, doc: dict, condition: dict | None = None):
+        now = time.time()
+        failed = await self.collection().find_one_and_update(
+            {"_id": doc["_id"], "status": {"$in": list(JOB_ACTIVE)}, **(condition or {"owner": doc["owner"]})},
+            {"$set": {
+                "status": JOB_FAILED,
+                "error": JOB_LOST_ERROR,
+                "finished_at": now,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.result_ttl),
+            }},
+        )
+        if failed is None:
+            return
+        self.lost += 1
+        if self.on_lost:
+            await self.on_lost(failed["telegram_id"], failed.get("claim_id"))
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            self.running += 1
+            await self._persist(job, {"status": JOB_RUNNING, "started_at": job.started_at})
+            try:
+                job.result = await self.handler(job)
+                job.status = JOB_DONE
+                self.completed += 1
+            except Exception as e:
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status = JOB_FAILED
+                self.failed += 1
+                print(f"Ошибка при выполнении задачи {job.id}: {job.error}")
+            finally:
+                job.finished_at = time.time()
+                self.running -= 1
+                if self.active_by_user.get(job.telegram_id) == job.id:
+                    del self.active_by_user[job.telegram_id]
+                self.queue.task_done()
+            await self._persist(job, {
+                "status": job.status,
+                "result": job.result,
+                "error": job.error,
+                "finished_at": job.finished_at,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.result_ttl),
+            })
+            if job.callback_url:
+                await self._notify(job)
+
+    async def _notify(self, job: Job):
+        try:
+            check_callback_url(job.callback_url, self.callback_hosts)
+        except InvalidCallbackUrlError as e:
+            print(f"Callback для задачи {job.id} не отправлен: {e}")
+            return
+        try:
+            async with httpx.AsyncClient(timeout=self.callback_timeout) as client:
+                await client.post(job.callback_url, json=job.public())
+        except httpx.HTTPError as e:
+            print(f"Не удалось отправить callback для задачи {job.id}: {e}")
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "max_queue": self.queue.maxsize,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "lost": self.lost,
+        }
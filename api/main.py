@@ -1,34 +1,237 @@
 import os
 import asyncio
-import re 
+import secrets
+
+from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from google import genai
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from starlette.responses import FileResponse
-from motor.motor_asyncio import AsyncIOMotorClient
-from fastapi import FastAPI, HTTPException, Response, status 
-from datetime import datetime
+from typing import Optional, Dict, Any, List
+from starlette.responses import StreamingResponse
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, status 
+from datetime import datetime, timedelta
 from urllib.parse import quote
-from weasyprint import HTML 
 from bson import ObjectId 
+from pymongo import ReturnDocument, UpdateOne, ASCENDING, DESCENDING
+from generation_cache import GenerationCache, CACHE_MODES, settings_version
+from jobs import Job, JobQueue, QueueFullError, InvalidCallbackUrlError, check_callback_url, JOB_DONE
+from renderer import PdfRenderer
+from html_processing import ProjectHtmlProcessor, shared_stylesheet, TEMPLATES_DIR
+from project_template import ProjectContent, InvalidProjectContentError, GENERATION_OUTPUTS, render_project_content
+from storage import create_blob_store, iterate_file, BlobNotFoundError
+from pagination import encode_history_cursor, decode_history_cursor, InvalidCursorError
+from byte_ranges import parse_range_header
+from singleflight import SingleFlight
+from model_limiter import ModelRateLimiter, UserQuotaExceededError, estimate_tokens
+from providers import create_provider, MODEL_PROVIDERS
+from resources import Resources
+from retention import RetentionService
+from telemetry import (
+    MongoCommandMetrics, enable_tracing, shutdown_tracing, install_http_middleware, metrics_payload, gauge_from, counter_from,
+    stage, generation_stage_seconds, generations_in_flight, request_id_var
+)
 
 load_dotenv()
 
 MONGO_DB = os.getenv("MONGO_DB")
+MONGO_DATABASE = os.getenv("MONGO_DATABASE", "PracticeBot")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+RESOURCE_WARMUP = os.getenv("RESOURCE_WARMUP", "1") == "1"
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-client = genai.Client()
-model_id = "gemini-2.5-flash"
+MODEL_PROVIDER = os.getenv("MODEL_PROVIDER", "gemini")
+MODEL_ID = os.getenv("MODEL_ID", "gemini-2.5-flash")
+GEMINI_STREAMING = os.getenv("GEMINI_STREAMING", "1") == "1"
+PROJECT_SHARED_STYLESHEET = os.getenv("PROJECT_SHARED_STYLESHEET", "1") == "1"
+GENERATION_OUTPUT = os.getenv("GENERATION_OUTPUT", "html")
+
+if GENERATION_OUTPUT not in GENERATION_OUTPUTS:
+    raise ValueError(f"Неизвестный GENERATION_OUTPUT: {GENERATION_OUTPUT}")
+MODEL_RECORD_DIR = os.getenv("MODEL_RECORD_DIR") or None
+MODEL_FIXTURE_DIR = os.getenv("MODEL_FIXTURE_DIR", os.path.join("..", "api", "db", "fixtures"))
+STUB_MODEL_LATENCY = float(os.getenv("STUB_MODEL_LATENCY", "1"))
+STUB_MODEL_SIZE = int(os.getenv("STUB_MODEL_SIZE", "30000"))
+STUB_MODEL_ERROR_RATE = float(os.getenv("STUB_MODEL_ERROR_RATE", "0"))
+
+if MODEL_PROVIDER not in MODEL_PROVIDERS:
+    raise ValueError(f"Неизвестный MODEL_PROVIDER: {MODEL_PROVIDER}")
+
+def build_provider():
+    return create_provider(
+        MODEL_PROVIDER,
+        model_id=MODEL_ID,
+        streaming=GEMINI_STREAMING,
+        record_dir=MODEL_RECORD_DIR,
+        fixture_dir=MODEL_FIXTURE_DIR,
+        latency=STUB_MODEL_LATENCY,
+        size=STUB_MODEL_SIZE,
+        error_rate=STUB_MODEL_ERROR_RATE,
+    )
+
+MODEL_RPM = int(os.getenv("MODEL_RPM", "60"))
+MODEL_TPM = int(os.getenv("MODEL_TPM", "1000000"))
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", "4"))
+MODEL_USER_QUOTA = int(os.getenv("MODEL_USER_QUOTA", "0"))
+MODEL_USER_QUOTA_WINDOW = float(os.getenv("MODEL_USER_QUOTA_WINDOW", "3600"))
+MODEL_RETRIES = int(os.getenv("MODEL_RETRIES", "3"))
+MODEL_RETRY_BACKOFF = float(os.getenv("MODEL_RETRY_BACKOFF", "1"))
+MODEL_ESTIMATED_RESPONSE_TOKENS = int(os.getenv("MODEL_ESTIMATED_RESPONSE_TOKENS", "8000"))
+
+model_limiter = ModelRateLimiter(
+    requests_per_minute=MODEL_RPM,
+    tokens_per_minute=MODEL_TPM,
+    concurrency=MODEL_CONCURRENCY,
+    user_quota=MODEL_USER_QUOTA,
+    user_quota_window=MODEL_USER_QUOTA_WINDOW,
+    retries=MODEL_RETRIES,
+    backoff=MODEL_RETRY_BACKOFF,
+)
+
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "0") == "1"
+if OTEL_ENABLED:
+    enable_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await resources.startup(warmup=RESOURCE_WARMUP, warmup_renderer=PDF_RENDER_WARMUP)
+    await ensure_indexes()
+    await job_queue.start()
+    await retention.start()
+    try:
+        yield
+    finally:
+        await retention.stop()
+        await job_queue.stop()
+        await resources.shutdown()
+        shutdown_tracing()
 
-mongo_client = AsyncIOMotorClient(MONGO_DB)
-db = mongo_client.get_database("PracticeBot")
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+install_http_middleware(app)
+
+USERS_BATCH_LIMIT = int(os.getenv("USERS_BATCH_LIMIT", "1000"))
+MIGRATE_LEGACY_PROJECTS = os.getenv("MIGRATE_LEGACY_PROJECTS", "1") == "1"
+PROJECT_HISTORY_PAGE_SIZE = int(os.getenv("PROJECT_HISTORY_PAGE_SIZE", "5"))
+PROJECT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("PROJECT_HISTORY_MAX_PAGE_SIZE", "50"))
 
 BASE_PROJECT_DIR = os.path.join("..", "api", "db")
 
+BLOB_STORE = os.getenv("BLOB_STORE", "local")
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join(BASE_PROJECT_DIR, "blobs"))
+GRIDFS_BUCKET = os.getenv("GRIDFS_BUCKET", "pdfs")
+
+
+def build_blob_store(db):
+    return create_blob_store(BLOB_STORE, db=db, root=BLOB_STORE_DIR, bucket_name=GRIDFS_BUCKET)
+
+
+GENERATION_CACHE_MODE = os.getenv("GENERATION_CACHE_MODE", "off")
+GENERATION_CACHE_VARIANTS = int(os.getenv("GENERATION_CACHE_VARIANTS", "3"))
+GENERATION_CACHE_MAX_AGE = float(os.getenv("GENERATION_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+GENERATION_CACHE_MAX_BYTES = int(os.getenv("GENERATION_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+GENERATION_CACHE_DIR = os.getenv("GENERATION_CACHE_DIR", os.path.join(BASE_PROJECT_DIR, "cache"))
+GENERATION_CACHE_SCAN_INTERVAL = float(os.getenv("GENERATION_CACHE_SCAN_INTERVAL", "600"))
+
+if GENERATION_CACHE_MODE not in CACHE_MODES:
+    raise ValueError(f"Неизвестный режим GENERATION_CACHE_MODE: {GENERATION_CACHE_MODE}")
+
+
+PROJECT_JOB_CONCURRENCY = int(os.getenv("PROJECT_JOB_CONCURRENCY", "2"))
+PROJECT_JOB_MAX_QUEUE = int(os.getenv("PROJECT_JOB_MAX_QUEUE", "100"))
+PROJECT_JOB_RESULT_TTL = float(os.getenv("PROJECT_JOB_RESULT_TTL", "3600"))
+PROJECT_JOB_RETRY_AFTER = int(os.getenv("PROJECT_JOB_RETRY_AFTER", "30"))
+PROJECT_JOB_HEARTBEAT_INTERVAL = float(os.getenv("PROJECT_JOB_HEARTBEAT_INTERVAL", "10"))
+PROJECT_JOB_LOST_AFTER = float(os.getenv("PROJECT_JOB_LOST_AFTER", "60"))
+PROJECT_JOB_CALLBACK_HOSTS = {host.strip().lower() for host in os.getenv("PROJECT_JOB_CALLBACK_HOSTS", "").split(",") if host.strip()}
+
+SINGLEFLIGHT_SHARE_PROMPTS = os.getenv("SINGLEFLIGHT_SHARE_PROMPTS", "0") == "1"
+GENERATION_CLAIM_TTL = float(os.getenv("GENERATION_CLAIM_TTL", "900"))
+GENERATION_PENDING = "pending"
+GENERATION_CLAIM_FIELDS = {"generation_status": "", "generation_claim_id": "", "generation_claimed_at": ""}
+
+user_flights = SingleFlight()
+prompt_flights = SingleFlight()
+
+PDF_RENDER_BACKEND = os.getenv("PDF_RENDER_BACKEND", "process")
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "0")) or None
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "120"))
+PDF_RENDER_MAX_TASKS_PER_WORKER = int(os.getenv("PDF_RENDER_MAX_TASKS_PER_WORKER", "50"))
+PDF_RENDER_MEMORY_LIMIT_MB = int(os.getenv("PDF_RENDER_MEMORY_LIMIT_MB", "1024"))
+PDF_RENDER_WARMUP = os.getenv("PDF_RENDER_WARMUP", "1") == "1"
+PDF_PRESET = os.getenv("PDF_PRESET", "balanced")
+
+renderer = PdfRenderer(
+    backend=PDF_RENDER_BACKEND,
+    workers=PDF_RENDER_WORKERS,
+    timeout=PDF_RENDER_TIMEOUT,
+    max_tasks_per_worker=PDF_RENDER_MAX_TASKS_PER_WORKER,
+    memory_limit_mb=PDF_RENDER_MEMORY_LIMIT_MB,
+    preset=PDF_PRESET,
+)
+background_tasks = set()
+
+generation_cache = GenerationCache(
+    GENERATION_CACHE_DIR,
+    variants=GENERATION_CACHE_VARIANTS,
+    max_age=GENERATION_CACHE_MAX_AGE,
+    max_bytes=GENERATION_CACHE_MAX_BYTES,
+    version=settings_version(
+        {
+            "output": GENERATION_OUTPUT,
+            "pdf_preset": PDF_PRESET,
+            "shared_stylesheet": PROJECT_SHARED_STYLESHEET,
+            "provider": MODEL_PROVIDER,
+            "model": MODEL_ID,
+        },
+        paths=[os.path.join(TEMPLATES_DIR, name) for name in ("project.css", "project.html")],
+    ),
+    scan_interval=GENERATION_CACHE_SCAN_INTERVAL,
+)
+refilling_cache_keys = set()
+
+resources = Resources(
+    MONGO_DB,
+    MONGO_DATABASE,
+    {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    },
+    provider_factory=build_provider,
+    blob_store_factory=build_blob_store,
+    renderer=renderer,
+    event_listeners=[MongoCommandMetrics()],
+)
+
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+PDF_MAX_AGE_DAYS = float(os.getenv("PDF_MAX_AGE_DAYS", "0"))
+PDF_USER_QUOTA_MB = float(os.getenv("PDF_USER_QUOTA_MB", "0"))
+PDF_TOTAL_QUOTA_MB = float(os.getenv("PDF_TOTAL_QUOTA_MB", "0"))
+PDF_ORPHAN_GRACE = float(os.getenv("PDF_ORPHAN_GRACE", "3600"))
+RETENTION_LEASE_TTL = float(os.getenv("RETENTION_LEASE_TTL", "900"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+
+retention = RetentionService(
+    resources,
+    interval=RETENTION_INTERVAL,
+    max_age_days=PDF_MAX_AGE_DAYS,
+    user_quota_bytes=int(PDF_USER_QUOTA_MB * 1024 * 1024),
+    total_quota_bytes=int(PDF_TOTAL_QUOTA_MB * 1024 * 1024),
+    orphan_grace=PDF_ORPHAN_GRACE,
+    legacy_root=BASE_PROJECT_DIR,
+    lease_ttl=RETENTION_LEASE_TTL,
+)
+
 class UserData(BaseModel):
     telegram_id: int
     username: str | None = None
@@ -40,6 +243,22 @@ class UserData(BaseModel):
     specialization: str | None = None
     current_project_id: str | None = None
 
+class UserProfile(UserData):
+    current_project_status: str | None = None
+    current_project_title: str | None = None
+    current_project_description: str | None = None
+    current_project_blob_id: str | None = None
+    current_project_telegram_file_id: str | None = None
+
+USER_PROJECTION = {field: 1 for field in UserData.model_fields if field != "telegram_id"}
+PROJECT_SUMMARY_PROJECTION = {"status": 1, "title": 1, "description": 1, "blob_id": 1, "telegram_file_id": 1}
+PROJECT_PDF_PROJECTION = {"blob_id": 1, "pdf_name": 1, "title": 1, "description": 1}
+PROJECT_HISTORY_PROJECTION = {"title": 1, "description": 1, "status": 1, "created_at": 1}
+LEGACY_PROJECT_FIELDS = (
+    "status", "pdf_name", "pdf_path", "blob_id", "pdf_size", "title", "description",
+    "profession", "level", "specialization", "telegram_file_id", "created_at",
+)
+
 class UserLanguageUpdate(BaseModel):
     language_code: str
 
@@ -67,56 +286,172 @@ class ProjectRequestData(BaseModel):
     specialization: str
     language_code: str
 
-async def getUser(user_id: int):
-    users_collection = db.users
-    user = await users_collection.find_one({"_id": user_id})
+class UsersBatchGetRequest(BaseModel):
+    telegram_ids: List[int] = Field(..., max_length=USERS_BATCH_LIMIT)
+
+class UsersBulkUpsertRequest(BaseModel):
+    users: List[UserData] = Field(..., max_length=USERS_BATCH_LIMIT)
+
+class ProjectHistoryItem(BaseModel):
+    project_id: str
+    title: str | None = None
+    description: str | None = None
+    status: str | None = None
+    created_at: datetime | None = None
+
+class ProjectHistoryPage(BaseModel):
+    items: List[ProjectHistoryItem]
+    next_cursor: str | None = None
+
+class ProjectTelegramFileUpdate(BaseModel):
+    telegram_file_id: str
+
+class ProjectJobRequestData(ProjectRequestData):
+    callback_url: Optional[str] = None
+
+async def getUser(user_id: int, projection: Dict[str, int] | None = None):
+    users_collection = resources.db.users
+    user = await users_collection.find_one({"_id": user_id}, projection=projection)
     return user
 
+def parse_project_id(project_id: str) -> ObjectId | None:
+    return ObjectId(project_id) if ObjectId.is_valid(project_id) else None
+
+def profile_from_documents(user: Dict[str, Any], project: Dict[str, Any] | None) -> UserProfile:
+    user["telegram_id"] = user["_id"]
+    if project:
+        user.update({
+            "current_project_status": project.get("status"),
+            "current_project_title": project.get("title"),
+            "current_project_description": project.get("description"),
+            "current_project_blob_id": project.get("blob_id"),
+            "current_project_telegram_file_id": project.get("telegram_file_id"),
+        })
+    return UserProfile(**user)
+
+async def buildUserProfile(user: Dict[str, Any]) -> UserProfile:
+    project = None
+    project_id = parse_project_id(user.get("current_project_id") or "")
+    if project_id:
+        project = await resources.db.projects.find_one({"_id": project_id}, projection=PROJECT_SUMMARY_PROJECTION)
+    return profile_from_documents(user, project)
+
 async def updateUser(telegram_id: int, update_data: Dict[str, Any]):
-    users_collection = db.users
+    users_collection = resources.db.users
     result = await users_collection.update_one(
         {"_id": telegram_id},
         update_data
     )
 
+async def updateUserAndGet(telegram_id: int, update_data: Dict[str, Any]):
+    users_collection = resources.db.users
+    user = await users_collection.find_one_and_update(
+        {"_id": telegram_id},
+        update_data,
+        projection=USER_PROJECTION,
+        return_document=ReturnDocument.AFTER
+    )
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+    return await buildUserProfile(user)
+
 @app.post("/users", status_code=status.HTTP_200_OK)
 async def create_user(user: UserData):
-    users_collection = db.users
+    users_collection = resources.db.users
 
     user_data_dict = user.model_dump(exclude_unset=True)
     user_data_dict["_id"] = user.telegram_id 
     
-    result = await users_collection.update_one(
+    user_doc = await users_collection.find_one_and_update(
         {"_id": user.telegram_id}, 
         {"$set": user_data_dict},
-        upsert=True
+        upsert=True,
+        projection=USER_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
-    
-    return {"message": "Пользователь создан или обновлен", "telegram_id": user.telegram_id}
 
+    return {"message": "Пользователь создан или обновлен", "telegram_id": user.telegram_id, "user": await buildUserProfile(user_doc)}
+
+
+@app.post("/users:batchGet")
+async def batch_get_users(batch: UsersBatchGetRequest):
+    telegram_ids = list(dict.fromkeys(batch.telegram_ids))
+    user_docs = await resources.db.users.find({"_id": {"$in": telegram_ids}}, projection=USER_PROJECTION).to_list(length=None)
+
+    project_ids = [parse_project_id(user.get("current_project_id") or "") for user in user_docs]
+    projects = {}
+    if any(project_ids):
+        async for project in resources.db.projects.find({"_id": {"$in": [project_id for project_id in project_ids if project_id]}}, projection=PROJECT_SUMMARY_PROJECTION):
+            projects[project["_id"]] = project
+
+    users = [profile_from_documents(user, projects.get(project_id)) for user, project_id in zip(user_docs, project_ids)]
+    found = {user.telegram_id for user in users}
+    return {"users": users, "missing": [telegram_id for telegram_id in telegram_ids if telegram_id not in found]}
 
-@app.get("/users/{telegram_id}", response_model=UserData)
+
+@app.post("/users:bulkUpsert")
+async def bulk_upsert_users(batch: UsersBulkUpsertRequest):
+    if not batch.users:
+        return {"matched": 0, "modified": 0, "upserted": 0}
+
+    operations = [
+        UpdateOne({"_id": user.telegram_id}, {"$set": user.model_dump(exclude_unset=True)}, upsert=True)
+        for user in batch.users
+    ]
+    result = await resources.db.users.bulk_write(operations, ordered=False)
+    return {"matched": result.matched_count, "modified": result.modified_count, "upserted": result.upserted_count}
+
+
+@app.get("/users/{telegram_id}", response_model=UserProfile)
 async def get_user_data(telegram_id: int):
-    user = await getUser(telegram_id)
+    user = await getUser(telegram_id, projection=USER_PROJECTION)
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
 
-    user['telegram_id'] = user['_id']
-    return UserData(**user)
+    return await buildUserProfile(user)
+
+
+@app.get("/users/{telegram_id}/projects", response_model=ProjectHistoryPage)
+async def get_user_projects(
+    telegram_id: int,
+    limit: int = Query(PROJECT_HISTORY_PAGE_SIZE, ge=1, le=PROJECT_HISTORY_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    query = {"telegram_id": telegram_id}
+    if cursor:
+        try:
+            query.update(decode_history_cursor(cursor))
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    projects = await resources.db.projects.find(query, projection=PROJECT_HISTORY_PROJECTION) \
+        .sort([("created_at", DESCENDING), ("_id", DESCENDING)]) \
+        .limit(limit + 1) \
+        .to_list(length=limit + 1)
+
+    page = projects[:limit]
+    next_cursor = None
+    if len(projects) > limit and page[-1].get("created_at"):
+        next_cursor = encode_history_cursor(page[-1])
+
+    return ProjectHistoryPage(
+        items=[ProjectHistoryItem(project_id=str(project.pop("_id")), **project) for project in page],
+        next_cursor=next_cursor
+    )
 
     
 @app.patch("/users/{telegram_id}/language", status_code=status.HTTP_200_OK)
 async def update_user_language(telegram_id: int, lang_update: UserLanguageUpdate):
-    await updateUser(
+    user = await updateUserAndGet(
         telegram_id,
         {"$set": {"language_code": lang_update.language_code}}
     )
-    return {"message": "Попытка обновления языка пользователя завершена"}
+    return {"message": "Попытка обновления языка пользователя завершена", "user": user}
 
 @app.patch("/users/{telegram_id}/profession_level", status_code=status.HTTP_200_OK)
 async def update_profession_level(telegram_id: int, profession_level: UserUpdateProfessionLevel):
-    await updateUser(
+    user = await updateUserAndGet(
         telegram_id,
         {"$set": {
             "profession": profession_level.profession,
@@ -124,16 +459,11 @@ async def update_profession_level(telegram_id: int, profession_level: UserUpdate
             "specialization": profession_level.specialization
         }}
     )
-    return {"message": "Профессия и уровень пользователя обновлены"}
+    return {"message": "Профессия и уровень пользователя обновлены", "user": user}
 
 
-@app.post("/projects/get_project")
-async def get_project_for_user(request_data: ProjectRequestData):
-    user_data = await getUser(request_data.telegram_id)
-    if user_data and user_data.get("current_project_id"):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="У пользователя уже есть активный проект. Пожалуйста, завершите его, прежде чем брать новый.")
-    
-    prompt_text = (
+def build_prompt(request_data: ProjectRequestData) -> str:
+    return (
         f"Ты — опытный наставник по обучению. Мне нужен детальный план проекта для пользователя, который "
         f"выбрал профессию '{request_data.profession}', уровень '{request_data.level}', "
         f"и специализацию '{request_data.specialization}'. "
@@ -154,69 +484,545 @@ async def get_project_for_user(request_data: ProjectRequestData):
         f"Важно: HTML должен быть самодостаточным и не должен содержать внешних ссылок на CSS или JS."
     )
 
-    generated_html = ""
-    response = await client.aio.models.generate_content(
-    model=model_id,
-    contents=prompt_text,
-)
-    generated_html = response.text
-    
-    project_title = "Сгенерированный план проекта"
-    project_description = "Подробное описание проекта."
-    
-    title_match = re.search(r'<title>(.*?)</title>', generated_html, re.IGNORECASE | re.DOTALL)
-    if title_match:
-        project_title = title_match.group(1).strip()
-    
-    description_match = re.search(r'<h1>.*?</h1>\s*<p>(.*?)</p>', generated_html, re.IGNORECASE | re.DOTALL)
-    if description_match:
-        project_description = description_match.group(1).strip()
-    elif re.search(r'<p>(.*?)</p>', generated_html, re.IGNORECASE | re.DOTALL):
-        project_description = re.search(r'<p>(.*?)</p>', generated_html, re.IGNORECASE | re.DOTALL).group(1).strip()
+
+def build_structured_prompt(request_data: ProjectRequestData) -> str:
+    return (
+        f"Ты — опытный наставник по обучению. Мне нужен детальный план проекта для пользователя, который "
+        f"выбрал профессию '{request_data.profession}', уровень '{request_data.level}', "
+        f"и специализацию '{request_data.specialization}'. "
+        f"Язык проекта: '{request_data.language_code}'.\n\n"
+        f"Верни только JSON-объект (без HTML и оформления) со следующими полями, объём — примерно 5 страниц A4:\n"
+        f"1.  title: название проекта.\n"
+        f"2.  description: описание проекта — что нужно сделать, цель проекта.\n"
+        f"3.  tasks: подробный список задач, которые нужно выполнить, пошагово.\n"
+        f"4.  learn: необходимые технологии, инструменты, концепции.\n"
+        f"5.  resources: список ресурсов для изучения с полями title и type (документация, учебник, статья); без реальных URL.\n"
+        f"6.  success_criteria: как будет оцениваться выполнение проекта.\n"
+        f"7.  outcome: что пользователь получит после завершения проекта."
+    )
+
+
+async def call_structured_model(prompt_text: str, language_code: str):
+    text, usage = await resources.provider.generate(prompt_text, response_schema=ProjectContent)
+    with stage("extract"):
+        try:
+            processed = render_project_content(text, language_code)
+        except InvalidProjectContentError as e:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    return processed, usage
+
+
+async def call_model(prompt_text: str, on_progress=None):
+    processor = ProjectHtmlProcessor(shared_stylesheet() if PROJECT_SHARED_STYLESHEET else None)
+    chunks = asyncio.Queue()
+
+    async def process_chunks():
+        finished = False
+        while not finished:
+            batch = [await chunks.get()]
+            while not chunks.empty():
+                batch.append(chunks.get_nowait())
+            finished = batch[-1] is None
+            text = "".join(chunk for chunk in batch if chunk)
+            if text:
+                found = await asyncio.to_thread(processor.feed, text)
+                if found and on_progress:
+                    on_progress(found)
+        return await asyncio.to_thread(processor.close)
+
+    consumer = asyncio.create_task(process_chunks())
+    try:
+        _, usage = await resources.provider.generate(prompt_text, chunks.put_nowait)
+    except BaseException:
+        consumer.cancel()
+        raise
+    chunks.put_nowait(None)
+    with stage("extract"):
+        processed = await consumer
+    return processed, usage
 
 
+async def generate_html(request_data: ProjectRequestData, on_progress=None, background: bool = False):
+    if GENERATION_OUTPUT == "json":
+        prompt_text = build_structured_prompt(request_data)
+        model_call = lambda: call_structured_model(prompt_text, request_data.language_code)
+    else:
+        prompt_text = build_prompt(request_data)
+        model_call = lambda: call_model(prompt_text, on_progress)
+    try:
+        return await model_limiter.call(
+            model_call,
+            user_id=None if background else request_data.telegram_id,
+            estimated_tokens=estimate_tokens(prompt_text) + MODEL_ESTIMATED_RESPONSE_TOKENS,
+        )
+    except UserQuotaExceededError as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+
+
+async def generate_artifact(request_data: ProjectRequestData, on_progress=None, background: bool = False) -> Dict[str, Any]:
+    with stage("model"):
+        processed, usage = await generate_html(request_data, on_progress, background=background)
+
+    generated_html = processed["html"]
+    project_title, project_description = processed["title"], processed["description"]
+    if on_progress:
+        on_progress({"title": project_title, "description": project_description})
+
     pdf_file_binary = b""
     try:
-        pdf_file_binary = await asyncio.to_thread(HTML(string=generated_html).write_pdf)
+        with stage("render"):
+            pdf_file_binary = await renderer.render(generated_html, shared_css=GENERATION_OUTPUT == "json")
     except Exception as e:
         print(f"Ошибка при конвертации HTML в PDF: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка при создании PDF: {str(e)}")
 
+    return {
+        "html": generated_html,
+        "pdf": pdf_file_binary,
+        "title": project_title,
+        "description": project_description,
+        "usage": usage,
+    }
+
+
+def cache_key_for(request_data: ProjectRequestData) -> str:
+    return generation_cache.key_for(
+        request_data.profession,
+        request_data.level,
+        request_data.specialization,
+        request_data.language_code,
+        prompt=build_structured_prompt(request_data) if GENERATION_OUTPUT == "json" else build_prompt(request_data),
+    )
+
+
+async def refill_generation_cache(key: str, request_data: ProjectRequestData):
+    try:
+        while await generation_cache.count(key) < GENERATION_CACHE_VARIANTS:
+            artifact = await generate_artifact(request_data, background=True)
+            await generation_cache.put(key, artifact)
+    except Exception as e:
+        print(f"Ошибка при фоновом пополнении кэша генераций: {e}")
+    finally:
+        refilling_cache_keys.discard(key)
+
+
+def schedule_cache_refill(key: str, request_data: ProjectRequestData):
+    if key in refilling_cache_keys:
+        return
+    refilling_cache_keys.add(key)
+    task = asyncio.create_task(refill_generation_cache(key, request_data))
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def generate_shared_artifact(request_data: ProjectRequestData, on_progress=None) -> Dict[str, Any]:
+    if not SINGLEFLIGHT_SHARE_PROMPTS:
+        return await generate_artifact(request_data, on_progress)
+    return await prompt_flights.do(cache_key_for(request_data), lambda: generate_artifact(request_data, on_progress))
+
+
+async def get_generated_artifact(request_data: ProjectRequestData, on_progress=None) -> Dict[str, Any]:
+    if GENERATION_CACHE_MODE == "off":
+        return await generate_shared_artifact(request_data, on_progress)
+
+    key = cache_key_for(request_data)
+
+    if GENERATION_CACHE_MODE == "consume":
+        artifact = await generation_cache.take(key)
+        schedule_cache_refill(key, request_data)
+        if artifact is None:
+            artifact = await generate_shared_artifact(request_data, on_progress)
+        return artifact
+
+    if await generation_cache.count(key) < GENERATION_CACHE_VARIANTS:
+        artifact = await generate_shared_artifact(request_data, on_progress)
+        await generation_cache.put(key, artifact)
+        return artifact
+
+    artifact = await generation_cache.get(key)
+    if artifact is None:
+        artifact = await generate_shared_artifact(request_data, on_progress)
+    return artifact
 
-    new_project_id = ObjectId()
-    
-    user_project_dir = os.path.join(BASE_PROJECT_DIR, str(request_data.telegram_id))
-    os.makedirs(user_project_dir, exist_ok=True)
 
+@app.get("/healthz")
+async def get_liveness():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def get_readiness(response: Response):
+    checks = await resources.readiness(READINESS_TIMEOUT)
+    if not checks["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return checks
+
+
+@app.get("/metrics")
+async def get_metrics():
+    content, media_type = metrics_payload()
+    return Response(content=content, media_type=media_type)
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "generation_cache": {
+            "mode": GENERATION_CACHE_MODE,
+            "variants": GENERATION_CACHE_VARIANTS,
+            **generation_cache.stats(),
+        },
+        "project_jobs": job_queue.stats(),
+        "pdf_renderer": renderer.stats(),
+        "model": {**resources.provider.stats(), **model_limiter.stats()},
+        "resources": resources.stats(),
+        "retention": retention.stats(),
+        "singleflight": {
+            "users": user_flights.stats(),
+            "prompts": prompt_flights.stats(),
+        },
+    }
+
+
+async def create_project(request_data: ProjectRequestData, claim_id: str, on_progress=None) -> Dict[str, Any]:
+    with stage("artifact"):
+        artifact = await get_generated_artifact(request_data, on_progress)
+    pdf_file_binary = artifact["pdf"]
+    project_title = artifact["title"]
+    project_description = artifact["description"]
+
+    new_project_id = ObjectId()
     pdf_filename = f"project_{new_project_id}.pdf"
-    pdf_filepath = os.path.join(user_project_dir, pdf_filename)
 
     try:
-        with open(pdf_filepath, "wb") as f:
-            f.write(pdf_file_binary)
-    except IOError as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка при сохранении PDF на диск: {str(e)}")
-
-    project_info_for_user = {
-        "current_project_id": str(new_project_id),
-        "current_project_status": "in_progress",
-        "current_project_pdf_name": pdf_filename,
-        "current_project_pdf_path": pdf_filepath,
-        "current_project_title": project_title,
-        "current_project_description": project_description,
-        "current_project_profession": request_data.profession,
-        "current_project_level": request_data.level,
-        "current_project_specialization": request_data.specialization,
-        "current_project_created_at": datetime.now()
+        with stage("store"):
+            blob = await resources.blob_store.put(pdf_file_binary)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка при сохранении PDF в хранилище: {str(e)}")
+
+    project_doc = {
+        "_id": new_project_id,
+        "telegram_id": request_data.telegram_id,
+        "status": "in_progress",
+        "pdf_name": pdf_filename,
+        "blob_id": blob["blob_id"],
+        "pdf_size": blob["size"],
+        "title": project_title,
+        "description": project_description,
+        "profession": request_data.profession,
+        "level": request_data.level,
+        "specialization": request_data.specialization,
+        "language_code": request_data.language_code,
+        "model_usage": artifact.get("usage"),
+        "created_at": datetime.now()
+    }
+    with stage("db"):
+        await resources.db.projects.insert_one(project_doc)
+
+        result = await resources.db.users.update_one(
+            {"_id": request_data.telegram_id, "generation_claim_id": claim_id},
+            {"$set": {"current_project_id": str(new_project_id)}, "$unset": GENERATION_CLAIM_FIELDS}
+        )
+    if not result.matched_count:
+        await resources.db.projects.delete_one({"_id": new_project_id})
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Генерация проекта была прервана другим запросом")
+
+    return {
+        "project_id": str(new_project_id),
+        "title": project_title,
+        "description": project_description,
+        "pdf": pdf_file_binary,
+        "pdf_name": pdf_filename,
+        "blob_id": blob["blob_id"],
     }
 
-    await updateUser(
+
+async def claim_generation(telegram_id: int) -> str:
+    claim_id = str(ObjectId())
+    now = datetime.now()
+    claimed = await resources.db.users.find_one_and_update(
+        {
+            "_id": telegram_id,
+            "current_project_id": None,
+            "$or": [
+                {"generation_status": {"$ne": GENERATION_PENDING}},
+                {"generation_claimed_at": {"$lt": now - timedelta(seconds=GENERATION_CLAIM_TTL)}},
+            ],
+        },
+        {"$set": {"generation_status": GENERATION_PENDING, "generation_claim_id": claim_id, "generation_claimed_at": now}},
+        projection={"_id": 1},
+    )
+    if claimed:
+        return claim_id
+
+    user_data = await getUser(telegram_id, projection={"current_project_id": 1})
+    if not user_data:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+    if user_data.get("current_project_id"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="У пользователя уже есть активный проект. Пожалуйста, завершите его, прежде чем брать новый.")
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Проект для пользователя уже генерируется")
+
+
+async def release_generation(telegram_id: int, claim_id: str):
+    await resources.db.users.update_one(
+        {"_id": telegram_id, "generation_claim_id": claim_id},
+        {"$unset": GENERATION_CLAIM_FIELDS}
+    )
+
+
+async def run_claimed_generation(request_data: ProjectRequestData, claim_id: str, on_progress=None) -> Dict[str, Any]:
+    try:
+        with generations_in_flight.track_inprogress(), stage("total"):
+            return await create_project(request_data, claim_id, on_progress)
+    except BaseException:
+        await release_generation(request_data.telegram_id, claim_id)
+        raise
+
+
+async def generate_project_for_user(request_data: ProjectRequestData) -> Dict[str, Any]:
+    claim_id = await claim_generation(request_data.telegram_id)
+    return await run_claimed_generation(request_data, claim_id)
+
+
+async def run_project_job(job: Job) -> Dict[str, Any]:
+    request_id_var.set(job.request_id)
+    generation_stage_seconds.labels("queue_wait").observe(job.started_at - job.created_at)
+    project = await run_claimed_generation(job.payload, job.claim_id, on_progress=job.update_progress)
+    project.pop("pdf")
+    return project
+
+
+job_queue = JobQueue(
+    run_project_job,
+    concurrency=PROJECT_JOB_CONCURRENCY,
+    max_queue=PROJECT_JOB_MAX_QUEUE,
+    result_ttl=PROJECT_JOB_RESULT_TTL,
+    collection=lambda: resources.db.jobs,
+    heartbeat_interval=PROJECT_JOB_HEARTBEAT_INTERVAL,
+    lost_after=PROJECT_JOB_LOST_AFTER,
+    on_lost=release_generation,
+    callback_hosts=PROJECT_JOB_CALLBACK_HOSTS,
+)
+
+gauge_from("project_job_queue_depth", "Задачи генерации в очереди", lambda: job_queue.queue.qsize())
+gauge_from("project_jobs_running", "Задачи генерации в работе", lambda: job_queue.running)
+gauge_from("model_calls_in_flight", "Запросы к модели в работе", lambda: model_limiter.in_flight)
+gauge_from("model_calls_waiting", "Запросы к модели, ожидающие слота", lambda: model_limiter.waiting)
+counter_from("pdf_render_pool_restarts", "Перезапуски пула рендеринга PDF из-за таймаутов и падений воркеров", lambda: renderer.restarts)
+counter_from("pdf_render_retries", "Рендеры PDF, повторённые после перезапуска пула", lambda: renderer.retries)
+
+
+async def import_legacy_pdf(pdf_path: str) -> Dict[str, Any] | None:
+    try:
+        return await resources.blob_store.put_stream(iterate_file(pdf_path))
+    except FileNotFoundError:
+        print(f"PDF старого проекта не найден: {pdf_path}")
+        return None
+
+
+async def migrate_legacy_projects():
+    legacy_fields = {f"current_project_{field}": 1 for field in LEGACY_PROJECT_FIELDS}
+    async for user in resources.db.users.find({"current_project_title": {"$exists": True}}, projection={"current_project_id": 1, **legacy_fields}):
+        project_id = parse_project_id(user.get("current_project_id") or "")
+        if project_id:
+            project_doc = {field: user[f"current_project_{field}"] for field in LEGACY_PROJECT_FIELDS if f"current_project_{field}" in user}
+            await resources.db.projects.update_one(
+                {"_id": project_id},
+                {"$setOnInsert": {"telegram_id": user["_id"], **project_doc}},
+                upsert=True
+            )
+        await resources.db.users.update_one({"_id": user["_id"]}, {"$unset": {field: "" for field in legacy_fields}})
+
+    legacy_pdfs = {"pdf_path": {"$exists": True}, "blob_id": {"$exists": False}, "pdf_expired_at": {"$exists": False}}
+    async for project in resources.db.projects.find(legacy_pdfs, projection={"pdf_path": 1}):
+        blob = await import_legacy_pdf(project["pdf_path"])
+        update = {"blob_id": blob["blob_id"], "pdf_size": blob["size"]} if blob else {"pdf_expired_at": datetime.now()}
+        await resources.db.projects.update_one({"_id": project["_id"], "blob_id": {"$exists": False}}, {"$set": update})
+
+
+async def ensure_indexes():
+    await resources.db.projects.create_index([("telegram_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="telegram_id_created_at_id")
+    await resources.db.projects.create_index([("profession", ASCENDING), ("level", ASCENDING), ("specialization", ASCENDING)], name="profession_level_specialization")
+    await resources.db.projects.create_index([("created_at", ASCENDING), ("_id", ASCENDING)], name="created_at_id")
+    await resources.db.users.create_index([("current_project_id", ASCENDING)], name="current_project_id", sparse=True)
+    if MIGRATE_LEGACY_PROJECTS:
+        await migrate_legacy_projects()
+
+
+@app.post("/projects/get_project")
+async def get_project_for_user(request_data: ProjectRequestData):
+    project = await user_flights.do(request_data.telegram_id, lambda: generate_project_for_user(request_data))
+
+    return Response(content=project["pdf"], media_type="application/pdf", headers={
+        "X-Project-Title": quote(project["title"]),
+        "X-Project-Description": quote(project["description"]),
+        "X-Project-Id": project["project_id"]
+    })
+
+
+@app.post("/projects/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_project_job(request_data: ProjectJobRequestData, response: Response):
+    if request_data.callback_url:
+        try:
+            check_callback_url(request_data.callback_url, PROJECT_JOB_CALLBACK_HOSTS)
+        except InvalidCallbackUrlError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    active_job = await job_queue.active_job_for(request_data.telegram_id)
+    if active_job:
+        response.status_code = status.HTTP_200_OK
+        return active_job.public()
+
+    try:
+        claim_id = await claim_generation(request_data.telegram_id)
+    except HTTPException as e:
+        active_job = await job_queue.active_job_for(request_data.telegram_id)
+        if e.status_code == status.HTTP_409_CONFLICT and active_job:
+            response.status_code = status.HTTP_200_OK
+            return active_job.public()
+        raise
+
+    job = Job(
         request_data.telegram_id,
-        {"$set": project_info_for_user}
+        ProjectRequestData(**request_data.model_dump(exclude={"callback_url"})),
+        callback_url=request_data.callback_url,
+        claim_id=claim_id,
+        request_id=request_id_var.get(),
     )
-    
-    return Response(content=pdf_file_binary, media_type="application/pdf", headers={
-        "X-Project-Title": quote(project_title),
-        "X-Project-Description": quote(project_description),
-        "X-Project-Id": str(new_project_id)
+    try:
+        await job_queue.submit(job)
+    except QueueFullError:
+        await release_generation(request_data.telegram_id, claim_id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Очередь генерации переполнена. Попробуйте позже.",
+            headers={"Retry-After": str(PROJECT_JOB_RETRY_AFTER)},
+        )
+
+    return job.public()
+
+
+@app.get("/projects/jobs/{job_id}")
+async def get_project_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    return job.public()
+
+
+@app.get("/users/{telegram_id}/project_job")
+async def get_user_project_job(telegram_id: int):
+    job = await job_queue.latest_job_for(telegram_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    return job.public()
+
+
+@app.get("/projects/jobs/{job_id}/pdf")
+async def get_project_job_pdf(job_id: str, request: Request):
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задача не найдена")
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Проект еще не готов")
+
+    return await stream_blob(job.result["blob_id"], filename=job.result["pdf_name"], request=request, headers={
+        "X-Project-Title": quote(job.result["title"]),
+        "X-Project-Description": quote(job.result["description"]),
+        "X-Project-Id": job.result["project_id"]
+    })
+
+
+@app.get("/projects/{project_id}/pdf")
+async def get_project_pdf(project_id: str, request: Request):
+    object_id = parse_project_id(project_id)
+    project = await resources.db.projects.find_one({"_id": object_id}, projection=PROJECT_PDF_PROJECTION) if object_id else None
+    if not project or not project.get("blob_id"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+
+    return await stream_blob(project["blob_id"], filename=project.get("pdf_name"), request=request, headers={
+        "X-Project-Title": quote(project.get("title") or ""),
+        "X-Project-Description": quote(project.get("description") or ""),
+        "X-Project-Id": project_id
     })
+
+
+async def stream_blob(blob_id: str, filename: str | None = None, headers: Dict[str, str] | None = None, request: Request | None = None):
+    try:
+        size = await resources.blob_store.size(blob_id)
+    except BlobNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл не найден")
+
+    etag = f'"{blob_id}"'
+    response_headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=31536000, immutable",
+        **(headers or {}),
+    }
+    if filename:
+        response_headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    if request is not None:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=response_headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            byte_range = parse_range_header(range_header, size)
+            if byte_range is None:
+                raise HTTPException(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    detail="Некорректный диапазон",
+                    headers={"Content-Range": f"bytes */{size}"},
+                )
+            start, end = byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response_headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(
+                resources.blob_store.stream(blob_id, start=start, end=end),
+                status_code=status.HTTP_206_PARTIAL_CONTENT,
+                media_type="application/pdf",
+                headers=response_headers,
+            )
+
+    response_headers["Content-Length"] = str(size)
+    return StreamingResponse(resources.blob_store.stream(blob_id), media_type="application/pdf", headers=response_headers)
+
+
+@app.patch("/projects/{project_id}/telegram_file_id", status_code=status.HTTP_200_OK)
+async def update_project_telegram_file_id(project_id: str, file_update: ProjectTelegramFileUpdate):
+    object_id = parse_project_id(project_id)
+    if not object_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+
+    result = await resources.db.projects.update_one(
+        {"_id": object_id},
+        {"$set": {"telegram_file_id": file_update.telegram_file_id}}
+    )
+    if not result.matched_count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Проект не найден")
+    return {"message": "file_id проекта сохранен"}
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Служебные операции отключены: задайте ADMIN_TOKEN")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Неверный токен администратора")
+
+
+@app.post("/storage/retention", dependencies=[Depends(require_admin_token)])
+async def run_retention():
+    return await retention.run_once()
+
+
+@app.get("/blobs/{blob_id}")
+async def download_blob(blob_id: str, request: Request):
+    return await stream_blob(blob_id, request=request)
@@ -0,0 +1,185 @@
+import time
+import random
+import asyncio
+
+from collections import deque
+
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UserQuotaExceededError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Превышена квота генераций, повторите через {retry_after:.0f} с")
+        self.retry_after = retry_after
+
+
+def error_status_code(error: Exception) -> int | None:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def usage_from_metadata(metadata) -> dict:
+    prompt_tokens = getattr(metadata, "prompt_token_count", None) or 0
+    response_tokens = getattr(metadata, "candidates_token_count", None) or 0
+    total_tokens = getattr(metadata, "total_token_count", None) or prompt_tokens + response_tokens
+    return {"prompt_tokens": prompt_tokens, "response_tokens": response_tokens, "total_tokens": total_tokens}
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float | None = None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+                waited += delay
+                await self.sleep(delay)
+
+    def adjust(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class UserQuota:
+    def __init__(self, limit: int, window: float, prune_every: int = 1000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.prune_every = prune_every
+        self.clock = clock
+        self.calls = {}
+        self.checks = 0
+
+    def check(self, user_id):
+        self.checks += 1
+        if self.checks % self.prune_every == 0:
+            self.prune()
+        now = self.clock()
+        calls = self.calls.setdefault(user_id, deque())
+        while calls and calls[0] <= now - self.window:
+            calls.popleft()
+        if len(calls) >= self.limit:
+            raise UserQuotaExceededError(calls[0] + self.window - now)
+        calls.append(now)
+
+    def prune(self):
+        expired_before = self.clock() - self.window
+        for user_id in [user_id for user_id, calls in self.calls.items() if not calls or calls[-1] <= expired_before]:
+            del self.calls[user_id]
+
+
+class ModelRateLimiter:
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 1_000_000,
+        concurrency: int = 4,
+        user_quota: int = 0,
+        user_quota_window: float = 3600.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        clock=time.monotonic,
+        sleep=asyncio.sleep,
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock=clock, sleep=sleep)
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock, sleep=sleep)
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.user_quota = UserQuota(user_quota, user_quota_window, clock=clock) if user_quota else None
+        self.sleep = sleep
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.rejected = 0
+        self.throttled_seconds = 0.0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+
+    def _delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    async def call(self, fn, *, user_id=None, estimated_tokens: int = 0):
+        if self.user_quota and user_id is not None:
+            try:
+                self.user_quota.check(user_id)
+            except UserQuotaExceededError:
+                self.rejected += 1
+                raise
+
+        attempt = 0
+        while True:
+            self.waiting += 1
+            try:
+                await self.semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            try:
+                self.throttled_seconds += await self.requests.acquire(1)
+                self.throttled_seconds += await self.tokens.acquire(estimated_tokens)
+                self.in_flight += 1
+                self.calls += 1
+                try:
+                    result, usage = await fn()
+                finally:
+                    self.in_flight -= 1
+            except Exception as e:
+                if error_status_code(e) not in RETRYABLE_STATUS_CODES or attempt >= self.retries:
+                    self.failed += 1
+                    raise
+                self.retried += 1
+                print(f"Модель ответила ошибкой {error_status_code(e)}, повтор (попытка {attempt + 1})")
+            else:
+                self.tokens.adjust(usage["total_tokens"] - estimated_tokens)
+                self.prompt_tokens += usage["prompt_tokens"]
+                self.response_tokens += usage["response_tokens"]
+                return result, usage
+            finally:
+                self.semaphore.release()
+
+            await self.sleep(self._delay(attempt))
+            attempt += 1
+
+    def stats(self):
+        if self.user_quota:
+            self.user_quota.prune()
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+        }
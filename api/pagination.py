@@ -0,0 +1,24 @@
+from bson import ObjectId
+from datetime import datetime, timezone
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_history_cursor(project: dict) -> str:
+    created_at = project["created_at"]
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{round(created_at.timestamp() * 1000)}.{project['_id']}"
+
+
+def decode_history_cursor(cursor: str) -> dict:
+    millis, _, project_id = cursor.partition(".")
+    if not millis.isdigit() or not ObjectId.is_valid(project_id):
+        raise InvalidCursorError("Некорректный курсор")
+    created_at = datetime.fromtimestamp(int(millis) / 1000, timezone.utc)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": ObjectId(project_id)}},
+    ]}
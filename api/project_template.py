@@ -0,0 +1,77 @@
+import json
+
+from html import escape
+from functools import lru_cache
+from typing import List
+
+from pydantic import BaseModel, ValidationError
+
+from html_processing import TEMPLATES_DIR, DEFAULT_PROJECT_TITLE, DEFAULT_PROJECT_DESCRIPTION
+
+
+GENERATION_OUTPUTS = ("html", "json")
+
+SECTION_LABELS = {
+    "en": {"tasks": "Tasks", "learn": "What to learn", "resources": "Learning resources", "success_criteria": "Success criteria", "outcome": "Expected outcome"},
+    "ru": {"tasks": "Задачи проекта", "learn": "Что нужно изучить", "resources": "Ресурсы для изучения", "success_criteria": "Критерии успеха", "outcome": "Ожидаемый результат"},
+    "hy": {"tasks": "Նախագծի առաջադրանքներ", "learn": "Ինչ պետք է ուսումնասիրել", "resources": "Ուսումնական ռեսուրսներ", "success_criteria": "Հաջողության չափանիշներ", "outcome": "Ակնկալվող արդյունք"},
+}
+
+
+class ProjectResource(BaseModel):
+    title: str
+    type: str = ""
+
+
+class ProjectContent(BaseModel):
+    title: str
+    description: str
+    tasks: List[str]
+    learn: List[str]
+    resources: List[ProjectResource]
+    success_criteria: List[str]
+    outcome: str
+
+
+class InvalidProjectContentError(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def project_template():
+    from jinja2 import Environment, FileSystemLoader
+
+    environment = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=True, trim_blocks=True, lstrip_blocks=True)
+    return environment.get_template("project.html")
+
+
+def strip_json_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        fence = text.rfind("```")
+        if fence != -1:
+            text = text[:fence]
+    return text
+
+
+def parse_project_content(text: str) -> ProjectContent:
+    try:
+        return ProjectContent.model_validate(json.loads(strip_json_fence(text)))
+    except (ValueError, ValidationError) as e:
+        raise InvalidProjectContentError(f"Модель вернула некорректный JSON проекта: {e}")
+
+
+def render_project_content(text: str, language_code: str):
+    project = parse_project_content(text)
+    html = project_template().render(
+        project=project,
+        labels=SECTION_LABELS.get(language_code, SECTION_LABELS["en"]),
+        language_code=language_code,
+    )
+    return {
+        "html": html,
+        "title": escape(project.title.strip(), quote=False) or DEFAULT_PROJECT_TITLE,
+        "description": escape(project.description.strip(), quote=False) or DEFAULT_PROJECT_DESCRIPTION,
+        "removed": 0,
+    }
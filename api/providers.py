@@ -0,0 +1,165 @@
+import os
+import asyncio
+import hashlib
+import itertools
+
+from abc import ABC, abstractmethod
+from fake_model import FakeModelClient
+from generation_cache import write_file_atomic
+from model_limiter import estimate_tokens, usage_from_metadata
+
+
+MODEL_PROVIDERS = ("gemini", "fixture", "synthetic")
+
+
+class GenerationProvider(ABC):
+    name = "base"
+
+    @abstractmethod
+    async def generate(self, prompt: str, on_text=None, response_schema=None):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"provider": self.name}
+
+
+class GeminiProvider(GenerationProvider):
+    name = "gemini"
+
+    def __init__(self, client, model_id: str = "gemini-2.5-flash", streaming: bool = True, record_dir: str | None = None):
+        self.client = client
+        self.model_id = model_id
+        self.streaming = streaming
+        self.record_dir = record_dir
+        self.recorded = 0
+
+    async def generate(self, prompt: str, on_text=None, response_schema=None):
+        config = {"response_mime_type": "application/json", "response_schema": response_schema} if response_schema else None
+        if not self.streaming:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_id,
+                contents=prompt,
+                config=config,
+            )
+            if on_text and response.text:
+                on_text(response.text)
+            text, usage = response.text, usage_from_metadata(response.usage_metadata)
+        else:
+            chunks = []
+            usage_metadata = None
+            async for chunk in await self.client.aio.models.generate_content_stream(
+                model=self.model_id,
+                contents=prompt,
+                config=config,
+            ):
+                if chunk.usage_metadata:
+                    usage_metadata = chunk.usage_metadata
+                if not chunk.text:
+                    continue
+                chunks.append(chunk.text)
+                if on_text:
+                    on_text(chunk.text)
+            text, usage = "".join(chunks), usage_from_metadata(usage_metadata)
+
+        if self.record_dir:
+            await asyncio.to_thread(self._record, text, ".json" if response_schema else ".html")
+        return text, usage
+
+    def _record(self, text: str, extension: str):
+        os.makedirs(self.record_dir, exist_ok=True)
+        name = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        write_file_atomic(os.path.join(self.record_dir, f"{name}{extension}"), text.encode("utf-8"))
+        self.recorded += 1
+
+    async def close(self):
+        aclose = getattr(self.client.aio, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    def stats(self):
+        return {"provider": self.name, "model": self.model_id, "streaming": self.streaming, "recorded": self.recorded}
+
+
+class SyntheticProvider(GeminiProvider):
+    name = "synthetic"
+
+    def __init__(self, latency: float = 1.0, size: int = 30_000, chunk_size: int = 512, error_rate: float = 0.0, streaming: bool = True):
+        super().__init__(
+            FakeModelClient(latency=latency, size=size, chunk_size=chunk_size, error_rate=error_rate),
+            model_id="synthetic",
+            streaming=streaming,
+        )
+        self.latency = latency
+        self.size = size
+
+    def stats(self):
+        return {"provider": self.name, "latency": self.latency, "size": self.size, "streaming": self.streaming}
+
+
+class FixtureProvider(GenerationProvider):
+    name = "fixture"
+
+    def __init__(self, directory: str, latency: float = 0.0, chunk_size: int = 512):
+        names = sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+        self.fixtures = {}
+        for extension in (".html", ".json"):
+            self.fixtures[extension] = []
+            for name in names:
+                if name.endswith(extension):
+                    with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                        self.fixtures[extension].append(f.read())
+        if not any(self.fixtures.values()):
+            raise ValueError(f"В каталоге {directory} нет записанных ответов модели")
+
+        self.directory = directory
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.order = {extension: itertools.cycle(range(len(fixtures))) for extension, fixtures in self.fixtures.items() if fixtures}
+        self.served = 0
+
+    async def generate(self, prompt: str, on_text=None, response_schema=None):
+        extension = ".json" if response_schema else ".html"
+        if extension not in self.order:
+            raise ValueError(f"В каталоге {self.directory} нет записанных ответов *{extension}")
+        text = self.fixtures[extension][next(self.order[extension])]
+        self.served += 1
+
+        chunks = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)] or [""]
+        delay = self.latency / len(chunks)
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            if on_text:
+                on_text(chunk)
+
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(text)
+        return text, {"prompt_tokens": prompt_tokens, "response_tokens": response_tokens, "total_tokens": prompt_tokens + response_tokens}
+
+    def stats(self):
+        return {"provider": self.name, "fixtures": {extension[1:]: len(fixtures) for extension, fixtures in self.fixtures.items()}, "served": self.served}
+
+
+def create_provider(
+    kind: str,
+    *,
+    model_id: str = "gemini-2.5-flash",
+    streaming: bool = True,
+    record_dir: str | None = None,
+    fixture_dir: str | None = None,
+    latency: float = 0.0,
+    size: int = 30_000,
+    error_rate: float = 0.0,
+) -> GenerationProvider:
+    if kind == "gemini":
+        from google import genai
+
+        return GeminiProvider(genai.Client(), model_id=model_id, streaming=streaming, record_dir=record_dir)
+    if kind == "fixture":
+        return FixtureProvider(fixture_dir, latency=latency)
+    if kind == "synthetic":
+        return SyntheticProvider(latency=latency, size=size, error_rate=error_rate, streaming=streaming)
+    raise ValueError(f"Неизвестный провайдер генерации: {kind}")
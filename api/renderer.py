@@ -0,0 +1,237 @@
+import io
+import os
+import time
+import asyncio
+import multiprocessing
+import importlib.util
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+RENDER_BACKENDS = ("process", "thread")
+
+PDF_PRESETS = {
+    "none": {"write_options": {}, "recompress": False},
+    "balanced": {"write_options": {"optimize_images": True, "jpeg_quality": 85, "dpi": 150}, "recompress": False},
+    "small": {"write_options": {"optimize_images": True, "jpeg_quality": 70, "dpi": 96}, "recompress": True},
+    "archive": {"write_options": {"optimize_images": True, "jpeg_quality": 85, "dpi": 150, "pdf_variant": "pdf/a-3b"}, "recompress": False},
+}
+
+WARMUP_HTML = (
+    "<html><head><style>body { font-family: sans-serif; } h1 { font-size: 20pt; }</style></head>"
+    "<body><h1>Warmup</h1><p>Latin, Кириллица, Հայերեն.</p><ul><li>1</li></ul></body></html>"
+)
+
+_font_config = None
+_shared_css = None
+
+
+def local_url_fetcher(url: str, *args, **kwargs):
+    if not url.startswith("data:"):
+        raise ValueError(f"Загрузка внешнего ресурса запрещена: {url[:100]}")
+    from weasyprint import default_url_fetcher
+
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def _load_resources():
+    global _font_config, _shared_css
+
+    if _font_config is None:
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+        from html_processing import shared_stylesheet
+
+        font_config = FontConfiguration()
+        _shared_css = CSS(string=shared_stylesheet(), font_config=font_config, url_fetcher=local_url_fetcher)
+        _font_config = font_config
+
+
+def _init_worker(memory_limit_mb: int):
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    from weasyprint import HTML
+
+    _load_resources()
+    HTML(string=WARMUP_HTML, url_fetcher=local_url_fetcher).write_pdf(font_config=_font_config, stylesheets=[_shared_css])
+
+
+def recompress_pdf(pdf: bytes) -> bytes:
+    import pikepdf
+
+    with pikepdf.open(io.BytesIO(pdf)) as document:
+        document.remove_unreferenced_resources()
+        out = io.BytesIO()
+        document.save(out, compress_streams=True, recompress_flate=True, object_stream_mode=pikepdf.ObjectStreamMode.generate)
+    optimized = out.getvalue()
+    return optimized if len(optimized) < len(pdf) else pdf
+
+
+def _render(html: str, shared_css: bool = False, preset: str = "none", recompress: bool = False):
+    from weasyprint import HTML
+
+    _load_resources()
+    started = time.perf_counter()
+    pdf = HTML(string=html, url_fetcher=local_url_fetcher).write_pdf(
+        font_config=_font_config,
+        stylesheets=[_shared_css] if shared_css else None,
+        **PDF_PRESETS[preset]["write_options"],
+    )
+    render_seconds = time.perf_counter() - started
+
+    if not recompress:
+        return pdf, render_seconds, 0.0, 0
+
+    started = time.perf_counter()
+    optimized = recompress_pdf(pdf)
+    return optimized, render_seconds, time.perf_counter() - started, len(pdf) - len(optimized)
+
+
+class RenderTimeoutError(Exception):
+    pass
+
+
+class PdfRenderer:
+    def __init__(self, backend: str = "process", workers: int | None = None, timeout: float = 120.0, max_tasks_per_worker: int = 50, memory_limit_mb: int = 1024, preset: str = "none", render_fn=_render, initializer=_init_worker):
+        if backend not in RENDER_BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд рендеринга: {backend}")
+        if preset not in PDF_PRESETS:
+            raise ValueError(f"Неизвестный пресет PDF: {preset}")
+        self.backend = backend
+        self.preset = preset
+        self.recompress = PDF_PRESETS[preset]["recompress"]
+        if self.recompress and importlib.util.find_spec("pikepdf") is None:
+            raise ValueError(f"Пресет PDF {preset} требует pikepdf: установите зависимости из requirements-optional.txt")
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.memory_limit_mb = memory_limit_mb
+        self.render_fn = render_fn
+        self.initializer = initializer
+        self.executor = None
+        self.in_flight = 0
+        self.renders = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self.retries = 0
+        self.render_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_render_seconds = 0.0
+        self.optimize_seconds = 0.0
+        self.output_bytes = 0
+        self.saved_bytes = 0
+
+    def _create_executor(self):
+        if self.backend == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-render")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=self.initializer,
+            initargs=(self.memory_limit_mb,),
+            max_tasks_per_child=self.max_tasks_per_worker,
+        )
+
+    def start(self):
+        if self.executor is None:
+            self.executor = self._create_executor()
+
+    async def warmup(self):
+        self.start()
+        await asyncio.gather(*(self.render(WARMUP_HTML) for _ in range(self.workers)))
+
+    def _terminate(self, executor):
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False)
+
+    def restart(self, executor=None):
+        if executor is not None and executor is not self.executor:
+            return
+        old_executor = self.executor
+        self.executor = self._create_executor()
+        self.restarts += 1
+        if old_executor is not None:
+            self._terminate(old_executor)
+
+    async def render(self, html: str, shared_css: bool = False) -> bytes:
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            for attempt in range(2):
+                executor = self.executor
+                try:
+                    future = loop.run_in_executor(executor, self.render_fn, html, shared_css, self.preset, self.recompress)
+                    pdf, render_seconds, optimize_seconds, saved = await asyncio.wait_for(future, self.timeout)
+                    break
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    self.failures += 1
+                    if self.backend == "process":
+                        # Гибель любого воркера ломает весь ProcessPoolExecutor, поэтому пул перезапускается
+                        # целиком; остальные рендеры старого пула получат BrokenProcessPool и повторятся на новом.
+                        self.restart(executor)
+                    raise RenderTimeoutError(f"Рендеринг PDF превысил {self.timeout} с")
+                except BrokenProcessPool:
+                    self.restart(executor)
+                    if attempt:
+                        self.failures += 1
+                        raise
+                    self.retries += 1
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling() or self.executor in (None, executor):
+                        raise
+                    if attempt:
+                        self.failures += 1
+                        raise BrokenProcessPool("Задача рендеринга отменена при перезапуске пула")
+                    self.retries += 1
+                except Exception:
+                    self.failures += 1
+                    raise
+        finally:
+            self.in_flight -= 1
+
+        self.renders += 1
+        self.render_seconds += render_seconds
+        self.optimize_seconds += optimize_seconds
+        self.output_bytes += len(pdf)
+        self.saved_bytes += saved
+        self.wait_seconds += max(0.0, time.perf_counter() - started - render_seconds - optimize_seconds)
+        self.max_render_seconds = max(self.max_render_seconds, render_seconds)
+        return pdf
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "preset": self.preset,
+            "recompress": self.recompress,
+            "in_flight": self.in_flight,
+            "renders": self.renders,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+            "retries": self.retries,
+            "avg_render_seconds": self.render_seconds / self.renders if self.renders else None,
+            "avg_wait_seconds": self.wait_seconds / self.renders if self.renders else None,
+            "max_render_seconds": self.max_render_seconds,
+            "avg_optimize_seconds": self.optimize_seconds / self.renders if self.renders else None,
+            "avg_output_bytes": self.output_bytes / self.renders if self.renders else None,
+            "recompress_saved_bytes": self.saved_bytes,
+        }
@@ -0,0 +1,95 @@
+import time
+import asyncio
+
+
+class Resources:
+    def __init__(self, mongo_url: str | None, database: str, mongo_options: dict, provider_factory, blob_store_factory, renderer, event_listeners=None):
+        self.mongo_url = mongo_url
+        self.database = database
+        self.mongo_options = mongo_options
+        self.provider_factory = provider_factory
+        self.blob_store_factory = blob_store_factory
+        self.renderer = renderer
+        self.event_listeners = event_listeners or []
+        self.mongo_client = None
+        self._db = None
+        self._provider = None
+        self._blob_store = None
+        self.started = False
+        self.timings = {}
+
+    def use_mongo_client(self, client, database: str | None = None):
+        self.mongo_client = client
+        self._db = client.get_database(database or self.database)
+        self._blob_store = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            self.use_mongo_client(AsyncIOMotorClient(self.mongo_url, event_listeners=self.event_listeners, **self.mongo_options))
+        return self._db
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            self._provider = self.provider_factory()
+        return self._provider
+
+    @property
+    def blob_store(self):
+        if self._blob_store is None:
+            self._blob_store = self.blob_store_factory(self.db)
+        return self._blob_store
+
+    async def _timed(self, name: str, fn):
+        started = time.perf_counter()
+        result = fn()
+        if asyncio.iscoroutine(result):
+            result = await result
+        self.timings[name] = time.perf_counter() - started
+        return result
+
+    async def startup(self, warmup: bool = True, warmup_renderer: bool = True):
+        started = time.perf_counter()
+        await self._timed("mongo_client", lambda: self.db)
+        await self._timed("blob_store", lambda: self.blob_store)
+        if warmup:
+            await self._timed("mongo_ping", self.ping)
+            await self._timed("provider", lambda: self.provider)
+        if warmup_renderer:
+            await self._timed("renderer", self.renderer.warmup)
+        else:
+            self.renderer.start()
+        self.timings["startup"] = time.perf_counter() - started
+        self.started = True
+
+    async def shutdown(self):
+        self.started = False
+        self.renderer.shutdown()
+        if self._provider is not None:
+            await self._provider.close()
+        if self.mongo_client is not None:
+            self.mongo_client.close()
+
+    async def ping(self):
+        await self.db.command("ping")
+
+    async def readiness(self, timeout: float = 2.0) -> dict:
+        checks = {"started": self.started, "renderer": self.renderer.executor is not None}
+        try:
+            await asyncio.wait_for(self.ping(), timeout)
+            checks["mongo"] = True
+        except Exception as e:
+            checks["mongo"] = False
+            checks["mongo_error"] = str(e)
+        checks["ready"] = checks["started"] and checks["renderer"] and checks["mongo"]
+        return checks
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "provider_loaded": self._provider is not None,
+            "timings": self.timings,
+        }
@@ -0,0 +1,265 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import DuplicateKeyError
+
+
+RETENTION_BATCH_SIZE = 500
+RETENTION_LEASE_ID = "retention"
+LEGACY_USER_DIR_RE = re.compile(r"^\d+$")
+LEGACY_PDF_RE = re.compile(r"^project_[0-9a-f]{24}\.pdf$")
+
+
+class RetentionService:
+    def __init__(self, resources, interval: float = 3600.0, max_age_days: float = 0, user_quota_bytes: int = 0, total_quota_bytes: int = 0, orphan_grace: float = 3600.0, legacy_root: str | None = None, lease_ttl: float = 900.0):
+        self.resources = resources
+        self.legacy_root = legacy_root
+        self.lease_ttl = lease_ttl
+        self.owner = uuid.uuid4().hex
+        self.interval = interval
+        self.max_age_days = max_age_days
+        self.user_quota_bytes = user_quota_bytes
+        self.total_quota_bytes = total_quota_bytes
+        self.orphan_grace = orphan_grace
+        self.task = None
+        self.lock = asyncio.Lock()
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.expired_projects = 0
+        self.deleted_blobs = 0
+        self.reclaimed_bytes = 0
+        self.last_run = None
+
+    async def start(self):
+        if self.interval and self.task is None:
+            self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.failures += 1
+                print(f"Ошибка при очистке хранилища PDF: {e}")
+
+    async def acquire_lease(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.resources.db.locks.find_one_and_update(
+                {"_id": RETENTION_LEASE_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_ttl)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release_lease(self):
+        await self.resources.db.locks.delete_one({"_id": RETENTION_LEASE_ID, "owner": self.owner})
+
+    async def run_once(self) -> dict:
+        async with self.lock:
+            if not await self.acquire_lease():
+                self.skipped += 1
+                return {"skipped": True, "reason": "retention is running in another process"}
+            try:
+                return await self._run()
+            finally:
+                await self.release_lease()
+
+    async def _run(self) -> dict:
+        started = time.perf_counter()
+        expired = 0
+        if self.max_age_days:
+            expired += await self._expire_by_age()
+        if self.user_quota_bytes:
+            expired += await self._expire_over_user_quota()
+        collected = await self._collect_orphans()
+        if self.total_quota_bytes and collected["remaining_bytes"] > self.total_quota_bytes:
+            expired += await self._expire_over_total_quota(collected["remaining_bytes"] - self.total_quota_bytes)
+            second = await self._collect_orphans()
+            collected = {
+                "deleted": collected["deleted"] + second["deleted"],
+                "reclaimed_bytes": collected["reclaimed_bytes"] + second["reclaimed_bytes"],
+                "remaining_bytes": second["remaining_bytes"],
+            }
+        if self.legacy_root:
+            legacy = await self._collect_legacy()
+            collected["deleted"] += legacy["deleted"]
+            collected["reclaimed_bytes"] += legacy["reclaimed_bytes"]
+
+        self.runs += 1
+        self.expired_projects += expired
+        self.deleted_blobs += collected["deleted"]
+        self.reclaimed_bytes += collected["reclaimed_bytes"]
+        self.last_run = {
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": time.perf_counter() - started,
+            "expired_projects": expired,
+            "deleted_blobs": collected["deleted"],
+            "reclaimed_bytes": collected["reclaimed_bytes"],
+            "stored_bytes": collected["remaining_bytes"],
+        }
+        print(
+            f"Очистка PDF: проектов истекло {expired}, удалено файлов {collected['deleted']}, "
+            f"освобождено {collected['reclaimed_bytes']} байт, занято {collected['remaining_bytes']} байт"
+        )
+        return self.last_run
+
+    async def _current_project_ids(self, project_ids: list) -> set:
+        users = self.resources.db.users.find(
+            {"current_project_id": {"$in": [str(project_id) for project_id in project_ids]}},
+            projection={"current_project_id": 1},
+        )
+        return {user["current_project_id"] async for user in users}
+
+    async def _expire(self, project_ids: list) -> int:
+        if not project_ids:
+            return 0
+        current = await self._current_project_ids(project_ids)
+        expired = [project_id for project_id in project_ids if str(project_id) not in current]
+        if not expired:
+            return 0
+        result = await self.resources.db.projects.update_many(
+            {"_id": {"$in": expired}},
+            {"$unset": {"blob_id": ""}, "$set": {"pdf_expired_at": datetime.now()}},
+        )
+        return result.modified_count
+
+    async def _expire_by_age(self) -> int:
+        cutoff = datetime.now() - timedelta(days=self.max_age_days)
+        expired = 0
+        batch = []
+        async for project in self.resources.db.projects.find({"blob_id": {"$exists": True}, "created_at": {"$lt": cutoff}}, projection={"_id": 1}):
+            batch.append(project["_id"])
+            if len(batch) >= RETENTION_BATCH_SIZE:
+                expired += await self._expire(batch)
+                batch = []
+        return expired + await self._expire(batch)
+
+    async def _expire_over_user_quota(self) -> int:
+        over_quota = self.resources.db.projects.aggregate([
+            {"$match": {"blob_id": {"$exists": True}}},
+            {"$group": {"_id": "$telegram_id", "bytes": {"$sum": "$pdf_size"}}},
+            {"$match": {"bytes": {"$gt": self.user_quota_bytes}}},
+        ])
+        expired = 0
+        async for user in over_quota:
+            excess = user["bytes"] - self.user_quota_bytes
+            batch = []
+            async for project in self.resources.db.projects.find(
+                {"telegram_id": user["_id"], "blob_id": {"$exists": True}},
+                projection={"pdf_size": 1},
+            ).sort([("created_at", 1), ("_id", 1)]):
+                if excess <= 0:
+                    break
+                batch.append(project["_id"])
+                excess -= project.get("pdf_size") or 0
+            expired += await self._expire(batch)
+        return expired
+
+    async def _expire_over_total_quota(self, excess: int) -> int:
+        expired = 0
+        batch = []
+        async for project in self.resources.db.projects.find({"blob_id": {"$exists": True}}, projection={"pdf_size": 1}).sort([("created_at", 1), ("_id", 1)]):
+            if excess <= 0:
+                break
+            batch.append(project["_id"])
+            excess -= project.get("pdf_size") or 0
+            if len(batch) >= RETENTION_BATCH_SIZE:
+                expired += await self._expire(batch)
+                batch = []
+        return expired + await self._expire(batch)
+
+    async def _collect_orphans(self) -> dict:
+        referenced = set()
+        async for group in self.resources.db.projects.aggregate([
+            {"$match": {"blob_id": {"$exists": True}}},
+            {"$group": {"_id": "$blob_id"}},
+        ]):
+            referenced.add(group["_id"])
+        cutoff = time.time() - self.orphan_grace
+        deleted = 0
+        reclaimed = 0
+        remaining = 0
+        async for blob in self.resources.blob_store.list():
+            if blob["blob_id"] in referenced or blob["modified_at"] > cutoff:
+                remaining += blob["size"]
+                continue
+            await self.resources.blob_store.delete(blob["blob_id"])
+            deleted += 1
+            reclaimed += blob["size"]
+        return {"deleted": deleted, "reclaimed_bytes": reclaimed, "remaining_bytes": remaining}
+
+    async def _pending_legacy_paths(self) -> set:
+        pending = set()
+        async for project in self.resources.db.projects.find(
+            {"pdf_path": {"$exists": True}, "blob_id": {"$exists": False}, "pdf_expired_at": {"$exists": False}},
+            projection={"pdf_path": 1},
+        ):
+            pending.add(os.path.abspath(project["pdf_path"]))
+        return pending
+
+    def _scan_legacy(self) -> list:
+        files = []
+        if not os.path.isdir(self.legacy_root):
+            return files
+        for user_dir in os.listdir(self.legacy_root):
+            directory = os.path.join(self.legacy_root, user_dir)
+            if not LEGACY_USER_DIR_RE.match(user_dir) or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if LEGACY_PDF_RE.match(name):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    files.append({"path": os.path.abspath(path), "size": stat.st_size, "modified_at": stat.st_mtime})
+        return files
+
+    def _remove_legacy(self, path: str):
+        os.remove(path)
+        directory = os.path.dirname(path)
+        if not os.listdir(directory):
+            os.rmdir(directory)
+
+    async def _collect_legacy(self) -> dict:
+        pending = await self._pending_legacy_paths()
+        cutoff = time.time() - self.orphan_grace
+        deleted = 0
+        reclaimed = 0
+        for legacy_file in await asyncio.to_thread(self._scan_legacy):
+            if legacy_file["path"] in pending or legacy_file["modified_at"] > cutoff:
+                continue
+            try:
+                await asyncio.to_thread(self._remove_legacy, legacy_file["path"])
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            reclaimed += legacy_file["size"]
+        return {"deleted": deleted, "reclaimed_bytes": reclaimed}
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "max_age_days": self.max_age_days,
+            "user_quota_bytes": self.user_quota_bytes,
+            "total_quota_bytes": self.total_quota_bytes,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "expired_projects": self.expired_projects,
+            "deleted_blobs": self.deleted_blobs,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run": self.last_run,
+        }
@@ -0,0 +1,44 @@
+import asyncio
+
+
+def _consume_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = {}
+        self.started = 0
+        self.shared = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.calls)
+
+    async def do(self, key, fn):
+        future = self.calls.get(key)
+        if future is not None:
+            self.shared += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self.calls[key] = future
+        self.started += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self.calls[key]
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "started": self.started, "shared": self.shared}
@@ -0,0 +1,225 @@
+import os
+import re
+import uuid
+import asyncio
+import hashlib
+import tempfile
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from gridfs.errors import NoFile, FileExists
+from pymongo.errors import DuplicateKeyError
+
+
+BLOB_STORES = ("local", "gridfs")
+BLOB_CHUNK_SIZE = 64 * 1024
+BLOB_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class BlobNotFoundError(Exception):
+    pass
+
+
+def check_blob_id(blob_id: str):
+    if not BLOB_ID_RE.match(blob_id or ""):
+        raise BlobNotFoundError(blob_id)
+
+
+async def iterate_bytes(data: bytes, chunk_size: int = BLOB_CHUNK_SIZE):
+    for offset in range(0, len(data), chunk_size):
+        yield data[offset:offset + chunk_size]
+
+
+async def iterate_file(path: str, chunk_size: int = BLOB_CHUNK_SIZE):
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+class BlobStore(ABC):
+    async def put(self, data: bytes) -> dict:
+        return await self.put_stream(iterate_bytes(data))
+
+    @abstractmethod
+    async def put_stream(self, chunks) -> dict:
+        pass
+
+    @abstractmethod
+    async def size(self, blob_id: str) -> int:
+        pass
+
+    @abstractmethod
+    def stream(self, blob_id: str, start: int = 0, end: int | None = None, chunk_size: int = BLOB_CHUNK_SIZE):
+        pass
+
+    @abstractmethod
+    def list(self):
+        pass
+
+    async def read(self, blob_id: str) -> bytes:
+        return b"".join([chunk async for chunk in self.stream(blob_id)])
+
+    @abstractmethod
+    async def delete(self, blob_id: str):
+        pass
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, blob_id: str) -> str:
+        check_blob_id(blob_id)
+        return os.path.join(self.root, blob_id[:2], blob_id[2:4], blob_id)
+
+    def _commit(self, tmp_path: str, blob_id: str):
+        path = self.path_for(blob_id)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    async def put_stream(self, chunks) -> dict:
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.tmp")
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(f.write, chunk)
+            await asyncio.to_thread(f.close)
+            blob_id = digest.hexdigest()
+            await asyncio.to_thread(self._commit, tmp_path, blob_id)
+        except BaseException:
+            f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"blob_id": blob_id, "size": size}
+
+    async def size(self, blob_id: str) -> int:
+        try:
+            return await asyncio.to_thread(os.path.getsize, self.path_for(blob_id))
+        except FileNotFoundError:
+            raise BlobNotFoundError(blob_id)
+
+    async def stream(self, blob_id: str, start: int = 0, end: int | None = None, chunk_size: int = BLOB_CHUNK_SIZE):
+        try:
+            f = await asyncio.to_thread(open, self.path_for(blob_id), "rb")
+        except FileNotFoundError:
+            raise BlobNotFoundError(blob_id)
+        try:
+            if start:
+                await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = await asyncio.to_thread(f.read, chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def delete(self, blob_id: str):
+        try:
+            await asyncio.to_thread(os.remove, self.path_for(blob_id))
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        blobs = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [name for name in dirnames if name != "tmp"]
+            for name in filenames:
+                if BLOB_ID_RE.match(name):
+                    stat = os.stat(os.path.join(dirpath, name))
+                    blobs.append({"blob_id": name, "size": stat.st_size, "modified_at": stat.st_mtime})
+        return blobs
+
+    async def list(self):
+        for blob in await asyncio.to_thread(self._scan):
+            yield blob
+
+
+class GridFSBlobStore(BlobStore):
+    def __init__(self, db, bucket_name: str = "pdfs"):
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    async def put_stream(self, chunks) -> dict:
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            blob_id = digest.hexdigest()
+
+            touched = await self.files.update_one({"_id": blob_id}, {"$set": {"metadata.touched_at": datetime.now(timezone.utc)}})
+            if touched.matched_count:
+                return {"blob_id": blob_id, "size": size}
+
+            spool.seek(0)
+            try:
+                await self.bucket.upload_from_stream_with_id(blob_id, blob_id, spool, metadata={"sha256": blob_id})
+            except (FileExists, DuplicateKeyError):
+                pass
+        return {"blob_id": blob_id, "size": size}
+
+    async def size(self, blob_id: str) -> int:
+        check_blob_id(blob_id)
+        file_doc = await self.files.find_one({"_id": blob_id}, projection={"length": 1})
+        if not file_doc:
+            raise BlobNotFoundError(blob_id)
+        return file_doc["length"]
+
+    async def stream(self, blob_id: str, start: int = 0, end: int | None = None, chunk_size: int = BLOB_CHUNK_SIZE):
+        check_blob_id(blob_id)
+        try:
+            grid_out = await self.bucket.open_download_stream(blob_id)
+        except NoFile:
+            raise BlobNotFoundError(blob_id)
+        if start:
+            grid_out.seek(start)
+        remaining = (grid_out.length if end is None else end + 1) - start
+        while remaining > 0:
+            chunk = await grid_out.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def delete(self, blob_id: str):
+        check_blob_id(blob_id)
+        try:
+            await self.bucket.delete(blob_id)
+        except NoFile:
+            pass
+
+    async def list(self):
+        async for file_doc in self.files.find({}, projection={"length": 1, "uploadDate": 1, "metadata.touched_at": 1}):
+            modified_at = (file_doc.get("metadata") or {}).get("touched_at") or file_doc["uploadDate"]
+            yield {"blob_id": file_doc["_id"], "size": file_doc["length"], "modified_at": modified_at.replace(tzinfo=timezone.utc).timestamp()}
+
+
+def create_blob_store(kind: str, db=None, root: str | None = None, bucket_name: str = "pdfs") -> BlobStore:
+    if kind == "local":
+        return LocalBlobStore(root)
+    if kind == "gridfs":
+        return GridFSBlobStore(db, bucket_name=bucket_name)
+    raise ValueError(f"Неизвестное хранилище BLOB_STORE: {kind}")
@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+import contextvars
+
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+
+try:
+    from opentelemetry import trace, propagate
+except ImportError:
+    trace = None
+    propagate = None
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+generation_stage_seconds = Histogram(
+    "generation_stage_seconds", "Длительность этапов генерации проекта", ["stage"], buckets=STAGE_BUCKETS
+)
+generation_errors_total = Counter(
+    "generation_errors_total", "Ошибки на этапах генерации проекта", ["stage"]
+)
+generations_in_flight = Gauge(
+    "generations_in_flight", "Генерации проектов, выполняющиеся прямо сейчас"
+)
+mongo_command_seconds = Histogram(
+    "mongo_command_seconds", "Длительность команд MongoDB", ["command"], buckets=DB_BUCKETS
+)
+mongo_command_errors_total = Counter(
+    "mongo_command_errors_total", "Ошибки команд MongoDB", ["command"]
+)
+http_request_seconds = Histogram(
+    "http_request_seconds", "Длительность HTTP-запросов к API", ["method", "route", "status"], buckets=STAGE_BUCKETS
+)
+
+tracer = None
+tracer_provider = None
+
+
+def create_tracer_provider(service_name: str):
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("OpenTelemetry SDK не установлен, спаны не экспортируются")
+        return None
+
+    protocol = os.getenv("OTEL_EXPORTER_OTLP_TRACES_PROTOCOL") or os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+    if protocol == "grpc":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider
+
+
+def enable_tracing(service_name: str = "practice-bot-api") -> bool:
+    global tracer, tracer_provider
+    if trace is None:
+        print("OpenTelemetry не установлен, трассировка отключена")
+        return False
+    tracer_provider = create_tracer_provider(service_name)
+    if tracer_provider is not None:
+        trace.set_tracer_provider(tracer_provider)
+    tracer = trace.get_tracer(service_name)
+    return True
+
+
+def shutdown_tracing():
+    if tracer_provider is not None:
+        tracer_provider.shutdown()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    started = time.perf_counter()
+    span = None
+    if tracer is not None:
+        span = tracer.start_as_current_span(f"generation.{name}", attributes={"request_id": request_id_var.get() or "", **attributes})
+        span.__enter__()
+    try:
+        yield
+    except BaseException as e:
+        generation_errors_total.labels(name).inc()
+        if span is not None:
+            span.__exit__(type(e), e, e.__traceback__)
+            span = None
+        raise
+    finally:
+        generation_stage_seconds.labels(name).observe(time.perf_counter() - started)
+        if span is not None:
+            span.__exit__(None, None, None)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_seconds.labels(event.command_name).observe(event.duration_micros / 1_000_000)
+
+    def failed(self, event):
+        mongo_command_seconds.labels(event.command_name).observe(event.duration_micros / 1_000_000)
+        mongo_command_errors_total.labels(event.command_name).inc()
+
+
+def gauge_from(name: str, documentation: str, fn) -> Gauge:
+    gauge = Gauge(name, documentation)
+    gauge.set_function(fn)
+    return gauge
+
+
+class FunctionCounter(Collector):
+    def __init__(self, name: str, documentation: str, fn):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+
+    def describe(self):
+        yield CounterMetricFamily(self.name, self.documentation)
+
+    def collect(self):
+        yield CounterMetricFamily(self.name, self.documentation, value=self.fn())
+
+
+def counter_from(name: str, documentation: str, fn, registry=REGISTRY) -> FunctionCounter:
+    counter = FunctionCounter(name, documentation, fn)
+    registry.register(counter)
+    return counter
+
+
+def install_http_middleware(app):
+    @app.middleware("http")
+    async def observe_request(request, call_next):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or new_request_id()
+        token = request_id_var.set(request_id)
+        span = None
+        if tracer is not None:
+            span = tracer.start_as_current_span(
+                f"{request.method} {request.url.path}",
+                context=propagate.extract(request.headers),
+                attributes={"request_id": request_id},
+            )
+            span.__enter__()
+
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            response.headers[REQUEST_ID_HEADER] = request_id
+            return response
+        finally:
+            route = request.scope.get("route")
+            http_request_seconds.labels(request.method, getattr(route, "path", "unmatched"), str(status_code)).observe(time.perf_counter() - started)
+            if span is not None:
+                span.__exit__(None, None, None)
+            request_id_var.reset(token)
+
+
+def metrics_payload():
+    return generate_latest(), CONTENT_TYPE_LATEST
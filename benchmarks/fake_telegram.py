@@ -0,0 +1,81 @@
+import itertools
+
+from datetime import datetime
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, SendDocument, EditMessageText, EditMessageReplyMarkup
+from aiogram.types import Update, Message, CallbackQuery, Chat, User, Document, InputFile
+
+
+BENCH_BOT_TOKEN = "123456:BENCHMARKBENCHMARKBENCHMARKBENCHMARK"
+
+MESSAGE_METHODS = (SendMessage, SendDocument, EditMessageText, EditMessageReplyMarkup)
+
+
+class FakeTelegramSession(BaseSession):
+    def __init__(self):
+        super().__init__()
+        self.message_ids = itertools.count(1)
+        self.calls = {}
+        self.uploaded_bytes = 0
+
+    async def make_request(self, bot, method, timeout=None):
+        name = type(method).__name__
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        if not isinstance(method, MESSAGE_METHODS):
+            return True
+
+        document = None
+        if isinstance(method, SendDocument):
+            if isinstance(method.document, InputFile):
+                async for chunk in method.document.read(bot):
+                    self.uploaded_bytes += len(chunk)
+            file_id = method.document if isinstance(method.document, str) else f"bench-file-{next(self.message_ids)}"
+            document = Document(file_id=file_id, file_unique_id=file_id)
+
+        chat_id = getattr(method, "chat_id", None) or 0
+        return Message(
+            message_id=getattr(method, "message_id", None) or next(self.message_ids),
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            text=getattr(method, "text", None),
+            document=document,
+        ).as_(bot)
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+update_ids = itertools.count(1)
+
+
+def make_user(user_id: int) -> User:
+    return User(id=user_id, is_bot=False, first_name="Bench", username=f"bench{user_id}", language_code="en")
+
+
+def make_message(user_id: int, text: str) -> Message:
+    return Message(
+        message_id=next(update_ids),
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=make_user(user_id),
+        text=text,
+    )
+
+
+def message_update(user_id: int, text: str) -> Update:
+    return Update(update_id=next(update_ids), message=make_message(user_id, text))
+
+
+def callback_update(user_id: int, data: str) -> Update:
+    return Update(update_id=next(update_ids), callback_query=CallbackQuery(
+        id=str(next(update_ids)),
+        from_user=make_user(user_id),
+        chat_instance=str(user_id),
+        data=data,
+        message=make_message(user_id, "bench"),
+    ))
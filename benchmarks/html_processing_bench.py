@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api"))
+
+from fake_model import FAKE_PROJECT_HTML, FAKE_SECTION_HTML, FAKE_TEXT
+from html_processing import extract_title_description, ProjectHtmlProcessor, shared_stylesheet
+
+
+def build_document(size: int, with_head: bool = True, unsafe: bool = False) -> str:
+    sections = []
+    length = 0
+    while length < size:
+        section = FAKE_SECTION_HTML.format(index=len(sections) + 1, text=FAKE_TEXT * 8)
+        sections.append(section)
+        length += len(section)
+    html = FAKE_PROJECT_HTML.format(title="Бенчмарк", description=FAKE_TEXT.strip(), sections="".join(sections))
+    if not with_head:
+        html = html.replace("<title>", "<meta>").replace("</title>", "</meta>").replace("<p>", "<div>").replace("</p>", "</div>")
+    if unsafe:
+        html = html.replace("</main>", '<img src="https://cdn.example/x.png"></main>')
+    return f"```html\n{html}\n```"
+
+
+def regex_path(html: str):
+    return extract_title_description(html)
+
+
+def processor_path(html: str, chunk_size: int):
+    processor = ProjectHtmlProcessor(shared_stylesheet())
+    for start in range(0, len(html), chunk_size):
+        processor.feed(html[start:start + chunk_size])
+    return processor.close()
+
+
+def measure(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение regex-извлечения и однопроходного HTML-процессора")
+    parser.add_argument("--sizes", default="30000,300000,3000000", help="размеры документов в байтах")
+    parser.add_argument("--chunk-size", type=int, default=512, help="размер чанка при потоковой подаче")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'document':<22} {'regex':>10} {'processor':>10} {'chunks':>14}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        for with_head, unsafe in ((True, False), (False, False), (True, True)):
+            html = build_document(size, with_head, unsafe)
+            name = f"{len(html) // 1024}KB{'' if with_head else ' no-match'}{' unsafe' if unsafe else ''}"
+            regex = measure(lambda: regex_path(html), args.repeat)
+            whole = measure(lambda: processor_path(html, len(html)), args.repeat)
+            chunked = measure(lambda: processor_path(html, args.chunk_size), args.repeat)
+            print(f"{name:<22} {regex * 1000:>8.2f}ms {whole * 1000:>8.2f}ms {chunked * 1000:>12.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
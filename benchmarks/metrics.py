@@ -0,0 +1,139 @@
+import math
+import time
+import asyncio
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def percentile(samples, q: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples) if samples else None,
+        "p50": percentile(samples, 0.50),
+        "p95": percentile(samples, 0.95),
+        "p99": percentile(samples, 0.99),
+        "max": max(samples) if samples else None,
+    }
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb(who=None):
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    return usage.ru_maxrss / 1024
+
+
+def memory_snapshot():
+    return {
+        "rss_mb": current_rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+    }
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def summary(self):
+        return summarize(self.samples)
+
+
+async def run_load(fn, total: int, concurrency: int):
+    latencies = []
+    errors = {}
+    counter = iter(range(total))
+
+    async def worker():
+        for index in counter:
+            started = time.perf_counter()
+            try:
+                await fn(index)
+            except Exception as e:
+                name = type(e).__name__
+                errors[name] = errors.get(name, 0) + 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else None,
+        "errors": errors,
+        "latency": summarize(latencies),
+    }
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value * 1000:.1f}ms"
+
+
+def format_report(name: str, result: dict) -> str:
+    latency = result["latency"]
+    lag = result["loop_lag"]
+    memory = result["memory"]
+    errors = sum(result["errors"].values())
+    return (
+        f"{name:<18} n={result['requests']:<5} c={result['concurrency']:<4} "
+        f"rps={result['throughput'] or 0:8.1f} "
+        f"p50={format_seconds(latency['p50']):>9} p95={format_seconds(latency['p95']):>9} p99={format_seconds(latency['p99']):>9} "
+        f"errors={errors} lag_p99={format_seconds(lag['p99'])} lag_max={format_seconds(lag['max'])} "
+        f"rss={memory['rss_mb'] or 0:.0f}MB peak={memory['peak_rss_mb'] or 0:.0f}MB"
+    )
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for metric in ("p50", "p95", "p99"):
+        before, after = baseline["latency"].get(metric), result["latency"].get(metric)
+        if before and after and after > before * (1 + tolerance):
+            regressions.append(f"{name}: {metric} {format_seconds(before)} -> {format_seconds(after)} (+{(after / before - 1) * 100:.0f}%)")
+    before, after = baseline.get("throughput"), result.get("throughput")
+    if before and after and after < before * (1 - tolerance):
+        regressions.append(f"{name}: throughput {before:.1f} -> {after:.1f} rps ({(after / before - 1) * 100:.0f}%)")
+    return regressions
@@ -0,0 +1,72 @@
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+import importlib.util
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, "api")
+sys.path.insert(0, API_DIR)
+
+from fake_model import FakeModelClient
+from html_processing import process_project_html, shared_stylesheet
+from renderer import PDF_PRESETS, _render, recompress_pdf
+
+
+def build_document(size: int) -> str:
+    models = FakeModelClient(latency=0, size=size).aio.models
+    return process_project_html(models._render(), shared_stylesheet())["html"]
+
+
+def measure_preset(html: str, preset: str, recompress: bool, repeat: int):
+    sizes, seconds = [], []
+    for _ in range(repeat):
+        pdf, render_seconds, optimize_seconds, _ = _render(html, preset=preset, recompress=recompress)
+        sizes.append(len(pdf))
+        seconds.append(render_seconds + optimize_seconds)
+    return sizes[-1], statistics.median(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Размер PDF и время рендеринга для пресетов оптимизации")
+    parser.add_argument("--sizes", default="30000,100000", help="размеры синтетического HTML в байтах")
+    parser.add_argument("--presets", default=",".join(PDF_PRESETS), help="пресеты через запятую")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pdf", default=os.path.join(API_DIR, "db", "example", "*.pdf"), help="готовые PDF для пересжатия (glob)")
+    args = parser.parse_args()
+
+    has_pikepdf = importlib.util.find_spec("pikepdf") is not None
+    if not has_pikepdf:
+        print("pikepdf не установлен, пересжатие потоков пропускается")
+
+    presets = [preset.strip() for preset in args.presets.split(",") if preset.strip()]
+    _render(build_document(1000))
+
+    print(f"{'document':<10} {'preset':<10} {'size':>10} {'saved':>16} {'render':>10} {'added':>10}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        html = build_document(size)
+        base_size, base_seconds = measure_preset(html, "none", False, args.repeat)
+        for preset in presets:
+            recompress = PDF_PRESETS[preset]["recompress"] and has_pikepdf
+            pdf_size, seconds = measure_preset(html, preset, recompress, args.repeat)
+            saved = base_size - pdf_size
+            print(
+                f"{len(html) // 1024:>8}KB {preset:<10} {pdf_size:>10} {saved:>8} ({saved / base_size * 100:>4.1f}%) "
+                f"{seconds * 1000:>8.1f}ms {(seconds - base_seconds) * 1000:>+8.1f}ms"
+            )
+
+    if has_pikepdf:
+        for path in sorted(glob.glob(args.pdf)):
+            with open(path, "rb") as f:
+                pdf = f.read()
+            started = time.perf_counter()
+            optimized = recompress_pdf(pdf)
+            elapsed = time.perf_counter() - started
+            saved = len(pdf) - len(optimized)
+            print(f"{os.path.basename(path)}: {len(pdf)} -> {len(optimized)} байт (-{saved / len(pdf) * 100:.1f}%) за {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, "api")
+BOT_DIR = os.path.join(ROOT_DIR, "bot")
+sys.path[:0] = [API_DIR, BOT_DIR]
+
+from metrics import LoopLagMonitor, run_load, memory_snapshot, format_report, compare
+
+
+API_SCENARIOS = ("api_create_user", "api_get_user", "api_get_project")
+BOT_SCENARIOS = ("bot_start", "bot_user", "bot_history", "bot_get_project")
+SCENARIOS = API_SCENARIOS + BOT_SCENARIOS
+
+PROFILE = {"profession": "programmer", "level": "beginer", "specialization": "Python(FastAPI)", "language_code": "en"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API и обработчиков бота")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="список сценариев через запятую")
+    parser.add_argument("--requests", type=int, default=200, help="число запросов на сценарий (генерации: /10)")
+    parser.add_argument("--concurrency", default="1,16", help="уровни конкурентности через запятую")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="задержка синтетической модели, с")
+    parser.add_argument("--model-size", type=int, default=30000, help="размер синтетического HTML, байт")
+    parser.add_argument("--mongo", default="memory", help="'memory' (mongomock-motor) или URL локального mongod")
+    parser.add_argument("--render-backend", default="process", choices=("process", "thread"))
+    parser.add_argument("--generation-output", default="html", choices=("html", "json"), help="формат ответа модели")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с результатами предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="допустимая деградация относительно baseline")
+    return parser.parse_args()
+
+
+def configure_environment(args, workdir: str):
+    os.environ.update({
+        "MODEL_PROVIDER": "synthetic",
+        "STUB_MODEL_LATENCY": str(args.model_latency),
+        "STUB_MODEL_SIZE": str(args.model_size),
+        "MODEL_RPM": "1000000",
+        "MODEL_TPM": "1000000000",
+        "BLOB_STORE": "local",
+        "BLOB_STORE_DIR": os.path.join(workdir, "blobs"),
+        "GENERATION_CACHE_MODE": "off",
+        "GENERATION_CACHE_DIR": os.path.join(workdir, "cache"),
+        "PDF_RENDER_BACKEND": args.render_backend,
+        "GENERATION_OUTPUT": args.generation_output,
+        "MIGRATE_LEGACY_PROJECTS": "0",
+        "PROJECT_JOB_POLL_INTERVAL": "0.05",
+        "PROJECT_JOB_MAX_POLL_INTERVAL": "0.2",
+        "THROTTLE_ENABLED": "0",
+    })
+    os.environ.setdefault("PROJECT_JOB_MAX_QUEUE", "10000")
+    if args.mongo != "memory":
+        os.environ["MONGO_DB"] = args.mongo
+        os.environ["MONGO_DATABASE"] = f"PracticeBotBench{os.getpid()}"
+
+
+def import_from(directory: str, module_name: str):
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        return __import__(module_name)
+    finally:
+        os.chdir(cwd)
+
+
+def use_memory_mongo(main):
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("Для --mongo memory нужен пакет mongomock-motor (или укажите URL локального mongod)")
+    main.resources.use_mongo_client(AsyncMongoMockClient())
+
+
+class Bench:
+    def __init__(self, args):
+        import httpx
+
+        self.args = args
+        self.main = import_from(API_DIR, "main")
+        if args.mongo == "memory":
+            use_memory_mongo(self.main)
+        self.lifespan = None
+
+        self.transport = httpx.ASGITransport(app=self.main.app)
+        self.http = httpx.AsyncClient(transport=self.transport, base_url="http://bench", timeout=None)
+        self.next_id = 10_000_000
+        self.bot_module = None
+        self.bot = None
+        self.session = None
+
+    def allocate_ids(self, count: int) -> list:
+        start = self.next_id
+        self.next_id += count
+        return list(range(start, start + count))
+
+    async def start(self):
+        self.lifespan = self.main.app.router.lifespan_context(self.main.app)
+        await self.lifespan.__aenter__()
+
+    async def stop(self):
+        await self.http.aclose()
+        if self.bot_module and self.bot_module.api_client:
+            await self.bot_module.api_client.aclose()
+        if self.args.mongo != "memory":
+            await self.main.resources.mongo_client.drop_database(self.main.resources.db.name)
+        await self.lifespan.__aexit__(None, None, None)
+
+    def setup_bot(self):
+        if self.bot is not None:
+            return
+        from aiogram import Bot
+        from aiogram.client.default import DefaultBotProperties
+        from aiogram.enums import ParseMode
+        from fake_telegram import FakeTelegramSession, BENCH_BOT_TOKEN
+
+        self.bot_module = import_from(BOT_DIR, "bot")
+        from api_client import ApiClient
+
+        self.bot_module.api_client = ApiClient(
+            "http://bench",
+            transport=self.transport,
+            route_timeouts=self.bot_module.API_ROUTE_TIMEOUTS,
+            retries=0,
+        )
+        self.session = FakeTelegramSession()
+        self.bot = Bot(token=BENCH_BOT_TOKEN, session=self.session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+    async def seed_users(self, ids: list, with_profile: bool = False):
+        for start in range(0, len(ids), 1000):
+            users = [
+                {"telegram_id": telegram_id, "first_name": "Bench", "language_code": "en", **(PROFILE if with_profile else {})}
+                for telegram_id in ids[start:start + 1000]
+            ]
+            response = await self.http.post("/users:bulkUpsert", json={"users": users})
+            response.raise_for_status()
+
+    async def prepare(self, scenario: str, count: int):
+        ids = self.allocate_ids(count)
+        if scenario in ("api_get_user", "bot_user", "bot_history"):
+            await self.seed_users(ids)
+        elif scenario in ("api_get_project", "bot_get_project"):
+            await self.seed_users(ids, with_profile=True)
+        if scenario.startswith("bot_"):
+            self.setup_bot()
+
+        if scenario == "api_create_user":
+            return lambda index: self._checked(self.http.post("/users", json={"telegram_id": ids[index], "first_name": "Bench", "language_code": "en"}))
+        if scenario == "api_get_user":
+            return lambda index: self._checked(self.http.get(f"/users/{ids[index]}"))
+        if scenario == "api_get_project":
+            return lambda index: self._checked(self.http.post("/projects/get_project", json={"telegram_id": ids[index], **PROFILE}))
+
+        from fake_telegram import message_update
+        translations = self.bot_module.translations
+        texts = {
+            "bot_start": "/start",
+            "bot_user": translations.get("button_user", "en"),
+            "bot_history": "/history",
+            "bot_get_project": "/get_project",
+        }
+        return lambda index: self.bot_module.dp.feed_update(self.bot, message_update(ids[index], texts[scenario]))
+
+    @staticmethod
+    async def _checked(request):
+        response = await request
+        response.raise_for_status()
+        return response
+
+
+async def run(args):
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Неизвестные сценарии: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    configure_environment(args, workdir)
+    bench = Bench(args)
+    await bench.start()
+
+    results = {}
+    stats = None
+    try:
+        for scenario in scenarios:
+            total = args.requests if not scenario.endswith("get_project") else max(1, args.requests // 10)
+            for concurrency in levels:
+                fn = await bench.prepare(scenario, total)
+                monitor = LoopLagMonitor()
+                monitor.start()
+                result = await run_load(fn, total, concurrency)
+                await monitor.stop()
+                result["loop_lag"] = monitor.summary()
+                result["memory"] = memory_snapshot()
+
+                name = f"{scenario}@c{concurrency}"
+                results[name] = result
+                print(format_report(name, result), flush=True)
+        stats = await bench.main.get_stats()
+        if bench.session:
+            stats["telegram"] = {"calls": bench.session.calls, "uploaded_bytes": bench.session.uploaded_bytes}
+    finally:
+        await bench.stop()
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": {
+            "requests": args.requests,
+            "concurrency": levels,
+            "model_latency": args.model_latency,
+            "model_size": args.model_size,
+            "mongo": "memory" if args.mongo == "memory" else "mongod",
+            "render_backend": args.render_backend,
+            "generation_output": args.generation_output,
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+        "stats": stats,
+    }
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, result in results.items():
+            if name in baseline:
+                regressions.extend(compare(name, result, baseline[name], args.tolerance))
+        if regressions:
+            print("Регрессии относительно baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("Регрессий относительно baseline нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run(parse_args())))
@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, "api")
+
+from metrics import summarize, format_seconds, current_rss_mb
+
+
+PHASES = ("import", "startup", "first_request", "shutdown")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк времени импорта и холодного старта API")
+    parser.add_argument("--runs", type=int, default=5, help="число холодных стартов (каждый в отдельном процессе)")
+    parser.add_argument("--provider", default="synthetic", choices=("synthetic", "gemini"), help="провайдер модели в дочернем процессе")
+    parser.add_argument("--mongo", default="memory", help="'memory' (mongomock-motor) или URL локального mongod")
+    parser.add_argument("--warmup", action="store_true", help="прогревать модель, Mongo и рендерер при старте")
+    parser.add_argument("--top", type=int, default=15, help="сколько самых медленных модулей показать по -X importtime")
+    parser.add_argument("--json", dest="json_path", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON с результатами предыдущего прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="допустимая деградация относительно baseline")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def child_environment(args, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "MODEL_PROVIDER": args.provider,
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "bench"),
+        "BLOB_STORE": "local",
+        "BLOB_STORE_DIR": os.path.join(workdir, "blobs"),
+        "GENERATION_CACHE_DIR": os.path.join(workdir, "cache"),
+        "MIGRATE_LEGACY_PROJECTS": "0",
+        "RESOURCE_WARMUP": "1" if args.warmup else "0",
+        "PDF_RENDER_WARMUP": "1" if args.warmup else "0",
+        "BENCH_MONGO": args.mongo,
+    })
+    if args.mongo != "memory":
+        env["MONGO_DB"] = args.mongo
+        env["MONGO_DATABASE"] = f"PracticeBotStartup{os.getpid()}"
+    return env
+
+
+async def measure_child():
+    import httpx
+
+    timings = {}
+    started = time.perf_counter()
+    sys.path.insert(0, API_DIR)
+    import main
+    timings["import"] = time.perf_counter() - started
+    modules = len(sys.modules)
+
+    if os.environ["BENCH_MONGO"] == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+
+        main.resources.use_mongo_client(AsyncMongoMockClient())
+
+    lifespan = main.app.router.lifespan_context(main.app)
+    started = time.perf_counter()
+    await lifespan.__aenter__()
+    timings["startup"] = time.perf_counter() - started
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        started = time.perf_counter()
+        response = await client.get("/readyz")
+        timings["first_request"] = time.perf_counter() - started
+
+    if os.environ["BENCH_MONGO"] != "memory":
+        await main.resources.mongo_client.drop_database(main.resources.db.name)
+    started = time.perf_counter()
+    await lifespan.__aexit__(None, None, None)
+    timings["shutdown"] = time.perf_counter() - started
+
+    print(json.dumps({
+        "timings": timings,
+        "ready": response.status_code == 200,
+        "modules": modules,
+        "rss_mb": current_rss_mb(),
+        "resource_timings": main.resources.timings,
+    }))
+
+
+def run_child(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child"],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        sys.exit(f"Дочерний процесс завершился с ошибкой:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env: dict, top: int) -> list:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if len(name) - len(name.lstrip(" ")) != 3:
+            continue
+        modules.append({"module": name.strip(), "cumulative": int(cumulative_us) / 1_000_000, "self": int(self_us) / 1_000_000})
+    return sorted(modules, key=lambda module: module["cumulative"], reverse=True)[:top]
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        asyncio.run(measure_child())
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="bench-startup-")
+    env = child_environment(args, workdir)
+    runs = [run_child(env) for _ in range(args.runs)]
+
+    results = {phase: summarize([run["timings"][phase] for run in runs]) for phase in PHASES}
+    for phase in PHASES:
+        result = results[phase]
+        print(f"{phase:>14}: p50={format_seconds(result['p50'])} p95={format_seconds(result['p95'])} max={format_seconds(result['max'])}")
+    last = runs[-1]
+    print(f"модулей после импорта: {last['modules']}, RSS: {last['rss_mb'] or 0:.0f}MB, готов: {all(run['ready'] for run in runs)}")
+    print(f"ресурсы при старте: { {name: format_seconds(value) for name, value in last['resource_timings'].items()} }")
+
+    imports = slowest_imports(env, args.top)
+    if imports:
+        print("Самые медленные импорты из main:")
+        for module in imports:
+            print(f"  {module['module']:<40} {format_seconds(module['cumulative'])}")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "settings": {"runs": args.runs, "provider": args.provider, "mongo": "memory" if args.mongo == "memory" else "mongod", "warmup": args.warmup},
+        "results": results,
+        "imports": imports,
+    }
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.json_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for phase in PHASES:
+            before, after = baseline.get(phase, {}).get("p50"), results[phase]["p50"]
+            if before and after and after > before * (1 + args.tolerance):
+                regressions.append(f"{phase}: p50 {format_seconds(before)} -> {format_seconds(after)} (+{(after / before - 1) * 100:.0f}%)")
+        if regressions:
+            print("Регрессии относительно baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("Регрессий относительно baseline нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import os
+import time
+import asyncio
+import argparse
+import itertools
+
+import httpx
+
+from aiohttp import web
+
+from metrics import run_load, format_seconds
+from fake_telegram import message_update
+
+
+MESSAGE_METHODS = {"sendMessage", "sendDocument", "editMessageText", "editMessageReplyMarkup"}
+
+
+class FakeBotApi:
+    def __init__(self):
+        self.message_ids = itertools.count(1)
+        self.calls = {}
+        self.uploaded_bytes = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        form = await request.post()
+
+        if method not in MESSAGE_METHODS:
+            return web.json_response({"ok": True, "result": True})
+
+        result = {
+            "message_id": int(form.get("message_id") or next(self.message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": int(form.get("chat_id") or 0), "type": "private"},
+        }
+        if "text" in form:
+            result["text"] = form["text"]
+        if method == "sendDocument":
+            document = form.get("document")
+            if isinstance(document, web.FileField):
+                self.uploaded_bytes += len(document.file.read())
+                file_id = f"bench-file-{result['message_id']}"
+            else:
+                file_id = str(document)
+            result["document"] = {"file_id": file_id, "file_unique_id": file_id}
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Отправка фейковых обновлений Telegram на вебхук бота")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook", help="URL вебхука бота")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET"), help="секрет вебхука")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100, help="число разных пользователей")
+    parser.add_argument("--first-user-id", type=int, default=20_000_000)
+    parser.add_argument("--texts", default="/start,/help,/history", help="тексты сообщений через запятую, по кругу")
+    parser.add_argument("--fake-api-port", type=int, default=0, help="поднять фейковый Bot API на этом порту (TELEGRAM_API_URL бота)")
+    parser.add_argument("--drain-timeout", type=float, default=300.0, help="ожидание обработки по /healthz, с")
+    return parser.parse_args()
+
+
+async def wait_drained(client: httpx.AsyncClient, health_url: str, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get(health_url)
+            if response.is_success and response.json().get("in_flight") == 0:
+                return response.json()
+        except httpx.HTTPError:
+            return None
+        await asyncio.sleep(0.1)
+    return None
+
+
+async def main():
+    args = parse_args()
+    texts = args.texts.split(",")
+    headers = {"X-Telegram-Bot-Api-Secret-Token": args.secret} if args.secret else {}
+
+    fake_api = None
+    runner = None
+    if args.fake_api_port:
+        fake_api = FakeBotApi()
+        runner = web.AppRunner(fake_api.app())
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", args.fake_api_port).start()
+        print(f"Фейковый Bot API: http://127.0.0.1:{args.fake_api_port}")
+
+    statuses = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def send(index: int):
+            user_id = args.first_user_id + index % args.users
+            update = message_update(user_id, texts[index % len(texts)])
+            response = await client.post(args.url, json=update.model_dump(mode="json", by_alias=True, exclude_none=True), headers=headers)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        result = await run_load(send, args.updates, args.concurrency)
+        latency = result["latency"]
+        print(
+            f"ack: n={result['requests']} c={result['concurrency']} rps={result['throughput'] or 0:.1f} "
+            f"p50={format_seconds(latency['p50'])} p95={format_seconds(latency['p95'])} p99={format_seconds(latency['p99'])} "
+            f"statuses={statuses} errors={result['errors']}"
+        )
+
+        health_url = args.url.rsplit("/", 1)[0] + "/healthz"
+        health = await wait_drained(client, health_url, args.drain_timeout)
+        if health is not None:
+            elapsed = time.perf_counter() - started
+            print(f"обработано за {elapsed:.2f}s ({health.get('processed', 0) / elapsed:.1f} upd/s по данным воркера): {health}")
+
+    if fake_api:
+        print(f"Bot API вызовы: {fake_api.calls}, загружено {fake_api.uploaded_bytes} байт")
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,158 @@
+import asyncio
+import random
+import time
+import uuid
+import contextvars
+
+from contextlib import asynccontextmanager
+
+import httpx
+
+from prometheus_client import Counter, Histogram
+from tracing import client_span
+
+try:
+    from opentelemetry import propagate
+except ImportError:
+    propagate = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "PATCH", "DELETE"}
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+bot_api_request_seconds = Histogram(
+    "bot_api_request_seconds", "Длительность запросов бота к API", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+bot_api_request_errors_total = Counter(
+    "bot_api_request_errors_total", "Запросы бота к API, завершившиеся ошибкой", ["method", "route"]
+)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def tracing_headers(headers: dict | None = None) -> dict:
+    headers = dict(headers or {})
+    headers.setdefault(REQUEST_ID_HEADER, request_id_var.get() or new_request_id())
+    if propagate is not None:
+        propagate.inject(headers)
+    return headers
+
+
+def observe_request(method: str, route: str, seconds: float, error: bool = False):
+    bot_api_request_seconds.labels(method, route).observe(seconds)
+    if error:
+        bot_api_request_errors_total.labels(method, route).inc()
+
+
+class ApiClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        default_timeout: float = 10.0,
+        route_timeouts: dict | None = None,
+        retries: int = 2,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.route_timeouts = route_timeouts or {}
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        try:
+            self.client = httpx.AsyncClient(base_url=base_url, http2=http2, limits=limits, timeout=default_timeout, transport=transport)
+        except ImportError:
+            print("HTTP/2 недоступен (не установлен пакет h2), используется HTTP/1.1")
+            self.client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=default_timeout, transport=transport)
+
+    def _delay(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(0, delay)
+
+    async def request(self, method: str, route: str, **kwargs) -> httpx.Response:
+        method = method.upper()
+        with client_span(f"{method} {route}", **{"http.request.method": method, "http.route": route}) as span:
+            response = await self._request(method, route, **kwargs)
+            if span is not None:
+                span.set_attribute("http.response.status_code", response.status_code)
+            return response
+
+    async def _request(self, method: str, route: str, *, timeout: float | None = None, retries: int | None = None, **kwargs) -> httpx.Response:
+        path_params = kwargs.pop("path_params", {})
+        url = route.format(**path_params)
+        if timeout is None:
+            timeout = self.route_timeouts.get(route, self.default_timeout)
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+
+        kwargs["headers"] = tracing_headers(kwargs.get("headers"))
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, timeout=timeout, **kwargs)
+            except httpx.TransportError:
+                observe_request(method, route, time.perf_counter() - started, error=True)
+                if attempt >= retries:
+                    raise
+            else:
+                failed = response.status_code in RETRYABLE_STATUS_CODES
+                observe_request(method, route, time.perf_counter() - started, error=response.is_error)
+                if not failed or attempt >= retries:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, route: str, *, timeout: float | None = None, **kwargs):
+        method = method.upper()
+        path_params = kwargs.pop("path_params", {})
+        url = route.format(**path_params)
+        if timeout is None:
+            timeout = self.route_timeouts.get(route, self.default_timeout)
+
+        with client_span(f"{method} {route}", **{"http.request.method": method, "http.route": route}):
+            kwargs["headers"] = tracing_headers(kwargs.get("headers"))
+            started = time.perf_counter()
+            observed = False
+            try:
+                async with self.client.stream(method, url, timeout=timeout, **kwargs) as response:
+                    observe_request(method, route, time.perf_counter() - started, error=response.is_error)
+                    observed = True
+                    yield response
+            except httpx.TransportError:
+                if not observed:
+                    observe_request(method, route, time.perf_counter() - started, error=True)
+                raise
+
+    async def get(self, route: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", route, **kwargs)
+
+    async def post(self, route: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", route, **kwargs)
+
+    async def patch(self, route: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", route, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -1,15 +1,25 @@
 import os
 import asyncio
-import httpx
-import json
+
+from html import escape
 
 from aiogram import Dispatcher, Bot, types, F
 from aiogram.client.default import DefaultBotProperties
-from urllib.parse import unquote
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart, Command
-from aiogram.types import Message, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, CallbackQuery, BufferedInputFile, FSInputFile
+from aiogram.types import Message, CallbackQuery, InputFile, InlineKeyboardMarkup, InlineKeyboardButton
 from dotenv import load_dotenv
+from prometheus_client import start_http_server
+from api_client import ApiClient
+from tracing import enable_tracing, shutdown_tracing
+from handler_metrics import install_handler_metrics
+from throttling import Limit, ThrottlingMiddleware, create_throttle_backend, install_throttling
+from webhook import WebhookServer, serve, run_workers
+from profile_cache import ProfileCache
+from translations import Translations, ButtonTextFilter
 
 load_dotenv()
 dp = Dispatcher()
@@ -17,50 +27,110 @@ dp = Dispatcher()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 API_KEY = os.getenv("API_KEY")
 
+API_HTTP2 = os.getenv("API_HTTP2", "0") == "1"
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "100"))
+API_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", "20"))
+API_KEEPALIVE_EXPIRY = float(os.getenv("API_KEEPALIVE_EXPIRY", "30"))
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "10"))
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.2"))
+API_ROUTE_TIMEOUTS = {
+    "/projects/get_project": float(os.getenv("API_PROJECT_TIMEOUT", "500")),
+    "/projects/{project_id}/pdf": float(os.getenv("API_PDF_TIMEOUT", "60")),
+}
+PDF_STREAM_CHUNK_SIZE = int(os.getenv("PDF_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+PROJECT_JOB_TIMEOUT = float(os.getenv("PROJECT_JOB_TIMEOUT", "500"))
+PROJECT_JOB_POLL_INTERVAL = float(os.getenv("PROJECT_JOB_POLL_INTERVAL", "2"))
+PROJECT_JOB_MAX_POLL_INTERVAL = float(os.getenv("PROJECT_JOB_MAX_POLL_INTERVAL", "5"))
+
+PROJECT_HISTORY_PAGE_SIZE = int(os.getenv("PROJECT_HISTORY_PAGE_SIZE", "5"))
+PROJECT_HISTORY_DESCRIPTION_LIMIT = int(os.getenv("PROJECT_HISTORY_DESCRIPTION_LIMIT", "200"))
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+BOT_METRICS_PORT = int(os.getenv("BOT_METRICS_PORT", "0"))
+
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "0") == "1"
+if OTEL_ENABLED:
+    enable_tracing()
+
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "1"))
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100"))
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+THROTTLE_ENABLED = os.getenv("THROTTLE_ENABLED", "1") == "1"
+THROTTLE_BACKEND = os.getenv("THROTTLE_BACKEND", "memory")
+THROTTLE_REDIS_URL = os.getenv("THROTTLE_REDIS_URL")
+THROTTLE_LIMITS = {
+    "default": Limit(float(os.getenv("THROTTLE_DEFAULT_PER_MINUTE", "30")), int(os.getenv("THROTTLE_DEFAULT_BURST", "10"))),
+    "menu": Limit(float(os.getenv("THROTTLE_MENU_PER_MINUTE", "60")), int(os.getenv("THROTTLE_MENU_BURST", "15"))),
+    "settings": Limit(float(os.getenv("THROTTLE_SETTINGS_PER_MINUTE", "20")), int(os.getenv("THROTTLE_SETTINGS_BURST", "5"))),
+    "generation": Limit(float(os.getenv("THROTTLE_GENERATION_PER_MINUTE", "2")), int(os.getenv("THROTTLE_GENERATION_BURST", "2"))),
+}
+THROTTLE_GLOBAL_PER_SECOND = float(os.getenv("THROTTLE_GLOBAL_PER_SECOND", "0"))
+THROTTLE_CALLBACK_DEBOUNCE = float(os.getenv("THROTTLE_CALLBACK_DEBOUNCE", "1"))
+THROTTLE_NOTICE_INTERVAL = float(os.getenv("THROTTLE_NOTICE_INTERVAL", "10"))
+
+WEBHOOK_MULTI_PROCESS = BOT_MODE == "webhook" and WEBHOOK_WORKERS > 1
+if WEBHOOK_MULTI_PROCESS and THROTTLE_ENABLED and THROTTLE_BACKEND != "redis":
+    raise ValueError("WEBHOOK_WORKERS > 1 требует THROTTLE_BACKEND=redis: лимиты в памяти не разделяются между процессами")
+
+api_client: ApiClient | None = None
+profile_cache = ProfileCache(max_size=0 if WEBHOOK_MULTI_PROCESS else PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_DIR = os.path.join(BASE_DIR, "api", "db")
 
 translations_file = "translations.json"
-translations_data = {}
-
-def load_translations(filepath):
-    global translations_data
-    with open(filepath, 'r', encoding='utf-8') as f:
-        translations_data = json.load(f)
-        
-def get_translated_text(key, lang_code="en", **kwargs):
-    translation_dict = translations_data.get(key, {})
-    text = translation_dict.get(lang_code, translation_dict.get("en", ""))
-    return text.format(**kwargs)
-
-def is_button_text_for_key(message_text: str, key: str) -> bool:
-    translations_for_key = translations_data.get(key, {})
-    for translated_text in translations_for_key.values():
-        if translated_text == message_text:
-            return True
-    return False
-
-load_translations(translations_file)
-
-async def keyboard_buttons(lang_code:str):
-    button_user = KeyboardButton(text=get_translated_text("button_user", lang_code))
-    button_history = KeyboardButton(text=get_translated_text("button_history", lang_code))
-    button_projects = KeyboardButton(text=get_translated_text("button_projects", lang_code))
-    button_help = KeyboardButton(text=get_translated_text("button_help", lang_code))
-    button_settings = KeyboardButton(text=get_translated_text("button_settings", lang_code))
-    button_request = KeyboardButton(text=get_translated_text("button_request", lang_code))
-
-    keyboard_button_markup = ReplyKeyboardMarkup(
-        keyboard=[
-            [button_user, button_history, button_projects],
-            [button_settings, button_request, button_help],
-        ],
-        resize_keyboard=True
-    )
-    return keyboard_button_markup
-
-@dp.message(CommandStart())
+translations = Translations.load(translations_file)
+get_translated_text = translations.get
+
+
+async def notify_throttled(message: Message):
+    user_data = profile_cache.get(message.from_user.id) or {}
+    current_lang = user_data.get("language_code") or message.from_user.language_code or "en"
+    await message.answer(get_translated_text("too_many_requests", current_lang))
+
+
+throttling = ThrottlingMiddleware(
+    create_throttle_backend(THROTTLE_BACKEND, THROTTLE_REDIS_URL),
+    THROTTLE_LIMITS,
+    global_limit=Limit(THROTTLE_GLOBAL_PER_SECOND * 60, max(1, int(THROTTLE_GLOBAL_PER_SECOND))) if THROTTLE_GLOBAL_PER_SECOND else None,
+    callback_debounce=THROTTLE_CALLBACK_DEBOUNCE,
+    notice_interval=THROTTLE_NOTICE_INTERVAL,
+    on_throttled=notify_throttled,
+)
+if THROTTLE_ENABLED:
+    install_throttling(dp, throttling)
+install_handler_metrics(dp)
+
+button_handlers = {}
+
+def button_handler(key: str):
+    def register(handler):
+        button_handlers[key] = handler
+        return handler
+    return register
+
+async def get_user_data(user_id: int) -> dict:
+    user_data = profile_cache.get(user_id)
+    if user_data is not None:
+        return user_data
+
+    response = await api_client.get("/users/{telegram_id}", path_params={"telegram_id": user_id})
+    response.raise_for_status()
+    user_data = response.json()
+    profile_cache.set(user_id, user_data)
+    return user_data
+
+@dp.message(CommandStart(), flags={"throttling": "settings"})
 async def command_start_handler(message: Message):
     user_id = message.from_user.id
     username = message.from_user.username
@@ -76,52 +146,46 @@ async def command_start_handler(message: Message):
         "language_code": language_code
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(f"{API_KEY}/users", json=user_data)
-        response.raise_for_status()
+    response = await api_client.post("/users", json=user_data)
+    response.raise_for_status()
+    profile_cache.set(user_id, response.json()["user"])
 
     choose_lang_text = get_translated_text("choose_language_text", language_code)
 
-    button_en = InlineKeyboardButton(text="English", callback_data="set_lang:en") 
-    button_ru = InlineKeyboardButton(text="Русский", callback_data="set_lang:ru")
-    button_hy = InlineKeyboardButton(text="Հայերեն", callback_data="set_lang:hy")
+    await message.answer(choose_lang_text, reply_markup=translations.language_keyboard())
 
-    choose_language_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [button_en, button_ru, button_hy]
-        ]
-    )
-
-    await message.answer(choose_lang_text, reply_markup=choose_language_markup)
-
-@dp.callback_query(F.data.startswith("set_lang:"))
+@dp.callback_query(F.data.startswith("set_lang:"), flags={"throttling": "settings"})
 async def set_language_handler(callback: CallbackQuery):
     lang = callback.data.split(":")[1]
     user_id = callback.from_user.id
 
-    async with httpx.AsyncClient() as client:
-        response = await client.patch(
-            f"{API_KEY}/users/{user_id}/language", 
-            json={"language_code": lang}
-        )
-        response.raise_for_status()
+    response = await api_client.patch(
+        "/users/{telegram_id}/language",
+        path_params={"telegram_id": user_id},
+        json={"language_code": lang}
+    )
+    response.raise_for_status()
+    profile_cache.set(user_id, response.json()["user"])
 
     welcome_text = get_translated_text("welcome_message", lang)
 
     await callback.message.edit_reply_markup(reply_markup=None)
-    await callback.message.answer(welcome_text, reply_markup=await keyboard_buttons(lang))
+    await callback.message.answer(welcome_text, reply_markup=translations.main_keyboard(lang))
 
     await callback.answer()
 
-@dp.message(lambda message: is_button_text_for_key(message.text, "button_user"))
+@dp.message(ButtonTextFilter(translations), flags={"throttling": "menu"})
+async def button_dispatch(message: types.Message, button_key: str):
+    handler = button_handlers.get(button_key)
+    if handler:
+        await handler(message)
+
+@button_handler("button_user")
 async def user_button_handler(message: types.Message):
     user_id = message.from_user.id
     user_data = None
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en") 
 
@@ -149,15 +213,12 @@ async def user_button_handler(message: types.Message):
 
     await message.answer(user_text)
 
-@dp.message(lambda message: is_button_text_for_key(message.text, "button_projects"))
+@button_handler("button_projects")
 async def projects_button_handler(message: types.Message):
     user_id = message.from_user.id
     user_data = None
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en")
 
@@ -165,15 +226,12 @@ async def projects_button_handler(message: types.Message):
 
     await message.answer(project_text)
 
-@dp.message(lambda message: is_button_text_for_key(message.text, "button_request"))
+@button_handler("button_request")
 async def request_button_handler(message: types.Message):
     user_id = message.from_user.id
     user_data = None
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en")
 
@@ -181,42 +239,27 @@ async def request_button_handler(message: types.Message):
 
     await message.answer(request_text)
 
-@dp.message(lambda message: is_button_text_for_key(message.text, "button_settings"))
+@button_handler("button_settings")
 async def settings_button_handler(message: types.Message):
     user_id = message.from_user.id
     user_data = None
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en")
 
     settings_text = get_translated_text("choose_language_text", current_lang)
 
-    button_en = InlineKeyboardButton(text="English", callback_data="set_lang:en") 
-    button_ru = InlineKeyboardButton(text="Русский", callback_data="set_lang:ru")
-    button_hy = InlineKeyboardButton(text="Հայերեն", callback_data="set_lang:hy")
+    await message.answer(settings_text, reply_markup=translations.language_keyboard())
 
-    settings_language = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [button_en, button_ru, button_hy]
-        ]
-    )
 
-    await message.answer(settings_text, reply_markup = settings_language)
-
-
-@dp.message(lambda message: is_button_text_for_key(message.text, "button_help") or message.text == "/help")
+@dp.message(Command("help"), flags={"throttling": "menu"})
+@button_handler("button_help")
 async def help_button_or_command_handler(message: types.Message):
     user_id = message.from_user.id
     user_data = None
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json() 
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en")
 
@@ -224,144 +267,153 @@ async def help_button_or_command_handler(message: types.Message):
 
     await message.answer(help_text)
 
-@dp.message(Command("choose_profession"))
+@dp.message(Command("choose_profession"), flags={"throttling": "settings"})
 async def set_profession(message: types.Message):
     user_id = message.from_user.id
     user_data = None
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json() 
+    user_data = await get_user_data(user_id)
 
     current_lang = user_data.get("language_code", "en")
 
     set_profession_text = get_translated_text("set_profession_text", current_lang)
 
-    programmer_button = InlineKeyboardButton(text = get_translated_text("programmer_translated", current_lang), callback_data="choose_profession:programmer")
-    desinger_button = InlineKeyboardButton(text = get_translated_text("desinger_translated", current_lang), callback_data="choose_profession:desinger")
-    marketer_button = InlineKeyboardButton(text = get_translated_text("marketer_translated", current_lang), callback_data="choose_profession:marketer")
+    await message.answer(set_profession_text, reply_markup=translations.profession_keyboard(current_lang))
 
-    profession_inline_button = InlineKeyboardMarkup(
-        inline_keyboard = [
-            [programmer_button],[desinger_button], [marketer_button]
-        ]
-    )
 
-    await message.answer(set_profession_text, reply_markup = profession_inline_button)
-
-
-@dp.callback_query(F.data.startswith("choose_profession:"))
+@dp.callback_query(F.data.startswith("choose_profession:"), flags={"throttling": "settings"})
 async def handle_profession_choice(callback: CallbackQuery):
     profession = callback.data.split(":")[1]
     user_id = callback.from_user.id
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
     current_lang = user_data.get("language_code", "en")
 
+    level_inline_markup = translations.level_keyboard(current_lang, profession)
+    if level_inline_markup is None:
+        await callback.answer()
+        return
+
     await callback.message.edit_reply_markup(reply_markup=None)
 
     set_level_text = get_translated_text("set_level_text", current_lang)
 
-    beginer_button = InlineKeyboardButton(text=get_translated_text("level_beginer_translated", current_lang), callback_data=f"choose_level:{profession}:beginer")
-    experienced_button = InlineKeyboardButton(text=get_translated_text("level_experienced_translated", current_lang), callback_data=f"choose_level:{profession}:experienced")
-    advanced_button = InlineKeyboardButton(text=get_translated_text("level_advanced_translated", current_lang), callback_data=f"choose_level:{profession}:advanced")
-
-    level_inline_markup = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [beginer_button], [experienced_button], [advanced_button]
-        ]
-    )
-    
     await callback.message.answer(set_level_text, reply_markup=level_inline_markup)
     await callback.answer()
 
-@dp.callback_query(F.data.startswith("choose_level:"))
+@dp.callback_query(F.data.startswith("choose_level:"), flags={"throttling": "settings"})
 async def handle_level_choice(callback: CallbackQuery):
     _, profession, level = callback.data.split(":")
     user_id = callback.from_user.id
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
     current_lang = user_data.get("language_code", "en")
 
+    specialization_markup = translations.specialization_keyboard(current_lang, profession, level)
+    if specialization_markup is None:
+        await callback.answer()
+        return
+
     await callback.message.edit_reply_markup(reply_markup=None)
 
     text_message = get_translated_text("choose_specialization_text", current_lang)
-    
 
-    if profession == "programmer":
-        buttons = [
-            [InlineKeyboardButton(text=get_translated_text("specialization_python_fastapi", current_lang), callback_data=f"set_specialization:{profession}:{level}:Python(FastAPI)")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_python_telegram_bots", current_lang), callback_data=f"set_specialization:{profession}:{level}:Python(Telegram Bots)")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_python_django", current_lang), callback_data=f"set_specialization:{profession}:{level}:Python(Django)")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_vuejs", current_lang), callback_data=f"set_specialization:{profession}:{level}:Vue.js")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_nextjs", current_lang), callback_data=f"set_specialization:{profession}:{level}:Next.js")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_nodejs", current_lang), callback_data=f"set_specialization:{profession}:{level}:Node.js")]
-        ]
-    elif profession == "desinger":
-        buttons = [
-            [InlineKeyboardButton(text=get_translated_text("specialization_graphic_designer", current_lang), callback_data=f"set_specialization:{profession}:{level}:Graphic Designer")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_ui_ux_designer", current_lang), callback_data=f"set_specialization:{profession}:{level}:UI/UX Designer")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_web_designer", current_lang), callback_data=f"set_specialization:{profession}:{level}:Web Designer")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_motion_designer", current_lang), callback_data=f"set_specialization:{profession}:{level}:Motion Designer")]
-        ]
-    elif profession == "marketer":
-        buttons = [
-            [InlineKeyboardButton(text=get_translated_text("specialization_digital_marketing", current_lang), callback_data=f"set_specialization:{profession}:{level}:Digital Marketing")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_content_marketing", current_lang), callback_data=f"set_specialization:{profession}:{level}:Content Marketing")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_seo_specialist", current_lang), callback_data=f"set_specialization:{profession}:{level}:SEO Specialist")],
-            [InlineKeyboardButton(text=get_translated_text("specialization_social_media_marketing", current_lang), callback_data=f"set_specialization:{profession}:{level}:Social Media Marketing")]
-        ]
-
-    specialization_markup = InlineKeyboardMarkup(inline_keyboard=buttons)
     await callback.message.answer(text_message, reply_markup=specialization_markup)
     await callback.answer()
 
-@dp.callback_query(F.data.startswith("set_specialization:"))
+@dp.callback_query(F.data.startswith("set_specialization:"), flags={"throttling": "settings"})
 async def handle_specialization_choice(callback: CallbackQuery):
     _, profession, level, specialization = callback.data.split(":")
     user_id = callback.from_user.id
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json() 
-
-    current_lang = user_data.get("language_code", "en")
-
     profession_level_data = {
         "profession": profession,
         "level": level,
         "specialization": specialization
     }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.patch(
-            f"{API_KEY}/users/{user_id}/profession_level",
-            json=profession_level_data
-        )
-        response.raise_for_status()
+    response = await api_client.patch(
+        "/users/{telegram_id}/profession_level",
+        path_params={"telegram_id": user_id},
+        json=profession_level_data
+    )
+    response.raise_for_status()
+    user_data = response.json()["user"]
+    profile_cache.set(user_id, user_data)
+
+    current_lang = user_data.get("language_code") or "en"
 
     await callback.message.edit_reply_markup(reply_markup=None)
     await callback.message.edit_text(get_translated_text("profession_level_set_success", current_lang))
     await callback.answer()
 
 
-@dp.message(Command("get_project"))
+class ProjectPdfInputFile(InputFile):
+    def __init__(self, project_id: str, chunk_size: int = PDF_STREAM_CHUNK_SIZE):
+        super().__init__(filename=f"project_{project_id}.pdf", chunk_size=chunk_size)
+        self.project_id = project_id
+
+    async def read(self, bot: Bot):
+        async with api_client.stream("GET", "/projects/{project_id}/pdf", path_params={"project_id": self.project_id}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                yield chunk
+
+
+async def send_project_pdf(message: types.Message, telegram_id: int, project_id: str, lang_code: str, telegram_file_id: str | None = None):
+    if telegram_file_id:
+        try:
+            await message.answer_document(telegram_file_id)
+            return
+        except TelegramBadRequest as e:
+            print(f"Telegram отклонил file_id проекта {project_id}, загружаем заново: {e}")
+
+    try:
+        sent_message = await message.answer_document(ProjectPdfInputFile(project_id))
+    except Exception as e:
+        print(f"Не удалось отправить PDF проекта {project_id}: {e}")
+        await message.answer(get_translated_text("failed_to_send_pdf", lang_code))
+        return
+
+    file_id = sent_message.document.file_id
+    response = await api_client.patch(
+        "/projects/{project_id}/telegram_file_id",
+        path_params={"project_id": project_id},
+        json={"telegram_file_id": file_id}
+    )
+    if response.is_success:
+        profile_cache.update(telegram_id, {"current_project_telegram_file_id": file_id})
+
+
+async def wait_for_project_job(job: dict, on_progress=None) -> dict:
+    deadline = asyncio.get_running_loop().time() + PROJECT_JOB_TIMEOUT
+    poll_interval = PROJECT_JOB_POLL_INTERVAL
+
+    while job.get("status") not in ("done", "failed"):
+        if on_progress:
+            await on_progress(job)
+        if asyncio.get_running_loop().time() > deadline:
+            return job
+        await asyncio.sleep(poll_interval)
+        poll_interval = min(poll_interval * 1.5, PROJECT_JOB_MAX_POLL_INTERVAL)
+
+        response = await api_client.get("/projects/jobs/{job_id}", path_params={"job_id": job["job_id"]})
+        if response.status_code == 404:
+            response = await api_client.get("/users/{telegram_id}/project_job", path_params={"telegram_id": job["telegram_id"]})
+        if response.status_code == 404:
+            continue
+        response.raise_for_status()
+        job = response.json()
+
+    return job
+
+
+@dp.message(Command("get_project"), flags={"throttling": "generation"})
 async def get_project_cmd(message: types.Message):
     user_id = message.from_user.id
     user_data = None
     
-    async with httpx.AsyncClient(timeout=500.0) as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
 
     current_lang = user_data.get("language_code", "en")
@@ -380,41 +432,54 @@ async def get_project_cmd(message: types.Message):
     level = user_data["level"]
     specialization = user_data["specialization"]
 
-    async with httpx.AsyncClient(timeout=500.0) as http_client:
-            response = await http_client.post(
-                f"{API_KEY}/projects/get_project",
-                json={
-                    "telegram_id": user_id,
-                    "profession": profession,
-                    "level": level,
-                    "specialization": specialization,
-                    "language_code": current_lang
-                }
-            )
-            response.raise_for_status() 
-
-            pdf_file_binary = await response.aread()
-            
-            project_title = unquote(response.headers.get("X-Project-Title", "Сгенерированный план проекта"))
-            project_description = unquote(response.headers.get("X-Project-Description", "Подробное описание проекта."))
-            project_id = response.headers.get("X-Project-Id", "unknown")
-
-            final_text = get_translated_text("new_project_details", current_lang, title=f"<b>{project_title}</b>", description=project_description)
-            await message.answer(final_text, parse_mode=ParseMode.HTML)
-            
-            pdf_file_name = f"project_{project_id}.pdf"
-            await message.answer_document(BufferedInputFile(pdf_file_binary, filename=pdf_file_name)) 
-
-
-@dp.message(Command("project"))
+    response = await api_client.post(
+        "/projects/jobs",
+        json={
+            "telegram_id": user_id,
+            "profession": profession,
+            "level": level,
+            "specialization": specialization,
+            "language_code": current_lang
+        }
+    )
+    if response.status_code == 400:
+        profile_cache.invalidate(user_id)
+        await message.answer(get_translated_text("already_have_project", current_lang))
+        return
+    if response.status_code == 409:
+        await message.answer(get_translated_text("project_generation_in_progress", current_lang))
+        return
+    if response.status_code == 503:
+        await message.answer(get_translated_text("generation_queue_busy", current_lang))
+        return
+    response.raise_for_status()
+
+    details_sent = False
+
+    async def send_project_details(job: dict):
+        nonlocal details_sent
+        if details_sent or not job.get("title") or not job.get("description"):
+            return
+        details_sent = True
+        final_text = get_translated_text("new_project_details", current_lang, title=f"<b>{job['title']}</b>", description=job["description"])
+        await message.answer(final_text, parse_mode=ParseMode.HTML)
+
+    job = await wait_for_project_job(response.json(), on_progress=send_project_details)
+    profile_cache.invalidate(user_id)
+    if job.get("status") != "done":
+        await message.answer(get_translated_text("project_generation_failed", current_lang))
+        return
+
+    await send_project_details(job)
+    await send_project_pdf(message, user_id, job["project_id"], current_lang)
+
+
+@dp.message(Command("project"), flags={"throttling": "menu"})
 async def check_project(message: types.Message):
     user_id = message.from_user.id
     user_data = None
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"{API_KEY}/users/{user_id}")
-        response.raise_for_status()
-        user_data = response.json()
+    user_data = await get_user_data(user_id)
 
 
     current_lang = user_data.get("language_code", "en")
@@ -431,22 +496,155 @@ async def check_project(message: types.Message):
     elif current_project_id:
         project_title = user_data.get("current_project_title")
         project_desc = user_data.get("current_project_description")
-        pdf_path = user_data.get("current_project_pdf_path")
 
+        await message.answer(f"📌 <b>{project_title}</b>\n\n{project_desc}", parse_mode="HTML")
 
-        full_pdf_path = os.path.join(DB_DIR, pdf_path)
+        await send_project_pdf(message, user_id, current_project_id, current_lang, user_data.get("current_project_telegram_file_id"))
+
+
+async def render_history_page(user_id: int, lang_code: str, start: int = 0, cursor: str | None = None):
+    params = {"limit": PROJECT_HISTORY_PAGE_SIZE}
+    if cursor:
+        params["cursor"] = cursor
+    response = await api_client.get("/users/{telegram_id}/projects", path_params={"telegram_id": user_id}, params=params)
+    response.raise_for_status()
+    page = response.json()
+
+    if not page["items"]:
+        return get_translated_text("history_empty", lang_code), None
+
+    lines = [get_translated_text("history_title", lang_code)]
+    for index, project in enumerate(page["items"], start=start + 1):
+        description = project.get("description") or ""
+        if len(description) > PROJECT_HISTORY_DESCRIPTION_LIMIT:
+            description = description[:PROJECT_HISTORY_DESCRIPTION_LIMIT].rstrip() + "…"
+        status = project.get("status") or ""
+        lines.append(get_translated_text(
+            "history_item", lang_code,
+            index=index,
+            title=escape(project.get("title") or ""),
+            date=(project.get("created_at") or "")[:10],
+            status=get_translated_text(f"project_status_{status}", lang_code) or status,
+            description=escape(description)
+        ))
+
+    buttons = []
+    if start:
+        buttons.append(InlineKeyboardButton(text=get_translated_text("history_first", lang_code), callback_data="history:0:"))
+    if page.get("next_cursor"):
+        next_start = start + len(page["items"])
+        buttons.append(InlineKeyboardButton(text=get_translated_text("history_next", lang_code), callback_data=f"history:{next_start}:{page['next_cursor']}"))
+
+    return "\n\n".join(lines), InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+
+
+@dp.message(Command("history"), flags={"throttling": "menu"})
+@button_handler("button_history")
+async def history_button_or_command_handler(message: types.Message):
+    user_id = message.from_user.id
+    user_data = await get_user_data(user_id)
+    current_lang = user_data.get("language_code", "en")
+
+    text, markup = await render_history_page(user_id, current_lang)
+    await message.answer(text, reply_markup=markup, parse_mode=ParseMode.HTML)
+
+
+@dp.callback_query(F.data.startswith("history:"), flags={"throttling": "menu"})
+async def handle_history_page(callback: CallbackQuery):
+    _, start, cursor = callback.data.split(":", 2)
+    user_id = callback.from_user.id
+    user_data = await get_user_data(user_id)
+    current_lang = user_data.get("language_code", "en")
+
+    text, markup = await render_history_page(user_id, current_lang, int(start), cursor or None)
+    try:
+        await callback.message.edit_text(text, reply_markup=markup, parse_mode=ParseMode.HTML)
+    except TelegramBadRequest:
+        pass
+    await callback.answer()
+
+
+def create_api_client() -> ApiClient:
+    return ApiClient(
+        API_KEY,
+        http2=API_HTTP2,
+        max_connections=API_MAX_CONNECTIONS,
+        max_keepalive_connections=API_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=API_KEEPALIVE_EXPIRY,
+        default_timeout=API_TIMEOUT,
+        route_timeouts=API_ROUTE_TIMEOUTS,
+        retries=API_RETRIES,
+        backoff=API_RETRY_BACKOFF,
+    )
 
-        await message.answer(f"📌 <b>{project_title}</b>\n\n{project_desc}", parse_mode="HTML")
 
-        if os.path.exists(full_pdf_path):
-            await message.answer_document(types.FSInputFile(full_pdf_path))
-        else:
-            await message.answer(get_translated_text("failed_to_send_pdf", current_lang))
+def create_bot() -> Bot:
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
+    return Bot(token=BOT_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+
+async def start_runtime(worker_index: int = 0) -> Bot:
+    global api_client
+
+    api_client = create_api_client()
+    if BOT_METRICS_PORT:
+        start_http_server(BOT_METRICS_PORT + worker_index)
+    return create_bot()
+
+
+async def stop_runtime(bot: Bot):
+    cache_stats = profile_cache.stats()
+    print(f"profile cache: hits={cache_stats['hits']} misses={cache_stats['misses']} size={cache_stats['size']}")
+    throttle_stats = throttling.stats()
+    print(f"throttling: passed={throttle_stats['passed']} dropped={throttle_stats['dropped']}")
+    await throttling.backend.close()
+    await api_client.aclose()
+    await bot.session.close()
+    shutdown_tracing()
 
 
 async def main():
-    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    await dp.start_polling(bot)
+    bot = await start_runtime()
+    try:
+        await dp.start_polling(bot)
+    finally:
+        await stop_runtime(bot)
+
+
+async def register_webhook():
+    bot = create_bot()
+    try:
+        await bot.set_webhook(
+            WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    finally:
+        await bot.session.close()
+
+
+async def webhook_main(worker_index: int = 0):
+    bot = await start_runtime(worker_index)
+    server = WebhookServer(dp, bot, path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET, max_in_flight=WEBHOOK_MAX_IN_FLIGHT)
+    try:
+        await serve(server, WEBHOOK_HOST, WEBHOOK_PORT, reuse_port=WEBHOOK_WORKERS > 1)
+    finally:
+        stats = server.stats()
+        print(f"webhook worker {worker_index}: accepted={stats['accepted']} rejected={stats['rejected']} failed={stats['failed']}")
+        await stop_runtime(bot)
+
+
+def run_webhook_worker(worker_index: int):
+    asyncio.run(webhook_main(worker_index))
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == "webhook":
+        if WEBHOOK_URL:
+            asyncio.run(register_webhook())
+        run_workers(run_webhook_worker, WEBHOOK_WORKERS)
+    elif BOT_MODE == "polling":
+        asyncio.run(main())
+    else:
+        raise ValueError(f"Неизвестный BOT_MODE: {BOT_MODE}")
\ No newline at end of file
@@ -0,0 +1,40 @@
+import time
+
+from aiogram import BaseMiddleware
+from prometheus_client import Counter, Histogram
+
+from api_client import request_id_var, new_request_id
+
+
+HANDLER_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+bot_handler_seconds = Histogram(
+    "bot_handler_seconds", "Длительность обработчиков бота", ["handler", "event"], buckets=HANDLER_BUCKETS
+)
+bot_handler_errors_total = Counter(
+    "bot_handler_errors_total", "Ошибки в обработчиках бота", ["handler", "event"]
+)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    def __init__(self, event: str):
+        self.event = event
+
+    async def __call__(self, handler, event, data):
+        handler_object = data.get("handler")
+        name = getattr(getattr(handler_object, "callback", None), "__name__", "unknown")
+        token = request_id_var.set(new_request_id())
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            bot_handler_errors_total.labels(name, self.event).inc()
+            raise
+        finally:
+            bot_handler_seconds.labels(name, self.event).observe(time.perf_counter() - started)
+            request_id_var.reset(token)
+
+
+def install_handler_metrics(dp):
+    dp.message.middleware(HandlerMetricsMiddleware("message"))
+    dp.callback_query.middleware(HandlerMetricsMiddleware("callback_query"))
@@ -0,0 +1,59 @@
+import time
+
+from collections import OrderedDict
+
+
+class ProfileCache:
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, telegram_id: int):
+        entry = self.entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, profile = entry
+        if expires_at < time.monotonic():
+            del self.entries[telegram_id]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(telegram_id)
+        self.hits += 1
+        return dict(profile)
+
+    def set(self, telegram_id: int, profile: dict):
+        if self.max_size <= 0:
+            return
+        self.entries[telegram_id] = (time.monotonic() + self.ttl, dict(profile))
+        self.entries.move_to_end(telegram_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, telegram_id: int, fields: dict):
+        entry = self.entries.get(telegram_id)
+        if entry is None:
+            return
+        profile = dict(entry[1])
+        profile.update(fields)
+        self.set(telegram_id, profile)
+
+    def invalidate(self, telegram_id: int):
+        self.entries.pop(telegram_id, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else None,
+        }
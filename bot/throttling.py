@@ -0,0 +1,166 @@
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message
+from prometheus_client import Counter
+
+
+DEFAULT_LIMIT_CLASS = "default"
+
+bot_updates_dropped_total = Counter(
+    "bot_updates_dropped_total", "Обновления, отброшенные троттлингом", ["reason", "limit_class"]
+)
+
+REDIS_TOKEN_BUCKET = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return allowed
+"""
+
+
+class Limit:
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+
+
+class MemoryThrottleBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.marks = {}
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> bool:
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self.buckets[key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self._prune_buckets()
+        return allowed
+
+    async def seen(self, key: str, ttl: float) -> bool:
+        now = time.monotonic()
+        expires_at = self.marks.get(key)
+        if expires_at is not None and expires_at > now:
+            return True
+        self.marks[key] = now + ttl
+        if len(self.marks) > self.max_keys:
+            self.marks = {key: expires_at for key, expires_at in self.marks.items() if expires_at > now}
+        return False
+
+    def _prune_buckets(self):
+        oldest = sorted(self.buckets.items(), key=lambda item: item[1][1])[:len(self.buckets) // 2]
+        for key, _ in oldest:
+            del self.buckets[key]
+
+    async def close(self):
+        pass
+
+
+class RedisThrottleBackend:
+    def __init__(self, url: str, prefix: str = "throttle:"):
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(url)
+        self.prefix = prefix
+        self.script = self.redis.register_script(REDIS_TOKEN_BUCKET)
+
+    async def take(self, key: str, limit: Limit, cost: float = 1.0) -> bool:
+        return bool(await self.script(keys=[self.prefix + key], args=[limit.rate, limit.burst, cost]))
+
+    async def seen(self, key: str, ttl: float) -> bool:
+        return not await self.redis.set(self.prefix + key, 1, nx=True, px=max(1, int(ttl * 1000)))
+
+    async def close(self):
+        await self.redis.aclose()
+
+
+def create_throttle_backend(kind: str, redis_url: str | None = None):
+    if kind == "memory":
+        return MemoryThrottleBackend()
+    if kind == "redis":
+        if not redis_url:
+            raise ValueError("Для THROTTLE_BACKEND=redis нужен THROTTLE_REDIS_URL")
+        return RedisThrottleBackend(redis_url)
+    raise ValueError(f"Неизвестный бэкенд троттлинга: {kind}")
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, backend, limits: dict, global_limit: Limit | None = None, callback_debounce: float = 1.0, notice_interval: float = 10.0, on_throttled=None):
+        self.backend = backend
+        self.limits = limits
+        self.global_limit = global_limit
+        self.callback_debounce = callback_debounce
+        self.notice_interval = notice_interval
+        self.on_throttled = on_throttled
+        self.passed = 0
+        self.dropped = {}
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        limit_class = get_flag(data, "throttling", default=DEFAULT_LIMIT_CLASS)
+        reason = await self._check(event, user.id, limit_class)
+        if reason is None:
+            self.passed += 1
+            return await handler(event, data)
+
+        key = (reason, limit_class)
+        self.dropped[key] = self.dropped.get(key, 0) + 1
+        bot_updates_dropped_total.labels(reason, limit_class).inc()
+        await self._notify(event, user.id, reason)
+        return None
+
+    async def _check(self, event, user_id: int, limit_class: str) -> str | None:
+        if isinstance(event, CallbackQuery) and self.callback_debounce:
+            if await self.backend.seen(f"callback:{user_id}:{event.data}", self.callback_debounce):
+                return "duplicate_callback"
+
+        limit = self.limits.get(limit_class) or self.limits[DEFAULT_LIMIT_CLASS]
+        if not await self.backend.take(f"user:{limit_class}:{user_id}", limit):
+            return "user_limit"
+        if self.global_limit and not await self.backend.take("global", self.global_limit):
+            return "global_limit"
+        return None
+
+    async def _notify(self, event, user_id: int, reason: str):
+        if isinstance(event, CallbackQuery):
+            await event.answer()
+            return
+        if reason == "duplicate_callback" or not isinstance(event, Message) or self.on_throttled is None:
+            return
+        if await self.backend.seen(f"notice:{user_id}", self.notice_interval):
+            return
+        await self.on_throttled(event)
+
+    def stats(self):
+        return {
+            "passed": self.passed,
+            "dropped": {f"{reason}:{limit_class}": count for (reason, limit_class), count in sorted(self.dropped.items())},
+        }
+
+
+def install_throttling(dp, middleware: ThrottlingMiddleware):
+    dp.message.middleware(middleware)
+    dp.callback_query.middleware(middleware)
@@ -0,0 +1,58 @@
+import os
+
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+
+tracer = None
+tracer_provider = None
+
+
+def create_tracer_provider(service_name: str):
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        print("OpenTelemetry SDK не установлен, спаны не экспортируются")
+        return None
+
+    protocol = os.getenv("OTEL_EXPORTER_OTLP_TRACES_PROTOCOL") or os.getenv("OTEL_EXPORTER_OTLP_PROTOCOL", "grpc")
+    if protocol == "grpc":
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", service_name)}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    return provider
+
+
+def enable_tracing(service_name: str = "practice-bot") -> bool:
+    global tracer, tracer_provider
+    if trace is None:
+        print("OpenTelemetry не установлен, трассировка отключена")
+        return False
+    tracer_provider = create_tracer_provider(service_name)
+    if tracer_provider is not None:
+        trace.set_tracer_provider(tracer_provider)
+    tracer = trace.get_tracer(service_name)
+    return True
+
+
+def shutdown_tracing():
+    if tracer_provider is not None:
+        tracer_provider.shutdown()
+
+
+@contextmanager
+def client_span(name: str, **attributes):
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name, kind=trace.SpanKind.CLIENT, attributes=attributes) as span:
+        yield span
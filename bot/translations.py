@@ -0,0 +1,161 @@
+import json
+
+from aiogram.filters import BaseFilter
+from aiogram.types import Message, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup
+
+
+DEFAULT_LANGUAGE = "en"
+
+MAIN_KEYBOARD_LAYOUT = (
+    ("button_user", "button_history", "button_projects"),
+    ("button_settings", "button_request", "button_help"),
+)
+
+LANGUAGE_BUTTONS = (
+    ("English", "en"),
+    ("Русский", "ru"),
+    ("Հայերեն", "hy"),
+)
+
+PROFESSIONS = (
+    ("programmer", "programmer_translated"),
+    ("desinger", "desinger_translated"),
+    ("marketer", "marketer_translated"),
+)
+
+LEVELS = (
+    ("beginer", "level_beginer_translated"),
+    ("experienced", "level_experienced_translated"),
+    ("advanced", "level_advanced_translated"),
+)
+
+LEVEL_KEYS = {level for level, _ in LEVELS}
+
+SPECIALIZATIONS = {
+    "programmer": (
+        ("specialization_python_fastapi", "Python(FastAPI)"),
+        ("specialization_python_telegram_bots", "Python(Telegram Bots)"),
+        ("specialization_python_django", "Python(Django)"),
+        ("specialization_vuejs", "Vue.js"),
+        ("specialization_nextjs", "Next.js"),
+        ("specialization_nodejs", "Node.js"),
+    ),
+    "desinger": (
+        ("specialization_graphic_designer", "Graphic Designer"),
+        ("specialization_ui_ux_designer", "UI/UX Designer"),
+        ("specialization_web_designer", "Web Designer"),
+        ("specialization_motion_designer", "Motion Designer"),
+    ),
+    "marketer": (
+        ("specialization_digital_marketing", "Digital Marketing"),
+        ("specialization_content_marketing", "Content Marketing"),
+        ("specialization_seo_specialist", "SEO Specialist"),
+        ("specialization_social_media_marketing", "Social Media Marketing"),
+    ),
+}
+
+
+def is_template(text: str) -> bool:
+    return "{" in text or "}" in text
+
+
+class Translations:
+    def __init__(self, data: dict):
+        self.languages = sorted({lang for values in data.values() for lang in values})
+        self.templates = {}
+        for key, values in data.items():
+            fallback = values.get(DEFAULT_LANGUAGE, "")
+            for lang in self.languages:
+                text = values.get(lang, fallback)
+                self.templates[(key, lang)] = text.format if is_template(text) else text
+
+        self.button_index = {
+            text: key
+            for key, values in data.items() if key.startswith("button_")
+            for text in values.values()
+        }
+        self.keyboards = {}
+
+    @classmethod
+    def load(cls, filepath: str) -> "Translations":
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def get(self, key: str, lang_code: str = DEFAULT_LANGUAGE, **kwargs) -> str:
+        template = self.templates.get((key, lang_code))
+        if template is None:
+            template = self.templates.get((key, DEFAULT_LANGUAGE), "")
+        if isinstance(template, str):
+            return template
+        return template(**kwargs)
+
+    def language(self, lang_code: str | None) -> str:
+        return lang_code if lang_code in self.languages else DEFAULT_LANGUAGE
+
+    def button_key(self, text: str | None) -> str | None:
+        return self.button_index.get(text) if text else None
+
+    def _cached(self, cache_key, build):
+        markup = self.keyboards.get(cache_key)
+        if markup is None:
+            markup = self.keyboards[cache_key] = build()
+        return markup
+
+    def main_keyboard(self, lang_code: str) -> ReplyKeyboardMarkup:
+        lang_code = self.language(lang_code)
+        return self._cached(("main", lang_code), lambda: ReplyKeyboardMarkup(
+            keyboard=[
+                [KeyboardButton(text=self.get(key, lang_code)) for key in row]
+                for row in MAIN_KEYBOARD_LAYOUT
+            ],
+            resize_keyboard=True
+        ))
+
+    def language_keyboard(self) -> InlineKeyboardMarkup:
+        return self._cached(("language",), lambda: InlineKeyboardMarkup(
+            inline_keyboard=[
+                [InlineKeyboardButton(text=text, callback_data=f"set_lang:{lang}") for text, lang in LANGUAGE_BUTTONS]
+            ]
+        ))
+
+    def profession_keyboard(self, lang_code: str) -> InlineKeyboardMarkup:
+        lang_code = self.language(lang_code)
+        return self._cached(("profession", lang_code), lambda: InlineKeyboardMarkup(
+            inline_keyboard=[
+                [InlineKeyboardButton(text=self.get(key, lang_code), callback_data=f"choose_profession:{profession}")]
+                for profession, key in PROFESSIONS
+            ]
+        ))
+
+    def level_keyboard(self, lang_code: str, profession: str) -> InlineKeyboardMarkup | None:
+        if profession not in SPECIALIZATIONS:
+            return None
+        lang_code = self.language(lang_code)
+        return self._cached(("level", lang_code, profession), lambda: InlineKeyboardMarkup(
+            inline_keyboard=[
+                [InlineKeyboardButton(text=self.get(key, lang_code), callback_data=f"choose_level:{profession}:{level}")]
+                for level, key in LEVELS
+            ]
+        ))
+
+    def specialization_keyboard(self, lang_code: str, profession: str, level: str) -> InlineKeyboardMarkup | None:
+        if profession not in SPECIALIZATIONS or level not in LEVEL_KEYS:
+            return None
+        lang_code = self.language(lang_code)
+        return self._cached(("specialization", lang_code, profession, level), lambda: InlineKeyboardMarkup(
+            inline_keyboard=[
+                [InlineKeyboardButton(text=self.get(key, lang_code), callback_data=f"set_specialization:{profession}:{level}:{specialization}")]
+                for key, specialization in SPECIALIZATIONS[profession]
+            ]
+        ))
+
+
+class ButtonTextFilter(BaseFilter):
+    def __init__(self, translations: Translations):
+        self.translations = translations
+
+    async def __call__(self, message: Message):
+        button_key = self.translations.button_key(message.text)
+        if button_key is None:
+            return False
+        return {"button_key": button_key}
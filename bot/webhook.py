@@ -0,0 +1,129 @@
+import time
+import signal
+import asyncio
+import multiprocessing
+
+from aiohttp import web
+from aiogram.types import Update
+
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    def __init__(self, dp, bot, path: str = "/webhook", secret_token: str | None = None, max_in_flight: int = 100, drain_timeout: float = 30.0):
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.max_in_flight = max_in_flight
+        self.drain_timeout = drain_timeout
+        self.tasks = set()
+        self.in_flight = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.process_seconds = 0.0
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get(SECRET_HEADER) != self.secret_token:
+            return web.Response(status=401)
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except ValueError as e:
+            print(f"Некорректное обновление от Telegram: {e}")
+            return web.Response(status=400)
+        self.in_flight += 1
+        self.accepted += 1
+        task = asyncio.create_task(self._process(update))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update):
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Ошибка при обработке обновления {update.update_id}: {e}")
+        finally:
+            self.in_flight -= 1
+            self.process_seconds += time.perf_counter() - started
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def drain(self, app=None):
+        if self.tasks:
+            print(f"Ожидание завершения {len(self.tasks)} обновлений...")
+            await asyncio.wait(list(self.tasks), timeout=self.drain_timeout)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get("/healthz", self.handle_health)
+        app.on_shutdown.append(self.drain)
+        return app
+
+    def stats(self):
+        finished = self.processed + self.failed
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_process_seconds": self.process_seconds / finished if finished else None,
+        }
+
+
+async def serve(server: WebhookServer, host: str, port: int, reuse_port: bool = False):
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port, reuse_port=reuse_port)
+    await site.start()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+
+
+def run_workers(target, workers: int):
+    if workers <= 1:
+        target(0)
+        return
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=target, args=(index,), name=f"bot-webhook-{index}") for index in range(workers)]
+
+    def terminate(signum=None, frame=None):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        terminate()
+        for process in processes:
+            process.join()
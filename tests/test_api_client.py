@@ -0,0 +1,31 @@
+import asyncio
+
+import httpx
+
+from prometheus_client import REGISTRY
+
+from api_client import ApiClient
+
+
+def sample(name: str, route: str, method: str = "GET"):
+    return REGISTRY.get_sample_value(name, {"method": method, "route": route}) or 0
+
+
+def test_request_latency_and_errors_are_exported_per_route():
+    route = "/users/{telegram_id}/metrics-test"
+    responses = iter([httpx.Response(503), httpx.Response(200, json={})])
+
+    async def scenario():
+        client = ApiClient("http://api", backoff=0, transport=httpx.MockTransport(lambda request: next(responses)))
+        try:
+            response = await client.get(route, path_params={"telegram_id": 1})
+        finally:
+            await client.aclose()
+        assert response.status_code == 200
+
+    count = sample("bot_api_request_seconds_count", route)
+    errors = sample("bot_api_request_errors_total", route)
+    asyncio.run(scenario())
+
+    assert sample("bot_api_request_seconds_count", route) == count + 2
+    assert sample("bot_api_request_errors_total", route) == errors + 1
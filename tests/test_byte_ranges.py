@@ -0,0 +1,28 @@
+import pytest
+
+from byte_ranges import parse_range_header
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("BYTES = 10-20", (10, 20)),
+])
+def test_valid_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=0-10,20-30",
+    "items=0-10",
+    "bytes=1000-",
+    "bytes=20-10",
+    "bytes=-0",
+    "bytes=a-b",
+    "bytes=-",
+])
+def test_unsatisfiable_ranges(header):
+    assert parse_range_header(header, 1000) is None
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+
+from generation_cache import GenerationCache, settings_version
+
+
+def artifact(index: int, size: int = 100) -> dict:
+    return {"html": f"<html>{index}</html>", "pdf": bytes([index % 256]) * size, "title": f"Проект {index}", "description": "Описание"}
+
+
+def test_key_is_normalized_and_depends_on_prompt_and_version(tmp_path):
+    cache = GenerationCache(str(tmp_path), version="a")
+    key = cache.key_for("Programmer", "beginer", "Python(FastAPI)", "en", prompt="p")
+
+    assert cache.key_for(" programmer ", "BEGINER", "python(fastapi)", "en", prompt="p") == key
+    assert cache.key_for("programmer", "beginer", "Python(FastAPI)", "en", prompt="другой шаблон") != key
+    assert GenerationCache(str(tmp_path), version="b").key_for("programmer", "beginer", "Python(FastAPI)", "en", prompt="p") != key
+
+
+def test_settings_version_tracks_settings_and_template_files(tmp_path):
+    template = tmp_path / "project.css"
+    template.write_text("h1 { color: red; }", encoding="utf-8")
+    version = settings_version({"output": "html", "pdf_preset": "balanced"}, paths=[str(template)])
+
+    assert settings_version({"pdf_preset": "balanced", "output": "html"}, paths=[str(template)]) == version
+    assert settings_version({"output": "html", "pdf_preset": "small"}, paths=[str(template)]) != version
+    template.write_text("h1 { color: blue; }", encoding="utf-8")
+    assert settings_version({"output": "html", "pdf_preset": "balanced"}, paths=[str(template)]) != version
+
+
+def test_reuse_mode_returns_stored_variants_without_removing_them(tmp_path):
+    async def scenario():
+        cache = GenerationCache(str(tmp_path))
+        key = cache.key_for("programmer", "beginer", "Python(FastAPI)", "en")
+        assert await cache.get(key) is None
+
+        await cache.put(key, artifact(1))
+        await cache.put(key, artifact(2))
+
+        assert await cache.count(key) == 2
+        first = await cache.get(key)
+        assert first["title"] in ("Проект 1", "Проект 2")
+        assert await cache.count(key) == 2
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_consume_mode_hands_out_each_variant_once(tmp_path):
+    async def scenario():
+        cache = GenerationCache(str(tmp_path))
+        key = cache.key_for("programmer", "beginer", "Python(FastAPI)", "en")
+        await cache.put(key, artifact(1))
+        await cache.put(key, artifact(2))
+        stored = cache.total_bytes
+
+        taken = [await cache.take(key), await cache.take(key)]
+
+        assert sorted(item["title"] for item in taken) == ["Проект 1", "Проект 2"]
+        assert await cache.take(key) is None
+        assert await cache.count(key) == 0
+        assert stored > 0 and cache.total_bytes == 0
+
+    asyncio.run(scenario())
+
+
+def test_eviction_removes_least_recently_used_when_over_size(tmp_path):
+    async def scenario():
+        cache = GenerationCache(str(tmp_path))
+        keys = [cache.key_for("programmer", "beginer", f"spec {index}", "en") for index in range(4)]
+        for index, key in enumerate(keys[:3]):
+            await cache.put(key, artifact(index, size=200))
+            for path in (tmp_path / key[:2] / key).iterdir():
+                os.utime(path, (time.time() - 100 + index,) * 2)
+        variant_bytes = cache.total_bytes // 3
+        cache.max_bytes = variant_bytes * 5 // 2
+
+        await cache.get(keys[0])
+        await cache.put(keys[3], artifact(3, size=200))
+
+        assert [await cache.count(key) for key in keys] == [1, 0, 0, 1]
+        assert cache.total_bytes <= cache.max_bytes
+
+    asyncio.run(scenario())
+
+
+def test_eviction_drops_variants_older_than_max_age(tmp_path):
+    async def scenario():
+        cache = GenerationCache(str(tmp_path), max_age=60, scan_interval=0)
+        key = cache.key_for("programmer", "beginer", "Python(FastAPI)", "en")
+        await cache.put(key, artifact(1))
+        meta_path = next(path for path in (tmp_path.rglob("*.json")))
+        meta_path.write_text('{"title": "Проект 1", "description": "Описание", "created_at": 0}', encoding="utf-8")
+
+        await cache.put(key, artifact(2))
+
+        assert await cache.count(key) == 1
+        assert cache.stats()["evicted"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_put_does_not_rescan_the_cache_below_the_limit(tmp_path):
+    async def scenario():
+        cache = GenerationCache(str(tmp_path), scan_interval=3600)
+        key = cache.key_for("programmer", "beginer", "Python(FastAPI)", "en")
+        for index in range(20):
+            await cache.put(key, artifact(index))
+
+        assert cache.scans == 1
+        assert cache.total_bytes == sum(path.stat().st_size for path in tmp_path.rglob("*") if path.is_file())
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import pytest
+
+from html_processing import ProjectHtmlProcessor, process_project_html
+
+
+DOCUMENT = (
+    "```html\n"
+    "<!DOCTYPE html><html><head><title>Трекер задач</title>"
+    "<style>@import url(https://fonts.example/x.css); body { background: url(//cdn.example/bg.png); }</style>"
+    "<script>alert(1)</script></head>"
+    "<body><h1>План</h1><p>Создать REST API &amp; бота.</p>"
+    "<img src=\"https://cdn.example/x.png\"><img src=\"data:image/png;base64,AAAA\">"
+    "<div style=\"background-image: url('https://evil.example/t.png'); color: red\">Задачи</div>"
+    "<p>Второй абзац.</p></body></html>\n"
+    "```"
+)
+
+
+def feed_in_chunks(text: str, size: int):
+    processor = ProjectHtmlProcessor()
+    found = {}
+    for start in range(0, len(text), size):
+        found.update(processor.feed(text[start:start + size]))
+    return processor.close(), found
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 4096])
+def test_chunked_feed_matches_single_feed(size):
+    processed, found = feed_in_chunks(DOCUMENT, size)
+
+    assert processed == process_project_html(DOCUMENT)
+    assert found == {"title": "Трекер задач", "description": "Создать REST API &amp; бота."}
+
+
+def test_strips_code_fences():
+    processed = process_project_html(DOCUMENT)
+
+    assert processed["html"].startswith("<!DOCTYPE html>")
+    assert processed["html"].endswith("</html>")
+    assert "```" not in processed["html"]
+
+
+def test_removes_scripts_and_external_resources():
+    processed = process_project_html(DOCUMENT)
+    html = processed["html"]
+
+    assert "<script" not in html and "alert(1)" not in html
+    assert "cdn.example" not in html
+    assert "@import" not in html
+    assert "data:image/png;base64,AAAA" in html
+    assert processed["removed"] == 5
+
+
+def test_sanitizes_inline_style_urls():
+    html = process_project_html(DOCUMENT)["html"]
+
+    assert "evil.example" not in html
+    assert '<div style="background-image: none; color: red">' in html
+
+
+def test_keeps_inline_styles_without_urls_untouched():
+    html = process_project_html('<html><body><p style="color: red" class=note>x</p></body></html>')["html"]
+
+    assert html == '<html><body><p style="color: red" class=note>x</p></body></html>'
+
+
+def test_injects_shared_stylesheet_into_head():
+    html = process_project_html("<html><head><title>T</title></head><body></body></html>", "h1 { color: red; }")["html"]
+
+    assert html.startswith("<html><head><style>h1 { color: red; }</style><title>")
+
+
+def test_defaults_without_title_and_description():
+    processed = process_project_html("<html><body><div>Без заголовка</div></body></html>")
+
+    assert processed["title"] == "Сгенерированный план проекта"
+    assert processed["description"] == "Подробное описание проекта."
+
+
+CLEAN_DOCUMENT = (
+    "```html\n"
+    "<!DOCTYPE html><html><head><title>Трекер задач</title><style>h1 { color: #333; }</style></head>"
+    "<body><h1>План</h1>\n<p>Создать REST API &amp; бота.</p><p style=\"color: red\">Второй абзац.</p></body></html>\n"
+    "```"
+)
+
+
+def sanitized(text: str, stylesheet: str | None = None):
+    processor = ProjectHtmlProcessor(stylesheet)
+    processor.sanitizing = True
+    processor.feed(text)
+    return processor.close()
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_clean_documents_skip_the_parser_with_the_same_result(size):
+    processor = ProjectHtmlProcessor("body { margin: 0; }")
+    found = {}
+    for start in range(0, len(CLEAN_DOCUMENT), size):
+        found.update(processor.feed(CLEAN_DOCUMENT[start:start + size]))
+    processed = processor.close()
+
+    assert not processor.sanitizing
+    assert found == {"title": "Трекер задач", "description": "Создать REST API &amp; бота."}
+    assert processed == sanitized(CLEAN_DOCUMENT, "body { margin: 0; }")
+
+
+@pytest.mark.parametrize("size", [1, 3, 4096])
+def test_unsafe_markers_split_across_chunks_switch_to_the_parser(size):
+    document = CLEAN_DOCUMENT.replace("</body>", "<IFRAME src=\"https://evil.example\"></IFRAME></body>")
+    processor = ProjectHtmlProcessor()
+    for start in range(0, len(document), size):
+        processor.feed(document[start:start + size])
+    processed = processor.close()
+
+    assert processor.sanitizing
+    assert "evil.example" not in processed["html"]
+    assert processed["removed"] == 1
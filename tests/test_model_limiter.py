@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from model_limiter import ModelRateLimiter, TokenBucket, UserQuota, UserQuotaExceededError
+from providers import FixtureProvider
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay: float):
+        self.sleeps.append(delay)
+        self.now += delay
+
+
+class ModelError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"model error {code}")
+        self.code = code
+
+
+def fixture_provider(tmp_path):
+    (tmp_path / "plan.html").write_text("<h1>План</h1><p>Описание проекта</p>", encoding="utf-8")
+    return FixtureProvider(str(tmp_path))
+
+
+def failing_first(provider, errors):
+    errors = list(errors)
+    calls = []
+
+    async def fn():
+        calls.append(len(calls))
+        if errors:
+            raise errors.pop(0)
+        return await provider.generate("prompt")
+
+    return fn, calls
+
+
+def test_token_bucket_spends_capacity_then_waits_for_refill():
+    async def scenario():
+        clock = FakeClock()
+        bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+
+        assert await bucket.acquire() == 0.0
+        assert await bucket.acquire() == 0.0
+        assert await bucket.acquire() == pytest.approx(1.0)
+        assert clock.sleeps == [pytest.approx(1.0)]
+
+        clock.now += 10
+        bucket._refill()
+        assert bucket.tokens == 2
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_adjust_can_go_negative_and_delays_next_acquire():
+    async def scenario():
+        clock = FakeClock()
+        bucket = TokenBucket(600, clock=clock, sleep=clock.sleep)
+
+        bucket.adjust(700)
+        assert bucket.tokens == pytest.approx(-100)
+        assert await bucket.acquire(10) == pytest.approx(11.0)
+
+    asyncio.run(scenario())
+
+
+def test_user_quota_rejects_over_limit_with_retry_after():
+    clock = FakeClock()
+    quota = UserQuota(2, 60, clock=clock)
+
+    quota.check(1)
+    clock.now += 10
+    quota.check(1)
+    with pytest.raises(UserQuotaExceededError) as error:
+        quota.check(1)
+    assert error.value.retry_after == pytest.approx(50)
+
+    quota.check(2)
+    clock.now += 50
+    quota.check(1)
+
+
+def test_user_quota_drops_idle_users_without_stats():
+    clock = FakeClock()
+    quota = UserQuota(1, 60, prune_every=3, clock=clock)
+
+    quota.check(1)
+    quota.check(2)
+    clock.now += 61
+    quota.check(3)
+
+    assert set(quota.calls) == {3}
+
+
+def test_limiter_retries_retryable_errors_with_backoff(tmp_path):
+    async def scenario():
+        clock = FakeClock()
+        limiter = ModelRateLimiter(retries=3, backoff=1.0, max_backoff=30.0, clock=clock, sleep=clock.sleep)
+        fn, calls = failing_first(fixture_provider(tmp_path), [ModelError(503), ModelError(429)])
+
+        text, usage = await limiter.call(fn, user_id=1)
+
+        assert "План" in text
+        assert len(calls) == 3
+        assert limiter.retried == 2
+        assert limiter.failed == 0
+        assert 0.5 <= clock.sleeps[0] <= 1.0
+        assert 1.0 <= clock.sleeps[1] <= 2.0
+        assert limiter.response_tokens == usage["response_tokens"]
+
+    asyncio.run(scenario())
+
+
+def test_limiter_gives_up_after_retries_and_does_not_retry_client_errors(tmp_path):
+    async def scenario():
+        clock = FakeClock()
+        limiter = ModelRateLimiter(retries=2, clock=clock, sleep=clock.sleep)
+        provider = fixture_provider(tmp_path)
+
+        fn, calls = failing_first(provider, [ModelError(503)] * 5)
+        with pytest.raises(ModelError):
+            await limiter.call(fn)
+        assert len(calls) == 3
+
+        fn, calls = failing_first(provider, [ModelError(400)])
+        with pytest.raises(ModelError):
+            await limiter.call(fn)
+        assert len(calls) == 1
+
+        assert limiter.retried == 2
+        assert limiter.failed == 2
+        assert provider.served == 0
+
+    asyncio.run(scenario())
+
+
+def test_limiter_rejects_user_over_quota_before_calling_model(tmp_path):
+    async def scenario():
+        clock = FakeClock()
+        limiter = ModelRateLimiter(user_quota=1, user_quota_window=60, clock=clock, sleep=clock.sleep)
+        provider = fixture_provider(tmp_path)
+
+        await limiter.call(lambda: provider.generate("prompt"), user_id=7)
+        with pytest.raises(UserQuotaExceededError):
+            await limiter.call(lambda: provider.generate("prompt"), user_id=7)
+
+        assert provider.served == 1
+        assert limiter.rejected == 1
+
+    asyncio.run(scenario())
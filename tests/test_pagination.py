@@ -0,0 +1,49 @@
+import pytest
+
+bson = pytest.importorskip("bson")
+
+import time
+
+from datetime import datetime, timezone
+
+from pagination import encode_history_cursor, decode_history_cursor, InvalidCursorError
+
+
+def test_cursor_round_trip():
+    project_id = bson.ObjectId()
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    cursor = encode_history_cursor({"_id": project_id, "created_at": created_at})
+
+    query = decode_history_cursor(cursor)
+
+    expected = created_at.replace(tzinfo=timezone.utc)
+    assert query == {"$or": [
+        {"created_at": {"$lt": expected}},
+        {"created_at": expected, "_id": {"$lt": project_id}},
+    ]}
+
+
+def test_cursor_does_not_depend_on_the_host_timezone(monkeypatch):
+    project = {"_id": bson.ObjectId(), "created_at": datetime(2024, 5, 1, 12, 30)}
+    cursors = []
+    for zone in ("UTC", "America/Los_Angeles", "Asia/Yerevan"):
+        monkeypatch.setenv("TZ", zone)
+        time.tzset()
+        cursors.append(encode_history_cursor(project))
+    monkeypatch.delenv("TZ")
+    time.tzset()
+
+    assert len(set(cursors)) == 1
+
+
+def test_cursor_rounds_to_milliseconds():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 250400)
+    cursor = encode_history_cursor({"_id": bson.ObjectId(), "created_at": created_at})
+
+    assert decode_history_cursor(cursor)["$or"][0]["created_at"]["$lt"] == created_at.replace(microsecond=250000, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("cursor", ["", "abc", "123", "123.", "-1.65f1f1f1f1f1f1f1f1f1f1f1", "123.not-an-object-id"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_history_cursor(cursor)
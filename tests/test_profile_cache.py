@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+import profile_cache
+from profile_cache import ProfileCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(profile_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ProfileCache(ttl=60)
+    cache.set(1, {"language_code": "ru"})
+
+    clock.now += 59
+    assert cache.get(1) == {"language_code": "ru"}
+    clock.now += 2
+    assert cache.get(1) is None
+    assert cache.entries == {}
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_get_returns_a_copy(clock):
+    cache = ProfileCache()
+    cache.set(1, {"language_code": "ru"})
+
+    cache.get(1)["language_code"] = "en"
+    assert cache.get(1) == {"language_code": "ru"}
+
+
+def test_update_refreshes_ttl_and_skips_missing_users(clock):
+    cache = ProfileCache(ttl=60)
+    cache.set(1, {"language_code": "ru", "current_project_id": "p1"})
+
+    clock.now += 50
+    cache.update(1, {"current_project_telegram_file_id": "file"})
+    cache.update(2, {"current_project_telegram_file_id": "file"})
+    clock.now += 50
+
+    assert cache.get(1) == {"language_code": "ru", "current_project_id": "p1", "current_project_telegram_file_id": "file"}
+    assert 2 not in cache.entries
+
+
+def test_invalidate_drops_the_entry(clock):
+    cache = ProfileCache()
+    cache.set(1, {"language_code": "ru"})
+
+    cache.invalidate(1)
+    cache.invalidate(2)
+    assert cache.get(1) is None
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = ProfileCache(max_size=2)
+    cache.set(1, {"id": 1})
+    cache.set(2, {"id": 2})
+    cache.get(1)
+    cache.set(3, {"id": 3})
+
+    assert list(cache.entries) == [1, 3]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_zero_size_disables_caching(clock):
+    cache = ProfileCache(max_size=0)
+    cache.set(1, {"language_code": "ru"})
+
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
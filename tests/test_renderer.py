@@ -0,0 +1,40 @@
+import time
+import asyncio
+
+import pytest
+
+from renderer import PdfRenderer, RenderTimeoutError
+
+
+def fake_init_worker(memory_limit_mb: int):
+    pass
+
+
+def fake_render(html: str, shared_css: bool = False, preset: str = "none", recompress: bool = False):
+    if html == "slow":
+        time.sleep(60)
+    return html.encode(), 0.0, 0.0, 0
+
+
+def test_timeout_retries_renders_queued_in_the_old_pool():
+    async def scenario():
+        renderer = PdfRenderer(workers=1, timeout=3.0, render_fn=fake_render, initializer=fake_init_worker)
+        renderer.start()
+        try:
+            await renderer.render("warm")
+            slow = asyncio.create_task(renderer.render("slow"))
+            await asyncio.sleep(0.5)
+            queued = [asyncio.create_task(renderer.render(f"queued-{index}")) for index in range(3)]
+
+            with pytest.raises(RenderTimeoutError):
+                await slow
+            results = await asyncio.gather(*queued)
+        finally:
+            renderer.shutdown()
+
+        assert results == [b"queued-0", b"queued-1", b"queued-2"]
+        assert renderer.timeouts == 1
+        assert renderer.restarts == 1
+        assert renderer.retries == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pymongo")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from datetime import datetime, timedelta
+
+from retention import RetentionService
+from storage import LocalBlobStore
+
+
+class FakeResources:
+    def __init__(self, blob_store):
+        self.db = mongomock_motor.AsyncMongoMockClient()["retention_test"]
+        self.blob_store = blob_store
+
+
+async def add_project(resources, telegram_id: int, index: int, created_at: datetime):
+    blob = await resources.blob_store.put(f"pdf {telegram_id} {index}".encode() * 10)
+    result = await resources.db.projects.insert_one({
+        "telegram_id": telegram_id,
+        "created_at": created_at,
+        "blob_id": blob["blob_id"],
+        "pdf_size": blob["size"],
+    })
+    return result.inserted_id, blob
+
+
+async def expired_ids(resources) -> set:
+    return {project["_id"] async for project in resources.db.projects.find({"pdf_expired_at": {"$exists": True}})}
+
+
+def test_user_quota_expires_oldest_projects_first(tmp_path):
+    async def scenario():
+        resources = FakeResources(LocalBlobStore(str(tmp_path)))
+        now = datetime.now()
+        projects = [await add_project(resources, 1, index, now - timedelta(days=3 - index)) for index in range(3)]
+        size = projects[0][1]["size"]
+        retention = RetentionService(resources, interval=0, user_quota_bytes=size + size // 2, orphan_grace=0)
+
+        result = await retention.run_once()
+
+        assert await expired_ids(resources) == {projects[0][0], projects[1][0]}
+        assert result["expired_projects"] == 2
+        assert result["deleted_blobs"] == 2
+        assert await resources.blob_store.size(projects[2][1]["blob_id"]) == size
+
+    asyncio.run(scenario())
+
+
+def test_current_project_is_never_expired(tmp_path):
+    async def scenario():
+        resources = FakeResources(LocalBlobStore(str(tmp_path)))
+        old = datetime.now() - timedelta(days=90)
+        current_id, _ = await add_project(resources, 1, 0, old)
+        other_id, _ = await add_project(resources, 1, 1, old + timedelta(days=1))
+        await resources.db.users.insert_one({"telegram_id": 1, "current_project_id": str(current_id)})
+        retention = RetentionService(resources, interval=0, max_age_days=30, orphan_grace=0)
+
+        await retention.run_once()
+
+        assert await expired_ids(resources) == {other_id}
+
+    asyncio.run(scenario())
+
+
+def test_orphans_within_grace_period_are_kept(tmp_path):
+    async def scenario():
+        resources = FakeResources(LocalBlobStore(str(tmp_path)))
+        orphan = await resources.blob_store.put(b"orphan")
+        retention = RetentionService(resources, interval=0, orphan_grace=3600)
+
+        result = await retention.run_once()
+
+        assert result["deleted_blobs"] == 0
+        assert await resources.blob_store.size(orphan["blob_id"]) == len(b"orphan")
+
+    asyncio.run(scenario())
+
+
+def test_run_is_skipped_while_another_process_holds_the_lease(tmp_path):
+    async def scenario():
+        resources = FakeResources(LocalBlobStore(str(tmp_path)))
+        await resources.db.locks.insert_one({"_id": "retention", "owner": "other", "expires_at": datetime.now() + timedelta(minutes=5)})
+        retention = RetentionService(resources, interval=0, orphan_grace=0)
+
+        result = await retention.run_once()
+
+        assert result["skipped"] is True
+        assert retention.runs == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def api_main(monkeypatch):
+    monkeypatch.setenv("MODEL_PROVIDER", "synthetic")
+    main = pytest.importorskip("main")
+    testclient = pytest.importorskip("fastapi.testclient")
+
+    async def run_once():
+        return {"skipped": False}
+
+    monkeypatch.setattr(main.retention, "run_once", run_once)
+    return main, testclient.TestClient(main.app)
+
+
+def test_retention_endpoint_requires_admin_token(api_main, monkeypatch):
+    main, client = api_main
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/storage/retention", headers={"X-Admin-Token": "secret"}).status_code == 404
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.post("/storage/retention").status_code == 403
+    assert client.post("/storage/retention", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+    response = client.post("/storage/retention", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json() == {"skipped": False}
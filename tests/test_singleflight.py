@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await release.wait()
+            return {"project_id": "p1"}
+
+        callers = [asyncio.create_task(flights.do(1, fn)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flights.in_flight == 1
+        release.set()
+        results = await asyncio.gather(*callers)
+
+        assert calls == [1]
+        assert all(result is results[0] for result in results)
+        assert flights.stats() == {"in_flight": 0, "started": 1, "shared": 4}
+
+    asyncio.run(scenario())
+
+
+def test_waiters_see_the_exception_and_the_key_is_released():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def failing():
+            await release.wait()
+            raise RuntimeError("model unavailable")
+
+        callers = [asyncio.create_task(flights.do(1, failing)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flights.in_flight == 0
+
+        async def succeeding():
+            return "ok"
+
+        assert await flights.do(1, succeeding) == "ok"
+        assert flights.started == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_leader_cancels_waiters_but_not_other_keys():
+    async def scenario():
+        flights = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(60)
+
+        async def fast():
+            await asyncio.sleep(0)
+            return "other"
+
+        leader = asyncio.create_task(flights.do(1, slow))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flights.do(1, slow))
+        other = asyncio.create_task(flights.do(2, fast))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await other == "other"
+        assert flights.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def api_main(monkeypatch):
+    monkeypatch.setenv("MODEL_PROVIDER", "synthetic")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    main = pytest.importorskip("main")
+    monkeypatch.setattr(main.resources, "_db", mongomock_motor.AsyncMongoMockClient()["singleflight_test"])
+    return main
+
+
+def test_user_flight_releases_the_generation_claim_on_error(api_main, monkeypatch):
+    main = api_main
+    request_data = main.ProjectRequestData(telegram_id=42, profession="Backend", level="Junior", specialization="Python", language_code="ru")
+
+    async def scenario():
+        await main.resources.db.users.insert_one({"_id": 42, "current_project_id": None})
+        release = asyncio.Event()
+        calls = []
+
+        async def failing_create_project(request_data, claim_id, on_progress=None):
+            calls.append(claim_id)
+            user = await main.resources.db.users.find_one({"_id": 42})
+            assert user["generation_claim_id"] == claim_id
+            await release.wait()
+            raise RuntimeError("model unavailable")
+
+        monkeypatch.setattr(main, "create_project", failing_create_project)
+        callers = [
+            asyncio.create_task(main.user_flights.do(42, lambda: main.generate_project_for_user(request_data)))
+            for _ in range(3)
+        ]
+        while not calls:
+            await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+
+        assert len(calls) == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert main.user_flights.in_flight == 0
+        user = await main.resources.db.users.find_one({"_id": 42})
+        assert "generation_claim_id" not in user
+        assert "generation_status" not in user
+
+        assert await main.claim_generation(42)
+
+    asyncio.run(scenario())
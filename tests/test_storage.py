@@ -0,0 +1,131 @@
+import os
+import asyncio
+import hashlib
+
+import pytest
+
+pytest.importorskip("gridfs")
+
+from storage import LocalBlobStore, GridFSBlobStore, BlobNotFoundError, iterate_bytes
+
+
+DATA = b"%PDF-1.7 " + bytes(range(256)) * 1024
+
+
+async def failing_chunks():
+    yield b"partial"
+    raise RuntimeError("model stream broken")
+
+
+@pytest.fixture(params=["local", "gridfs"])
+def with_store(request, tmp_path):
+    url = os.getenv("MONGO_TEST_URL")
+    if request.param == "gridfs":
+        if not url:
+            pytest.skip("MONGO_TEST_URL не задан")
+        motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+
+    def run(scenario):
+        async def main():
+            if request.param == "local":
+                await scenario(LocalBlobStore(str(tmp_path)))
+                return
+            client = motor_asyncio.AsyncIOMotorClient(url)
+            db = client[f"storage_test_{os.getpid()}"]
+            try:
+                await scenario(GridFSBlobStore(db))
+            finally:
+                await client.drop_database(db.name)
+                client.close()
+
+        asyncio.run(main())
+
+    return run
+
+
+def test_identical_content_is_stored_once(with_store):
+    async def scenario(store):
+        first = await store.put(DATA)
+        second = await store.put_stream(iterate_bytes(DATA, chunk_size=1000))
+
+        assert first == second == {"blob_id": hashlib.sha256(DATA).hexdigest(), "size": len(DATA)}
+        assert [blob["blob_id"] async for blob in store.list()] == [first["blob_id"]]
+        assert await store.read(first["blob_id"]) == DATA
+
+    with_store(scenario)
+
+
+def test_ranges_are_streamed_inclusive(with_store):
+    async def scenario(store):
+        blob = await store.put(DATA)
+
+        assert await store.size(blob["blob_id"]) == len(DATA)
+        ranged = b"".join([chunk async for chunk in store.stream(blob["blob_id"], 100, 70000, chunk_size=4096)])
+        assert ranged == DATA[100:70001]
+        suffix = b"".join([chunk async for chunk in store.stream(blob["blob_id"], len(DATA) - 10)])
+        assert suffix == DATA[-10:]
+
+    with_store(scenario)
+
+
+def test_deleted_blobs_are_not_found_and_delete_is_idempotent(with_store):
+    async def scenario(store):
+        blob = await store.put(DATA)
+
+        await store.delete(blob["blob_id"])
+        await store.delete(blob["blob_id"])
+        with pytest.raises(BlobNotFoundError):
+            await store.size(blob["blob_id"])
+        with pytest.raises(BlobNotFoundError):
+            await store.read(blob["blob_id"])
+        assert [blob async for blob in store.list()] == []
+
+    with_store(scenario)
+
+
+def test_invalid_blob_ids_are_rejected(with_store):
+    async def scenario(store):
+        for blob_id in ("../../etc/passwd", "", "A" * 64):
+            with pytest.raises(BlobNotFoundError):
+                await store.size(blob_id)
+
+    with_store(scenario)
+
+
+def test_failed_streams_store_nothing(with_store):
+    async def scenario(store):
+        with pytest.raises(RuntimeError):
+            await store.put_stream(failing_chunks())
+        assert [blob async for blob in store.list()] == []
+
+    with_store(scenario)
+
+
+def test_local_commit_is_atomic_and_cleans_up_failed_writes(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(str(tmp_path))
+        with pytest.raises(RuntimeError):
+            await store.put_stream(failing_chunks())
+        assert os.listdir(store.tmp_dir) == []
+        assert [blob async for blob in store.list()] == []
+
+        blob = await store.put(DATA)
+        assert os.listdir(store.tmp_dir) == []
+        assert os.path.exists(store.path_for(blob["blob_id"]))
+
+    asyncio.run(scenario())
+
+
+def test_local_duplicate_put_refreshes_mtime(tmp_path):
+    async def scenario():
+        store = LocalBlobStore(str(tmp_path))
+        blob = await store.put(DATA)
+        path = store.path_for(blob["blob_id"])
+        os.utime(path, (1_000_000, 1_000_000))
+
+        await store.put(DATA)
+
+        assert os.path.getmtime(path) > 1_000_000
+        assert os.listdir(store.tmp_dir) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,16 @@
+from prometheus_client import CollectorRegistry, generate_latest
+
+from telemetry import counter_from
+
+
+def test_counter_from_exports_a_total():
+    registry = CollectorRegistry()
+    values = iter([3, 5])
+    counter_from("pdf_render_retries", "Повторённые рендеры", lambda: next(values), registry=registry)
+
+    first = generate_latest(registry).decode()
+    second = generate_latest(registry).decode()
+
+    assert "counter" in next(line for line in first.splitlines() if line.startswith("# TYPE pdf_render_retries"))
+    assert "pdf_render_retries_total 3.0" in first
+    assert "pdf_render_retries_total 5.0" in second
@@ -0,0 +1,121 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+import throttling
+from throttling import Limit, MemoryThrottleBackend, RedisThrottleBackend, ThrottlingMiddleware
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(throttling, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_memory_bucket_allows_burst_then_refills(clock):
+    async def scenario():
+        backend = MemoryThrottleBackend()
+        limit = Limit(per_minute=60, burst=3)
+
+        assert [await backend.take("user:1", limit) for _ in range(4)] == [True, True, True, False]
+        assert await backend.take("user:2", limit)
+
+        clock.now += 1
+        assert await backend.take("user:1", limit)
+        assert not await backend.take("user:1", limit)
+
+        clock.now += 60
+        assert [await backend.take("user:1", limit) for _ in range(4)] == [True, True, True, False]
+
+    asyncio.run(scenario())
+
+
+def test_memory_seen_marks_expire(clock):
+    async def scenario():
+        backend = MemoryThrottleBackend()
+
+        assert not await backend.seen("callback:1:menu", 1.0)
+        assert await backend.seen("callback:1:menu", 1.0)
+        clock.now += 1.5
+        assert not await backend.seen("callback:1:menu", 1.0)
+
+    asyncio.run(scenario())
+
+
+def test_memory_backend_prunes_oldest_buckets(clock):
+    async def scenario():
+        backend = MemoryThrottleBackend(max_keys=4)
+        limit = Limit(per_minute=60, burst=1)
+        for user_id in range(5):
+            clock.now += 1
+            await backend.take(f"user:{user_id}", limit)
+
+        assert sorted(backend.buckets) == ["user:2", "user:3", "user:4"]
+
+    asyncio.run(scenario())
+
+
+def test_middleware_drops_updates_over_the_user_limit(clock):
+    async def scenario():
+        middleware = ThrottlingMiddleware(MemoryThrottleBackend(), {"default": Limit(per_minute=60, burst=2)})
+        handled = []
+
+        async def handler(event, data):
+            handled.append(event)
+            return "handled"
+
+        data = {"event_from_user": SimpleNamespace(id=1)}
+        results = [await middleware(handler, SimpleNamespace(), data) for _ in range(3)]
+
+        assert results == ["handled", "handled", None]
+        assert middleware.stats() == {"passed": 2, "dropped": {"user_limit:default": 1}}
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    pytest.importorskip("redis.asyncio")
+    fake = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr("redis.asyncio.Redis.from_url", lambda url: fake)
+    return RedisThrottleBackend("redis://fake"), fake
+
+
+def test_redis_script_enforces_burst_and_refills(redis_backend):
+    backend, fake = redis_backend
+
+    async def scenario():
+        limit = Limit(per_minute=600, burst=2)
+
+        assert [await backend.take("user:1", limit) for _ in range(3)] == [True, True, False]
+        assert 0 < await fake.pttl("throttle:user:1") <= 1200 + 1000
+
+        await asyncio.sleep(0.15)
+        assert await backend.take("user:1", limit)
+        assert not await backend.take("user:1", limit)
+
+    asyncio.run(scenario())
+
+
+def test_redis_seen_uses_set_nx(redis_backend):
+    backend, fake = redis_backend
+
+    async def scenario():
+        assert not await backend.seen("notice:1", 10)
+        assert await backend.seen("notice:1", 10)
+        assert 0 < await fake.pttl("throttle:notice:1") <= 10000
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("opentelemetry.sdk")
+
+import httpx
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+import tracing
+import telemetry
+
+from api_client import ApiClient
+
+
+def test_bot_request_opens_client_span_and_propagates_it(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+    seen = {}
+
+    def handler(request: httpx.Request):
+        seen["traceparent"] = request.headers.get("traceparent")
+        return httpx.Response(200, json={})
+
+    async def scenario():
+        client = ApiClient("http://api", transport=httpx.MockTransport(handler))
+        try:
+            await client.get("/users/{telegram_id}", path_params={"telegram_id": 1})
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
+
+    span, = exporter.get_finished_spans()
+    assert span.name == "GET /users/{telegram_id}"
+    assert span.attributes["http.response.status_code"] == 200
+    assert seen["traceparent"].split("-")[1] == format(span.context.trace_id, "032x")
+
+
+@pytest.mark.parametrize("create_tracer_provider", [tracing.create_tracer_provider, telemetry.create_tracer_provider])
+def test_tracer_provider_uses_otel_environment(monkeypatch, create_tracer_provider):
+    pytest.importorskip("opentelemetry.exporter.otlp.proto.http.trace_exporter")
+    monkeypatch.setenv("OTEL_SERVICE_NAME", "from-env")
+    monkeypatch.setenv("OTEL_EXPORTER_OTLP_PROTOCOL", "http/protobuf")
+
+    provider = create_tracer_provider("default-name")
+    try:
+        assert provider.resource.attributes["service.name"] == "from-env"
+    finally:
+        provider.shutdown()
@@ -0,0 +1,57 @@
+import asyncio
+import os
+
+from types import SimpleNamespace
+
+from translations import Translations, ButtonTextFilter, MAIN_KEYBOARD_LAYOUT
+
+
+DATA = {
+    "button_user": {"en": "Profile", "ru": "Профиль", "hy": "Պրոֆիլ"},
+    "button_help": {"en": "Help", "ru": "Помощь"},
+    "greeting": {"en": "Hello, {name}!", "ru": "Привет, {name}!"},
+}
+
+
+def test_button_index_maps_every_language_to_the_key():
+    translations = Translations(DATA)
+
+    assert translations.button_key("Profile") == "button_user"
+    assert translations.button_key("Профиль") == "button_user"
+    assert translations.button_key("Պրոֆիլ") == "button_user"
+    assert translations.button_key("Помощь") == "button_help"
+    assert translations.button_key("Привет") is None
+    assert translations.button_key(None) is None
+
+
+def test_missing_translations_fall_back_to_english():
+    translations = Translations(DATA)
+
+    assert translations.get("button_help", "hy") == "Help"
+    assert translations.get("greeting", "de", name="Ann") == "Hello, Ann!"
+    assert translations.get("greeting", "ru", name="Аня") == "Привет, Аня!"
+    assert translations.get("unknown", "ru") == ""
+    assert translations.language("de") == "en"
+    assert translations.language(None) == "en"
+
+
+def test_button_filter_passes_the_button_key_to_handlers():
+    async def scenario():
+        button_filter = ButtonTextFilter(Translations(DATA))
+
+        assert await button_filter(SimpleNamespace(text="Помощь")) == {"button_key": "button_help"}
+        assert await button_filter(SimpleNamespace(text="что-то другое")) is False
+        assert await button_filter(SimpleNamespace(text=None)) is False
+
+    asyncio.run(scenario())
+
+
+def test_main_keyboard_is_cached_per_language():
+    path = os.path.join(os.path.dirname(__file__), "..", "bot", "translations.json")
+    translations = Translations.load(path)
+
+    keyboard = translations.main_keyboard("ru")
+    assert translations.main_keyboard("ru") is keyboard
+    assert translations.main_keyboard("de") is translations.main_keyboard("en")
+    for row, keys in zip(keyboard.keyboard, MAIN_KEYBOARD_LAYOUT):
+        assert [translations.button_key(button.text) for button in row] == list(keys)